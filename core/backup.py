@@ -0,0 +1,315 @@
+from nicegui import ui
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import struct
+import tempfile
+from datetime import datetime
+from core import jobs
+
+BACKUP_DIR = "backups"
+BACKUP_INTERVAL = int(os.getenv("BACKUP_INTERVAL_SECONDS", str(24 * 3600)))
+FULL_EVERY = int(os.getenv("BACKUP_FULL_EVERY", "7"))  # incrementals between full snapshots
+KEEP_CHAINS = int(os.getenv("BACKUP_KEEP_CHAINS", "4"))  # full snapshots (with their deltas) to keep
+STEP_PAGES = 256  # pages copied per backup step; locks are released between steps
+
+# Every database the dashboard writes to. media.db and db/media.db are both
+# listed because the media module creates tables in one and queries the other.
+DATABASES = [
+    "links.db",
+    "db/db.db",
+    "db/media.db",
+    "media.db",
+    "db/radio.db",
+    "db/code.db",
+    "cli.db",
+    "network_stats.db",
+]
+
+_PAGE_RECORD = struct.Struct(">I")
+
+
+def _safe_name(path):
+    return path.replace("/", "__").replace("\\", "__")
+
+
+def _page_digests(path, page_size):
+    """Return one 16-byte digest per page of a database file."""
+    digests = []
+    with open(path, "rb") as f:
+        while True:
+            page = f.read(page_size)
+            if not page:
+                break
+            digests.append(hashlib.blake2b(page, digest_size=16).digest())
+    return digests
+
+
+def _file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _online_copy(src_path, dst_path):
+    """Copy a live database with the SQLite online backup API.
+
+    The copy runs in steps of STEP_PAGES so writers are only held off for one
+    step at a time; SQLite restarts the copy if another connection writes.
+    """
+    src = sqlite3.connect(src_path)
+    dst = sqlite3.connect(dst_path)
+    try:
+        src.backup(dst, pages=STEP_PAGES, sleep=0.005)
+        page_size = dst.execute("PRAGMA page_size").fetchone()[0]
+    finally:
+        dst.close()
+        src.close()
+    return page_size
+
+
+def list_backups():
+    """Return manifests, newest first."""
+    if not os.path.isdir(BACKUP_DIR):
+        return []
+    manifests = []
+    for name in os.listdir(BACKUP_DIR):
+        path = os.path.join(BACKUP_DIR, name, "manifest.json")
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                manifests.append(json.load(f))
+    return sorted(manifests, key=lambda m: m["id"], reverse=True)
+
+
+def _load_manifest(backup_id):
+    with open(os.path.join(BACKUP_DIR, backup_id, "manifest.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _chain(manifest):
+    """Return the full snapshot and every delta up to manifest, oldest first."""
+    chain = [manifest]
+    while chain[0]["parent"]:
+        chain.insert(0, _load_manifest(chain[0]["parent"]))
+    return chain
+
+
+def _write_full(snapshot, out_path):
+    with open(snapshot, "rb") as src, gzip.open(out_path, "wb", compresslevel=6) as dst:
+        shutil.copyfileobj(src, dst, 1 << 20)
+
+
+def _write_delta(snapshot, out_path, page_size, digests, parent_digests):
+    """Store only the pages whose digest differs from the parent snapshot."""
+    changed = 0
+    with open(snapshot, "rb") as src, gzip.open(out_path, "wb", compresslevel=6) as dst:
+        for page_no, digest in enumerate(digests):
+            if page_no < len(parent_digests) and parent_digests[page_no] == digest:
+                continue
+            src.seek(page_no * page_size)
+            dst.write(_PAGE_RECORD.pack(page_no))
+            dst.write(src.read(page_size))
+            changed += 1
+    return changed
+
+
+def snapshot_all(job=None):
+    """Back up every existing database and return the new manifest.
+
+    A full, gzip-compressed copy is written every FULL_EVERY runs; in between
+    only the pages that changed since the previous run are stored.
+    """
+    previous = next(iter(list_backups()), None)
+    chain_length = len(_chain(previous)) if previous else 0
+    full = previous is None or chain_length >= FULL_EVERY
+    backup_id = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+    backup_path = os.path.join(BACKUP_DIR, backup_id)
+    os.makedirs(backup_path, exist_ok=True)
+    manifest = {
+        "id": backup_id,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "kind": "full" if full else "incremental",
+        "parent": None if full else previous["id"],
+        "databases": {},
+    }
+    existing = [path for path in DATABASES if os.path.exists(path)]
+    with tempfile.TemporaryDirectory() as tmp:
+        for i, path in enumerate(existing):
+            if job:
+                job.check_cancelled()
+                job.set_progress(i / len(existing), path)
+            name = _safe_name(path)
+            snapshot = os.path.join(tmp, name)
+            page_size = _online_copy(path, snapshot)
+            digests = _page_digests(snapshot, page_size)
+            parent = None if full else previous["databases"].get(path)
+            entry = {
+                "path": path,
+                "page_size": page_size,
+                "page_count": len(digests),
+                "sha256": _file_sha256(snapshot),
+            }
+            if parent is None or parent["page_size"] != page_size:
+                entry["file"] = f"{name}.gz"
+                entry["mode"] = "full"
+                _write_full(snapshot, os.path.join(backup_path, entry["file"]))
+            else:
+                with gzip.open(os.path.join(BACKUP_DIR, previous["id"], parent["digests"]), "rb") as f:
+                    data = f.read()
+                parent_digests = [data[j : j + 16] for j in range(0, len(data), 16)]
+                entry["file"] = f"{name}.delta.gz"
+                entry["mode"] = "delta"
+                entry["changed_pages"] = _write_delta(
+                    snapshot, os.path.join(backup_path, entry["file"]), page_size, digests, parent_digests
+                )
+            entry["digests"] = f"{name}.digests.gz"
+            with gzip.open(os.path.join(backup_path, entry["digests"]), "wb") as f:
+                f.write(b"".join(digests))
+            manifest["databases"][path] = entry
+    # The manifest is written last so a crashed run is never mistaken for a backup
+    with open(os.path.join(backup_path, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    prune()
+    return manifest
+
+
+def _rebuild(backup_id, path, out_path):
+    """Reassemble the database file for `path` as of backup_id into out_path."""
+    chain = _chain(_load_manifest(backup_id))
+    target = chain[-1]["databases"].get(path)
+    if target is None:
+        raise ValueError(f"{path} is not part of backup {backup_id}")
+    # Start from the newest full copy of this database in the chain
+    start = max(i for i, m in enumerate(chain) if m["databases"].get(path, {}).get("mode") == "full")
+    with open(out_path, "wb") as out:
+        for m in chain[start:]:
+            entry = m["databases"].get(path)
+            if entry is None:
+                continue
+            source = os.path.join(BACKUP_DIR, m["id"], entry["file"])
+            if entry["mode"] == "full":
+                out.seek(0)
+                out.truncate()
+                with gzip.open(source, "rb") as f:
+                    shutil.copyfileobj(f, out, 1 << 20)
+                continue
+            page_size = entry["page_size"]
+            with gzip.open(source, "rb") as f:
+                while True:
+                    header = f.read(_PAGE_RECORD.size)
+                    if not header:
+                        break
+                    (page_no,) = _PAGE_RECORD.unpack(header)
+                    out.seek(page_no * page_size)
+                    out.write(f.read(page_size))
+            out.truncate(entry["page_count"] * page_size)
+    if _file_sha256(out_path) != target["sha256"]:
+        raise ValueError(f"Checksum mismatch restoring {path} from {backup_id}")
+
+
+def restore(backup_id, paths=None):
+    """Restore databases from a backup; returns the restored paths.
+
+    The rebuilt file is copied into the live database with the online backup
+    API, so connections held elsewhere in the app stay valid.
+    """
+    manifest = _load_manifest(backup_id)
+    paths = paths or list(manifest["databases"])
+    with tempfile.TemporaryDirectory() as tmp:
+        for path in paths:
+            rebuilt = os.path.join(tmp, _safe_name(path))
+            _rebuild(backup_id, path, rebuilt)
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            src = sqlite3.connect(rebuilt)
+            dst = sqlite3.connect(path)
+            try:
+                src.backup(dst)
+            finally:
+                dst.close()
+                src.close()
+    return paths
+
+
+def prune():
+    """Delete whole chains beyond the newest KEEP_CHAINS full snapshots."""
+    backups = list_backups()
+    fulls = [m["id"] for m in backups if m["kind"] == "full"]
+    if len(fulls) <= KEEP_CHAINS:
+        return
+    oldest_kept = fulls[KEEP_CHAINS - 1]
+    for m in backups:
+        if m["id"] < oldest_kept:
+            shutil.rmtree(os.path.join(BACKUP_DIR, m["id"]), ignore_errors=True)
+
+
+def backup_size(manifest):
+    folder = os.path.join(BACKUP_DIR, manifest["id"])
+    return sum(os.path.getsize(os.path.join(folder, name)) for name in os.listdir(folder))
+
+
+jobs.schedule("backup.snapshot_all", snapshot_all, seconds=BACKUP_INTERVAL)
+
+
+def render():
+    with ui.card().classes("p-6 bg-gray-700"):
+        ui.label("Database Backups").classes("text-2xl font-semibold text-gray-100 mb-4")
+        backup_table = ui.table(
+            columns=[
+                {"name": "id", "label": "Backup", "field": "id"},
+                {"name": "created_at", "label": "Created", "field": "created_at"},
+                {"name": "kind", "label": "Kind", "field": "kind"},
+                {"name": "databases", "label": "Databases", "field": "databases"},
+                {"name": "size", "label": "Size (KB)", "field": "size"},
+            ],
+            rows=[],
+            row_key="id",
+            selection="single",
+        ).classes("w-full bg-gray-600 text-gray-100 mb-4")
+
+        def refresh():
+            backup_table.rows = [
+                {
+                    "id": m["id"],
+                    "created_at": m["created_at"],
+                    "kind": m["kind"],
+                    "databases": len(m["databases"]),
+                    "size": round(backup_size(m) / 1024, 1),
+                }
+                for m in list_backups()
+            ]
+            backup_table.update()
+
+        async def backup_now():
+            try:
+                manifest = await jobs.run("backup.snapshot_all", snapshot_all, report=True)
+                ui.notify(f"Backup {manifest['id']} created", type="positive")
+            except jobs.JobCancelled:
+                ui.notify("Backup cancelled", type="warning")
+            except Exception as e:
+                ui.notify(f"Backup failed: {str(e)}", type="negative")
+            refresh()
+
+        async def restore_selected():
+            if not backup_table.selected:
+                ui.notify("Select a backup to restore", type="warning")
+                return
+            backup_id = backup_table.selected[0]["id"]
+            try:
+                paths = await jobs.run(f"backup.restore:{backup_id}", restore, backup_id)
+                ui.notify(f"Restored {len(paths)} databases from {backup_id}", type="positive")
+            except Exception as e:
+                ui.notify(f"Restore failed: {str(e)}", type="negative")
+
+        with ui.row():
+            ui.button("Back Up Now", on_click=backup_now).classes(
+                "bg-blue-600 hover:bg-blue-500 text-white rounded px-4 py-2"
+            )
+            ui.button("Restore Selected", on_click=restore_selected).classes(
+                "bg-red-600 hover:bg-red-500 text-white rounded px-4 py-2"
+            )
+        refresh()
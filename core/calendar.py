@@ -1,14 +1,35 @@
 from nicegui import ui
-import sqlite3
-from datetime import datetime
+from core import db
+from core import metrics
+from core import events
+from core import recurrence
+from core import ical
+from core import export
+from core import jobs
+from datetime import date, datetime, timedelta
 import calendar
-from googleapiclient.discovery import build
-from google_auth_oauthlib.flow import InstalledAppFlow
-from core.credentials import get_credentials
+import hashlib
 import os
 
+OCCURRENCE_PAST_DAYS = int(os.getenv("CALENDAR_OCCURRENCE_PAST_DAYS", "400"))
+OCCURRENCE_FUTURE_DAYS = int(os.getenv("CALENDAR_OCCURRENCE_FUTURE_DAYS", "800"))
+OCCURRENCE_EXTEND_INTERVAL = 24 * 3600
+AGENDA_LIMIT = 10
+NEW_UID = "lower(hex(randomblob(16))) || '@homepage'"
+# Shared by the insert and update triggers: valid one-off dates inside the window go straight
+# in; series are left to Python, which can expand RRULEs. NOT EXISTS rather than OR IGNORE,
+# because an upsert's conflict handling overrides the OR IGNORE of the triggers it fires
+OCCURRENCE_TRIGGER_BODY = """
+            INSERT INTO event_occurrences (day, event_id)
+            SELECT new.date, new.id FROM occurrence_window
+            WHERE coalesce(new.recurrence, '') = '' AND date(new.date) = new.date
+                AND new.date >= window_start AND new.date < window_end;
+            INSERT INTO event_occurrences_dirty (event_id)
+            SELECT new.id WHERE coalesce(new.recurrence, '') != ''
+                AND NOT EXISTS (SELECT 1 FROM event_occurrences_dirty WHERE event_id = new.id);"""
+
 def init_db():
-    conn = sqlite3.connect("links.db")
+    conn = db.connect("links.db")
     c = conn.cursor()
     c.execute(
         "CREATE TABLE IF NOT EXISTS events (id INTEGER PRIMARY KEY, title TEXT, date TEXT, description TEXT, recurrence TEXT DEFAULT '')"
@@ -17,10 +38,351 @@ def init_db():
     columns = [info[1] for info in c.fetchall()]
     if "recurrence" not in columns:
         c.execute("ALTER TABLE events ADD COLUMN recurrence TEXT DEFAULT ''")
+    if "exdates" not in columns:
+        c.execute("ALTER TABLE events ADD COLUMN exdates TEXT NOT NULL DEFAULT ''")  # "YYYY-MM-DD,..."
+    if "uid" not in columns:
+        c.execute("ALTER TABLE events ADD COLUMN uid TEXT")
+    # Every event gets an iCalendar UID, so re-importing an export updates instead of duplicating
+    c.execute(f"UPDATE events SET uid = {NEW_UID} WHERE uid IS NULL")
+    c.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_events_uid ON events(uid)")
+    # One-off events are read by date range, recurring series from the small partial index
+    c.execute("UPDATE events SET recurrence = '' WHERE recurrence IS NULL")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_events_date ON events(date)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_events_recurring ON events(date) WHERE recurrence != ''")
+    # Expanded occurrences over a rolling window, so views are range scans on (day, event_id).
+    # Triggers place one-off events and drop deleted ones; new or changed series are queued
+    # in event_occurrences_dirty and expanded in Python before the next read.
+    c.executescript(
+        f"""
+        CREATE TABLE IF NOT EXISTS event_occurrences (
+            day TEXT NOT NULL,
+            event_id INTEGER NOT NULL,
+            PRIMARY KEY (day, event_id)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS idx_event_occurrences_event ON event_occurrences(event_id);
+        CREATE TABLE IF NOT EXISTS event_occurrences_dirty (event_id INTEGER PRIMARY KEY);
+        CREATE TABLE IF NOT EXISTS occurrence_window (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            window_start TEXT NOT NULL,
+            window_end TEXT NOT NULL
+        );
+        -- Recreated each start so changes to OCCURRENCE_TRIGGER_BODY reach existing databases
+        DROP TRIGGER IF EXISTS events_occurrences_insert;
+        DROP TRIGGER IF EXISTS events_occurrences_update;
+        CREATE TRIGGER IF NOT EXISTS events_occurrences_insert AFTER INSERT ON events BEGIN
+            {OCCURRENCE_TRIGGER_BODY}
+        END;
+        CREATE TRIGGER IF NOT EXISTS events_occurrences_update AFTER UPDATE OF date, recurrence ON events BEGIN
+            DELETE FROM event_occurrences WHERE event_id = old.id;
+            {OCCURRENCE_TRIGGER_BODY}
+        END;
+        CREATE TRIGGER IF NOT EXISTS events_occurrences_exdates AFTER UPDATE OF exdates ON events
+        WHEN coalesce(new.recurrence, '') != '' BEGIN
+            INSERT INTO event_occurrences_dirty (event_id)
+            SELECT new.id WHERE NOT EXISTS (SELECT 1 FROM event_occurrences_dirty WHERE event_id = new.id);
+        END;
+        CREATE TRIGGER IF NOT EXISTS events_uid_insert AFTER INSERT ON events WHEN new.uid IS NULL BEGIN
+            UPDATE events SET uid = {NEW_UID} WHERE id = new.id;
+        END;
+        CREATE TRIGGER IF NOT EXISTS events_occurrences_delete AFTER DELETE ON events BEGIN
+            DELETE FROM event_occurrences WHERE event_id = old.id;
+            DELETE FROM event_occurrences_dirty WHERE event_id = old.id;
+        END;
+        """
+    )
     conn.commit()
+    c.execute("SELECT 1 FROM occurrence_window")
+    materialized = c.fetchone() is not None
+    conn.close()
+    if not materialized:
+        extend_occurrences()
+
+# One-off events inside the range, plus every series that started before its end
+RANGE_QUERY = (
+    "SELECT id, title, date, description, recurrence, exdates FROM events "
+    "WHERE date >= ? AND date < ? AND recurrence = '' "
+    "UNION ALL SELECT id, title, date, description, recurrence, exdates FROM events WHERE recurrence != '' AND date < ?"
+)
+OCCURRENCES_QUERY = (
+    "SELECT o.day, e.id, e.title, e.description, e.recurrence FROM event_occurrences o "
+    "JOIN events e ON e.id = o.event_id WHERE o.day >= ? AND o.day < ? ORDER BY o.day, o.event_id"
+)
+AGENDA_QUERY = (
+    "SELECT o.day, e.id, e.title, e.description, e.recurrence FROM event_occurrences o "
+    "JOIN events e ON e.id = o.event_id WHERE o.day >= ? AND o.day < ? ORDER BY o.day, o.event_id LIMIT ?"
+)
+
+def parse_exdates(text):
+    dates = set()
+    for part in (text or "").split(","):
+        try:
+            dates.add(date.fromisoformat(part.strip()))
+        except ValueError:
+            pass
+    return frozenset(dates)
+
+def event_days(date_str, rule, start, end, exdates=""):
+    """Return the "YYYY-MM-DD" days in [start, end) an event falls on, less its excluded dates.
+
+    An unreadable date gives no days; a series with an unreadable rule shows on its first day.
+    """
+    try:
+        dtstart = date.fromisoformat(date_str)
+    except (TypeError, ValueError):
+        return []
+    try:
+        dates = list(recurrence.occurrences(dtstart, rule, start, end, parse_exdates(exdates) if exdates else ()))
+    except ValueError:
+        dates = [dtstart] if start <= dtstart < end else []
+    return [day.isoformat() for day in dates]
+
+def expand_range(start, end):
+    """load_range() computed from the events table, for ranges outside the materialized window."""
+    conn = db.connect("links.db")
+    c = conn.cursor()
+    c.execute(RANGE_QUERY, (start.isoformat(), end.isoformat(), end.isoformat()))
+    rows = c.fetchall()
+    conn.close()
+    days = {}
+    for event_id, title, date_str, description, rule, exdates in rows:
+        for day in event_days(date_str, rule, start, end, exdates):
+            days.setdefault(day, []).append((event_id, title, day, description, rule))
+    return {day: sorted(days[day]) for day in sorted(days)}
+
+def _materialize_series(c, start, end, where=""):
+    """Insert the occurrences in [start, end) of the recurring series matching `where`."""
+    c.execute(
+        f"SELECT id, date, recurrence, exdates FROM events WHERE recurrence != '' AND date < ?{where}",
+        (end.isoformat(),),
+    )
+    rows = [
+        (day, event_id)
+        for event_id, date_str, rule, exdates in c.fetchall()
+        for day in event_days(date_str, rule, start, end, exdates)
+    ]
+    c.executemany("INSERT OR IGNORE INTO event_occurrences (day, event_id) VALUES (?, ?)", rows)
+    return len(rows)
+
+def _load_window(c):
+    c.execute("SELECT window_start, window_end FROM occurrence_window")
+    row = c.fetchone()
+    return (date.fromisoformat(row[0]), date.fromisoformat(row[1])) if row else None
+
+def _expand_dirty(c, window):
+    """Expand the queued series into the window. Call inside a write transaction."""
+    c.execute("DELETE FROM event_occurrences WHERE event_id IN (SELECT event_id FROM event_occurrences_dirty)")
+    _materialize_series(c, *window, where=" AND id IN (SELECT event_id FROM event_occurrences_dirty)")
+    c.execute("DELETE FROM event_occurrences_dirty")
+
+def extend_occurrences():
+    """Move the materialized window to [today - OCCURRENCE_PAST_DAYS, today + OCCURRENCE_FUTURE_DAYS).
+
+    Only the days entering the window are expanded and only those leaving it are
+    deleted; a missing window (or a clock that went back) rebuilds it.
+    """
+    today = date.today()
+    new_start = today - timedelta(days=OCCURRENCE_PAST_DAYS)
+    new_end = today + timedelta(days=OCCURRENCE_FUTURE_DAYS)
+    conn = db.connect("links.db")
+    try:
+        c = conn.cursor()
+        c.execute("BEGIN IMMEDIATE")
+        window = _load_window(c)
+        if window is None or new_start < window[0] or new_end < window[1]:
+            c.execute("DELETE FROM event_occurrences")
+            c.execute("DELETE FROM event_occurrences_dirty")
+            added_from = new_start
+        else:
+            _expand_dirty(c, window)
+            c.execute("DELETE FROM event_occurrences WHERE day < ?", (new_start.isoformat(),))
+            added_from = window[1]
+        c.execute(
+            "INSERT OR IGNORE INTO event_occurrences (day, event_id) SELECT date, id FROM events "
+            "WHERE date >= ? AND date < ? AND recurrence = '' AND date(date) = date",
+            (added_from.isoformat(), new_end.isoformat()),
+        )
+        _materialize_series(c, added_from, new_end)
+        c.execute(
+            "INSERT OR REPLACE INTO occurrence_window (id, window_start, window_end) VALUES (1, ?, ?)",
+            (new_start.isoformat(), new_end.isoformat()),
+        )
+        c.execute("COMMIT")
+    finally:
+        conn.close()
+
+def load_range(start, end):
+    """Return {"YYYY-MM-DD": [(id, title, day, description, recurrence)]} for days in [start, end), by day.
+
+    Inside the materialized window this is one range scan of event_occurrences
+    (after expanding any series changed since the last read); outside it the
+    series are expanded on the fly.
+    """
+    conn = db.connect("links.db")
+    c = conn.cursor()
+    window = _load_window(c)
+    if window is None or start < window[0] or end > window[1]:
+        conn.close()
+        return expand_range(start, end)
+    c.execute("SELECT 1 FROM event_occurrences_dirty LIMIT 1")
+    if c.fetchone():
+        c.execute("BEGIN IMMEDIATE")
+        _expand_dirty(c, window)
+        c.execute("COMMIT")
+    c.execute(OCCURRENCES_QUERY, (start.isoformat(), end.isoformat()))
+    rows = c.fetchall()
+    conn.close()
+    days = {}
+    for day, event_id, title, description, rule in rows:
+        days.setdefault(day, []).append((event_id, title, day, description, rule))
+    return days
+
+def load_agenda(start=None, limit=AGENDA_LIMIT):
+    """Return the next `limit` occurrences from `start` (default today) within the window."""
+    start = start or date.today()
+    conn = db.connect("links.db")
+    c = conn.cursor()
+    window = _load_window(c)
+    if window is None or start < window[0]:
+        conn.close()
+        return []
+    c.execute("SELECT 1 FROM event_occurrences_dirty LIMIT 1")
+    if c.fetchone():
+        c.execute("BEGIN IMMEDIATE")
+        _expand_dirty(c, window)
+        c.execute("COMMIT")
+    c.execute(AGENDA_QUERY, (start.isoformat(), window[1].isoformat(), limit))
+    rows = c.fetchall()
     conn.close()
+    return [(event_id, title, day, description, rule) for day, event_id, title, description, rule in rows]
 
 init_db()
+jobs.schedule("calendar.extend_occurrences", extend_occurrences, seconds=OCCURRENCE_EXTEND_INTERVAL)
+
+def month_range(year, month):
+    start = date(year, month, 1)
+    return start, (start + timedelta(days=31)).replace(day=1)
+
+def load_month(year, month):
+    return load_range(*month_range(year, month))
+
+def load_events(date_filter):
+    """Events for a "YYYY-MM" month or a "YYYY-MM-DD" day, ordered by day."""
+    if len(date_filter) == 7:
+        start, end = month_range(int(date_filter[:4]), int(date_filter[5:7]))
+    else:
+        start = date.fromisoformat(date_filter)
+        end = start + timedelta(days=1)
+    days = load_range(start, end)
+    return [event for day in sorted(days) for event in days[day]]
+
+# --- iCalendar import/export, streamed both ways ---
+ICS_EXPORT_QUERY = "SELECT uid, title, date, description, recurrence, exdates FROM events ORDER BY id"
+# Dedup by UID; unchanged events are left alone so they don't look edited to the Google sync
+ICS_UPSERT_QUERY = (
+    "INSERT INTO events (uid, title, date, description, recurrence, exdates) VALUES (?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT(uid) DO UPDATE SET title = excluded.title, date = excluded.date, "
+    "description = excluded.description, recurrence = excluded.recurrence, exdates = excluded.exdates "
+    "WHERE events.title IS NOT excluded.title OR events.date IS NOT excluded.date "
+    "OR events.description IS NOT excluded.description OR events.recurrence IS NOT excluded.recurrence "
+    "OR events.exdates IS NOT excluded.exdates"
+)
+IMPORT_BATCH = 2000  # events per executemany and transaction
+IMPORT_DIR = os.path.join("exports", "calendar_import")
+EXPORT_DIR = "exports"
+IMPORT_ERRORS_KEPT = 20
+
+def ics_uid(record):
+    """The event's UID, or one derived from DTSTART, SUMMARY and RRULE so re-imports still dedup."""
+    uid = record.get("UID", "").strip()
+    if uid:
+        return uid
+    key = "\n".join(record.get(name, "").strip() for name in ("DTSTART", "SUMMARY", "RRULE"))
+    return hashlib.sha256(key.encode()).hexdigest()[:32] + "@homepage"
+
+def ics_row(record):
+    """Turn an ical.iter_vevents() dict into an ICS_UPSERT_QUERY row; ValueError if it can't be stored."""
+    if record.get("STATUS", "").strip().upper() == "CANCELLED":
+        raise ValueError("cancelled")
+    if "RECURRENCE-ID" in record:
+        raise ValueError("changes to a single occurrence are not supported")
+    if "DTSTART" not in record:
+        raise ValueError("no DTSTART")
+    day = ical.parse_date(record["DTSTART"]).isoformat()
+    exdates = ",".join(sorted({ical.parse_date(value).isoformat() for value in record["EXDATE"]}))
+    rule = record.get("RRULE", "").strip()
+    try:
+        recurrence.parse(rule)
+    except ValueError as e:
+        # Stored, it would show on the wrong days (or only its first), so report it instead
+        raise ValueError(f"unsupported RRULE: {e}") from None
+    return (
+        ics_uid(record),
+        record.get("SUMMARY", "Untitled"),
+        day,
+        record.get("DESCRIPTION", ""),
+        rule,
+        exdates,
+    )
+
+def import_ics(job, filename):
+    """Stream the VEVENTs of an .ics (or .ics.gz) file into events in IMPORT_BATCH transactions.
+
+    Events whose UID is already known update that event; see ics_uid() for events
+    without one. Memory stays at one batch whatever the file size. Progress is the
+    share of the file read; `job` may be None. Returns {"imported", "skipped", "errors"}.
+    """
+    imported, skipped, errors = 0, 0, []
+    progress = job.set_progress if job is not None else None
+    conn = db.connect("links.db")
+    try:
+        c = conn.cursor()
+        number = 0
+        lines = export.iter_lines(filename, progress=progress)
+        for batch in export.chunked(ical.iter_vevents(lines), IMPORT_BATCH):
+            rows = []
+            for record in batch:
+                number += 1
+                try:
+                    rows.append(ics_row(record))
+                except ValueError as e:
+                    skipped += 1
+                    if len(errors) < IMPORT_ERRORS_KEPT:
+                        errors.append(f"Event {number} ({record.get('UID', 'no UID')}): {e}")
+            c.executemany(ICS_UPSERT_QUERY, rows)
+            conn.commit()
+            imported += len(rows)
+            if job is not None:
+                job.check_cancelled()
+                job.set_progress(job.progress, f"{imported} events imported")
+    finally:
+        conn.close()
+        if imported:
+            events.publish("events", "import", None, count=imported)
+    return {"imported": imported, "skipped": skipped, "errors": errors}
+
+def _ics_events(rows):
+    for uid, title, day, description, rule, exdates in rows:
+        try:
+            day = date.fromisoformat(day)
+        except (TypeError, ValueError):
+            continue
+        rule = (rule or "").strip()
+        if rule.upper().startswith("RRULE:"):
+            rule = rule[6:]
+        if "=" not in rule:
+            # Legacy keywords ("weekly") become FREQ=...; RRULEs go out as stored, even ones we can't expand
+            rule = recurrence.format_rule(recurrence.parse(rule)) if rule.upper() in recurrence.FREQS else ""
+        yield uid, title or "", day, description, rule, sorted(parse_exdates(exdates)) if rule else ()
+
+def export_ics(filename):
+    """Stream every event from the table to an .ics (or .ics.gz) file; returns the number of lines."""
+    conn = db.connect("links.db")
+    try:
+        c = conn.cursor()
+        c.execute(ICS_EXPORT_QUERY)
+        return export.export_lines(ical.calendar_lines(_ics_events(c)), filename, newline="\r\n")
+    finally:
+        conn.close()
 
 def render():
     with ui.card().classes("p-6 bg-gray-700"):
@@ -36,59 +398,35 @@ def render():
         ).classes("bg-gray-600 text-white rounded w-32")
         calendar_grid = ui.grid(columns=7).classes("w-full mb-4")
         events_list = ui.list().classes("w-full")
-
-        def load_events(date_filter):
-            conn = sqlite3.connect("links.db")
-            c = conn.cursor()
-            c.execute(
-                "SELECT id, title, date, description, recurrence FROM events WHERE date LIKE ? OR (recurrence != '' AND (strftime('%Y-%m', date) <= ?))",
-                (f"{date_filter}%", f"{date_filter}"),
-            )
-            events = c.fetchall()
-            filtered_events = []
-            for event in events:
-                eid, title, date_str, desc, recurrence = event
-                if recurrence == '':
-                    if date_str.startswith(date_filter):
-                        filtered_events.append(event)
-                else:
-                    event_date = datetime.strptime(date_str, "%Y-%m-%d")
-                    year_month = datetime.strptime(date_filter, "%Y-%m")
-                    if recurrence == 'weekly':
-                        if event_date.weekday() == year_month.weekday():
-                            filtered_events.append(event)
-                        else:
-                            filtered_events.append(event)
-                    elif recurrence == 'monthly':
-                        if event_date.day == year_month.day:
-                            filtered_events.append(event)
-                        else:
-                            filtered_events.append(event)
-                    else:
-                        filtered_events.append(event)
-            return filtered_events
+        ui.label("Upcoming").classes("text-lg font-semibold text-gray-100 mt-4")
+        agenda_list = ui.list().classes("w-full mb-4")
 
         def save_event(title, date, description, recurrence=''):
-            conn = sqlite3.connect("links.db")
+            conn = db.connect("links.db")
             c = conn.cursor()
             c.execute(
                 "INSERT INTO events (title, date, description, recurrence) VALUES (?, ?, ?, ?)",
                 (title, date, description, recurrence),
             )
             conn.commit()
+            event_id = c.lastrowid
             conn.close()
+            events.row_inserted("events", event_id, date=date, recurrence=recurrence)
 
         def delete_event(event_id):
-            conn = sqlite3.connect("links.db")
+            conn = db.connect("links.db")
             c = conn.cursor()
             c.execute("DELETE FROM events WHERE id = ?", (event_id,))
             conn.commit()
             conn.close()
-            refresh_events()
+            events.row_deleted("events", event_id)
+
+        day_events = {}  # "YYYY-MM-DD" -> events of the shown month
 
+        @metrics.timed("calendar.render_calendar")
         def render_calendar():
             calendar_grid.clear()
-            cal = calendar.monthcalendar(year.value, month.value)
+            cal = calendar.monthcalendar(int(year.value), month.value)
             with calendar_grid:
                 for day in ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]:
                     ui.label(day).classes("text-gray-400 font-semibold text-center")
@@ -98,13 +436,12 @@ def render():
                             ui.label("").classes("p-2 bg-gray-600 rounded text-center")
                         else:
                             date_str = f"{int(year.value)}-{month.value:02d}-{day:02d}"
-                            events = load_events(date_str)
                             with ui.element("div").classes(
                                 "p-2 bg-gray-600 rounded text-center"
                             ):
                                 ui.label(str(day)).classes("text-gray-100")
-                                if events:
-                                    ui.label(f"{len(events)} event(s)").classes(
+                                if day_events.get(date_str):
+                                    ui.label(f"{len(day_events[date_str])} event(s)").classes(
                                         "text-blue-400 text-xs cursor-pointer"
                                     ).on("click", lambda d=date_str: show_day_events(d))
 
@@ -113,7 +450,7 @@ def render():
                 "p-4 bg-gray-700"
             ):
                 ui.label(f"Events on {date}").classes("text-gray-100")
-                for event_id, title, _, description in load_events(date):
+                for event_id, title, _, description, _ in day_events.get(date, []):
                     with ui.row().classes("items-center"):
                         ui.label(title).classes("text-gray-100")
                         ui.button(
@@ -121,7 +458,6 @@ def render():
                             on_click=lambda e=event_id: [
                                 delete_event(e),
                                 dialog.close(),
-                                refresh_events(),
                             ],
                         ).classes(
                             "bg-red-600 hover:bg-red-500 text-white rounded px-2 py-1"
@@ -159,7 +495,6 @@ def render():
                         "Save",
                         on_click=lambda: [
                             save_event(title.value, date.value, description.value, recurrence.value),
-                            refresh_events(),
                             dialog.close(),
                         ],
                     ).classes(
@@ -170,22 +505,42 @@ def render():
                     )
             dialog.open()
 
+        @metrics.timed("calendar.refresh_events")
         def refresh_events():
+            # The grid and the list share one range query for the whole month
+            day_events.clear()
+            day_events.update(load_month(int(year.value), month.value))
             render_calendar()
             events_list.clear()
-            date_filter = f"{int(year.value)}-{month.value:02d}"
-            for event_id, title, date, description in load_events(date_filter):
-                with events_list:
-                    with ui.row().classes("items-center"):
-                        ui.label(f"{date} - {title}").classes("text-gray-100")
-                        ui.button(
-                            "Delete", on_click=lambda e=event_id: delete_event(e)
-                        ).classes(
-                            "bg-red-600 hover:bg-red-500 text-white rounded px-2 py-1"
-                        )
+            for day in sorted(day_events):
+                for event_id, title, date, description, _ in day_events[day]:
+                    with events_list:
+                        with ui.row().classes("items-center"):
+                            ui.label(f"{date} - {title}").classes("text-gray-100")
+                            ui.button(
+                                "Delete", on_click=lambda e=event_id: delete_event(e)
+                            ).classes(
+                                "bg-red-600 hover:bg-red-500 text-white rounded px-2 py-1"
+                            )
 
-        year.on("change", refresh_events)
-        month.on("change", refresh_events)
+        @metrics.timed("calendar.refresh_agenda")
+        def refresh_agenda():
+            agenda_list.clear()
+            with agenda_list:
+                for _, title, date, _, _ in load_agenda():
+                    ui.label(f"{date} - {title}").classes("text-gray-100")
+
+        def on_event_changed(e):
+            refresh_agenda()
+            shown_month = f"{int(year.value)}-{month.value:02d}"
+            date = e.data.get("date")
+            # Deletes and bulk changes carry no date; recurring events can land in any month
+            if date is None or e.data.get("recurrence") or date.startswith(shown_month):
+                refresh_events()
+
+        events.listen("events", on_event_changed)
+        year.on_value_change(lambda: refresh_events() if year.value else None)
+        month.on_value_change(refresh_events)
         ui.button("Add Event", on_click=add_event).classes(
             "bg-blue-600 hover:bg-blue-500 text-white rounded px-4 py-2 mb-4"
         )
@@ -195,72 +550,63 @@ def render():
         ui.button("Sync with Google Calendar", on_click=sync_with_google_calendar).classes(
             "bg-blue-600 hover:bg-blue-500 text-white rounded px-4 py-2 mb-4"
         )
+
+        async def import_file(e):
+            # Saved to disk first so the import streams from a file, not from memory
+            os.makedirs(IMPORT_DIR, exist_ok=True)
+            path = os.path.join(IMPORT_DIR, os.path.basename(e.file.name))
+            await e.file.save(path)
+            try:
+                result = await jobs.run(f"calendar.import:{path}", import_ics, path, report=True)
+            except Exception as ex:
+                ui.notify(f"Import failed: {str(ex)}", type="negative")
+                return
+            finally:
+                os.remove(path)
+            ui.notify(f"Imported {result['imported']} events", type="positive")
+            if result["skipped"]:
+                ui.notify(
+                    f"Skipped {result['skipped']} events: " + "; ".join(result["errors"][:3]),
+                    type="warning",
+                    multi_line=True,
+                )
+
+        async def export_file():
+            os.makedirs(EXPORT_DIR, exist_ok=True)
+            path = os.path.join(EXPORT_DIR, "calendar.ics")
+            try:
+                await jobs.run("calendar.export_ics", export_ics, path)
+            except Exception as ex:
+                ui.notify(f"Export failed: {str(ex)}", type="negative")
+                return
+            ui.download(path, "calendar.ics")
+
+        with ui.row().classes("items-center mb-4"):
+            ui.upload(label="Import .ics", auto_upload=True, on_upload=import_file).props(
+                "accept=.ics,.gz"
+            ).classes("bg-gray-600 text-white rounded")
+            ui.button("Export .ics", on_click=export_file).classes(
+                "bg-gray-600 hover:bg-gray-500 text-white rounded px-4 py-2"
+            )
         refresh_events()
+        refresh_agenda()
 
 def export_events():
     from core import gdrive
     gdrive.export_events_to_json("events.json")
     gdrive.upload_file_stub("events.json")
 
-def sync_with_google_calendar():
-    SCOPES = ["https://www.googleapis.com/auth/calendar"]
-    creds = None
-    creds_list = get_credentials()
-    for cred in creds_list:
-        id_, name, server_type, url, username, password, token, extra, created_at = cred
-        if "google" in name.lower() or "google" in server_type.lower():
-            try:
-                from google.oauth2.credentials import Credentials
-                creds = Credentials(token=token, scopes=SCOPES)
-                break
-            except Exception:
-                continue
-    if not creds:
-        if os.path.exists("token.json"):
-            from google.oauth2.credentials import Credentials
-            creds = Credentials.from_authorized_user_file("token.json", SCOPES)
-        else:
-            flow = InstalledAppFlow.from_client_secrets_file("credentials.json", SCOPES)
-            creds = flow.run_local_server(port=0)
-            with open("token.json", "w") as token:
-                token.write(creds.to_json())
-    service = build("calendar", "v3", credentials=creds)
-
-    conn = sqlite3.connect("links.db")
-    c = conn.cursor()
-    c.execute("SELECT id, title, date, description, recurrence FROM events")
-    local_events = c.fetchall()
-    conn.close()
-
-    calendar_id = "primary"
-    gcal_events = service.events().list(calendarId=calendar_id, maxResults=100).execute().get("items", [])
-
-    for event_id, title, date, description, recurrence in local_events:
-        event = {
-            "summary": title,
-            "description": description,
-            "start": {"date": date},
-            "end": {"date": date},
-        }
-        if recurrence:
-            event["recurrence"] = [f"RRULE:FREQ={recurrence.upper()}"]
-        service.events().insert(calendarId=calendar_id, body=event).execute()
-
-    for gcal_event in gcal_events:
-        title = gcal_event.get("summary", "Untitled")
-        date = gcal_event.get("start", {}).get("date")
-        description = gcal_event.get("description", "")
-        recurrence = gcal_event.get("recurrence", [""])[0].split("FREQ=")[-1] if gcal_event.get("recurrence") else ""
-        conn = sqlite3.connect("links.db")
-        c = conn.cursor()
-        c.execute(
-            "INSERT OR IGNORE INTO events (title, date, description, recurrence) VALUES (?, ?, ?, ?)",
-            (title, date, description, recurrence.lower())
-        )
-        conn.commit()
-        conn.close()
-
-    ui.notify("Synced with Google Calendar", type="positive")
+async def sync_with_google_calendar():
+    from core import gcal
+    try:
+        result = await jobs.run("calendar.gcal_sync", gcal.sync, report=True)
+    except Exception as ex:
+        ui.notify(f"Sync failed: {str(ex)}", type="negative")
+        return
+    message = f"Synced with Google Calendar: {result['pulled']} changes received, {result['pushed']} sent"
+    if result["failed"]:
+        message += f", {result['failed']} to retry"
+    ui.notify(message, type="warning" if result["failed"] else "positive")
 
 marketplace_info = {
     "name": "Calendar",
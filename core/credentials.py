@@ -1,11 +1,11 @@
 from nicegui import ui
-import sqlite3
+from core import db
 from datetime import datetime
 from cryptography.fernet import Fernet
 import os
-import json
 from core import gdrive
-import requests
+from core import export
+from core import httpclient
 from core.settings import load_setting
 
 DB_FILE = "links.db"
@@ -29,7 +29,7 @@ cipher = Fernet(load_key())
 
 # --- DB Setup ---
 def init_db():
-    conn = sqlite3.connect(DB_FILE)
+    conn = db.connect(DB_FILE)
     c = conn.cursor()
     c.execute(
         """
@@ -86,7 +86,7 @@ def show_credentials_ui():
         cred_list = ui.list().classes("w-full")
 
         def load_credentials():
-            conn = sqlite3.connect(DB_FILE)
+            conn = db.connect(DB_FILE)
             c = conn.cursor()
             c.execute("SELECT id, name, server_type, url, username, password, token, extra, created_at FROM credentials ORDER BY created_at DESC")
             creds = c.fetchall()
@@ -102,7 +102,7 @@ def show_credentials_ui():
         def save_credential(name, server_type, url, username, password, token, extra):
             enc_password = encrypt_field(password)
             enc_token = encrypt_field(token)
-            conn = sqlite3.connect(DB_FILE)
+            conn = db.connect(DB_FILE)
             c = conn.cursor()
             c.execute(
                 "INSERT INTO credentials (name, server_type, url, username, password, token, extra, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
@@ -113,7 +113,7 @@ def show_credentials_ui():
             refresh()
 
         def delete_credential(cred_id):
-            conn = sqlite3.connect(DB_FILE)
+            conn = db.connect(DB_FILE)
             c = conn.cursor()
             c.execute("DELETE FROM credentials WHERE id = ?", (cred_id,))
             conn.commit()
@@ -142,7 +142,7 @@ def show_credentials_ui():
         def update_credential(cred_id, name, server_type, url, username, password, token, extra):
             enc_password = encrypt_field(password)
             enc_token = encrypt_field(token)
-            conn = sqlite3.connect(DB_FILE)
+            conn = db.connect(DB_FILE)
             c = conn.cursor()
             c.execute(
                 "UPDATE credentials SET name=?, server_type=?, url=?, username=?, password=?, token=?, extra=? WHERE id=?",
@@ -184,7 +184,7 @@ def show_credentials_ui():
                     ).classes("bg-gray-600 hover:bg-gray-500 text-white rounded px-4 py-2")
                 dialog.open()
 
-        def test_credential(cred):
+        async def test_credential(cred):
             cred_id, name, server_type, url, username, password, token, extra, _ = cred
             status = "Unknown"
             headers = {}
@@ -192,13 +192,13 @@ def show_credentials_ui():
                 headers["Authorization"] = f"token {token}"
             try:
                 if server_type == "gitea":
-                    r = requests.get(f"{url}/api/v1/version", headers=headers, timeout=5)
+                    r = await httpclient.aget("credentials", f"{url}/api/v1/version", headers=headers, timeout=5)
                     if r.status_code == 200:
                         status = f"Valid (Gitea v{r.json().get('version','?')})"
                     else:
                         status = f"Invalid: {r.status_code} {r.text}"
                 elif server_type == "github":
-                    r = requests.get("https://api.github.com/user", headers=headers, timeout=5)
+                    r = await httpclient.aget("credentials", "https://api.github.com/user", headers=headers, timeout=5)
                     if r.status_code == 200:
                         status = f"Valid (GitHub user: {r.json().get('login','?')})"
                     else:
@@ -209,25 +209,6 @@ def show_credentials_ui():
                 status = f"Error: {e}"
             ui.notify(f"Test Credential '{name}': {status}", type="positive" if "Valid" in status else "negative")
 
-        def export_credentials_to_json(filename="credentials_export.json"):
-            creds = load_credentials()
-            export_list = []
-            for cred in creds:
-                id_, name, server_type, url, username, password, token, extra, created_at = cred
-                export_list.append({
-                    "id": id_,
-                    "name": name,
-                    "server_type": server_type,
-                    "url": url,
-                    "username": username,
-                    "password": password,
-                    "token": token,
-                    "extra": extra,
-                    "created_at": created_at
-                })
-            with open(filename, "w", encoding="utf-8") as f:
-                json.dump(export_list, f, ensure_ascii=False, indent=4)
-            gdrive.upload_file_stub(filename)
 
         def refresh():
             cred_list.clear()
@@ -250,7 +231,7 @@ def show_credentials_ui():
 
 # --- Helper for other modules ---
 def get_credentials():
-    conn = sqlite3.connect(DB_FILE)
+    conn = db.connect(DB_FILE)
     c = conn.cursor()
     c.execute("SELECT id, name, server_type, url, username, password, token, extra, created_at FROM credentials ORDER BY created_at DESC")
     creds = c.fetchall()
@@ -263,8 +244,16 @@ def get_credentials():
         decrypted_creds.append((id_, name, server_type, url, username, decrypted_password, decrypted_token, extra, created_at))
     return decrypted_creds
 
+def export_credentials_to_json(filename="credentials_export.json"):
+    export.export_rows(
+        get_credentials(),
+        ["id", "name", "server_type", "url", "username", "password", "token", "extra", "created_at"],
+        filename,
+    )
+    gdrive.upload_file_stub(filename)
+
 def get_credential_by_id(cred_id):
-    conn = sqlite3.connect(DB_FILE)
+    conn = db.connect(DB_FILE)
     c = conn.cursor()
     c.execute("SELECT id, name, server_type, url, username, password, token, extra, created_at FROM credentials WHERE id = ?", (cred_id,))
     cred = c.fetchone()
@@ -0,0 +1,7 @@
+import sqlite3
+from core import metrics
+
+
+def connect(path, **kwargs):
+    """sqlite3.connect with per-statement timing and the slow-query log."""
+    return sqlite3.connect(path, factory=metrics.TimedConnection, **kwargs)
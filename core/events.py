@@ -0,0 +1,107 @@
+from nicegui import app, background_tasks, ui
+import asyncio
+import threading
+from collections import namedtuple
+
+# Topics are table names ("notes", "todos", "rss_items", ...) for row changes
+# and "job.submitted" / "job.finished" for background jobs.
+Event = namedtuple("Event", "topic action id data")
+
+_lock = threading.Lock()
+_subscribers = {}  # topic -> [callback(event)]
+_loop = None
+
+
+def _capture_loop():
+    global _loop
+    _loop = asyncio.get_running_loop()
+
+
+app.on_startup(_capture_loop)
+
+
+def subscribe(topic, callback):
+    """Call callback(event) for every event on topic. Returns an unsubscribe function."""
+    with _lock:
+        _subscribers.setdefault(topic, []).append(callback)
+
+    def unsubscribe():
+        with _lock:
+            if callback in _subscribers.get(topic, []):
+                _subscribers[topic].remove(callback)
+
+    return unsubscribe
+
+
+def _dispatch(event):
+    with _lock:
+        callbacks = list(_subscribers.get(event.topic, ()))
+    for callback in callbacks:
+        try:
+            callback(event)
+        except Exception as e:
+            print(f"Event handler for {event.topic} failed: {e}")
+
+
+def publish(topic, action, id=None, /, **data):
+    """Publish an event. Safe to call from worker threads: handlers always run on
+    the event loop, immediately if already there, otherwise as soon as possible."""
+    event = Event(topic, action, id, data)
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is not None or _loop is None or _loop.is_closed():
+        _dispatch(event)
+    else:
+        _loop.call_soon_threadsafe(_dispatch, event)
+
+
+def row_inserted(table, id=None, /, **data):
+    publish(table, "insert", id, **data)
+
+
+def row_updated(table, id=None, /, **data):
+    publish(table, "update", id, **data)
+
+
+def row_deleted(table, id=None, /, **data):
+    publish(table, "delete", id, **data)
+
+
+def listen(topic, callback):
+    """Subscribe for the lifetime of the current page.
+
+    The handler (sync or async) runs inside the page's client context so it
+    can create elements, and is removed when the client goes away.
+    """
+    client = ui.context.client
+
+    async def run_async(event):
+        with client:
+            await callback(event)
+
+    def handler(event):
+        if asyncio.iscoroutinefunction(callback):
+            background_tasks.create(run_async(event), name=f"event:{topic}")
+            return
+        with client:
+            callback(event)
+
+    handler.client_id = client.id
+    unsubscribe = subscribe(topic, handler)
+    client.on_delete(unsubscribe)
+    return unsubscribe
+
+
+def subscriber_counts():
+    """Return ({topic: subscribers}, {client_id: page listeners}) for diagnostics."""
+    with _lock:
+        handlers = [(topic, cb) for topic, callbacks in _subscribers.items() for cb in callbacks]
+    topics, clients = {}, {}
+    for topic, callback in handlers:
+        topics[topic] = topics.get(topic, 0) + 1
+        client_id = getattr(callback, "client_id", None)
+        if client_id is not None:
+            clients[client_id] = clients.get(client_id, 0) + 1
+    return topics, clients
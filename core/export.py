@@ -0,0 +1,375 @@
+import csv
+import gzip
+import io
+import json
+import os
+from core import db
+
+CHUNK_SIZE = 1000
+FORMATS = ("json", "jsonl", "csv", "columnar", "parquet")
+COMPRESSIONS = {".gz": "gzip", ".zst": "zstd"}
+
+
+def detect(filename):
+    """Return (format, compression) from a name like notes.jsonl.gz."""
+    root, ext = os.path.splitext(filename)
+    compression = COMPRESSIONS.get(ext)
+    if compression:
+        root, ext = os.path.splitext(root)
+    fmt = ext.lstrip(".").lower()
+    return (fmt if fmt in FORMATS else "json"), compression
+
+
+def _open_output(path, compression):
+    if compression == "gzip":
+        f = gzip.open(path, "wb", compresslevel=6)
+    elif compression == "zstd":
+        try:
+            import zstandard
+        except ImportError as e:
+            raise ImportError("zstd compression needs the zstandard package") from e
+        f = zstandard.ZstdCompressor().stream_writer(open(path, "wb"), closefd=True)
+    elif compression is None:
+        f = open(path, "wb")
+    else:
+        raise ValueError(f"Unknown compression: {compression}")
+    return io.TextIOWrapper(f, encoding="utf-8", newline="")
+
+
+def iter_chunks(cursor, chunk_size=CHUNK_SIZE):
+    """Yield lists of rows with fetchmany so only one chunk is ever in memory."""
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            return
+        yield rows
+
+
+def chunked(rows, chunk_size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= chunk_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# --- Writers: each takes an open file, the column names and an iterator of row chunks ---
+def _write_json_array(f, columns, chunks):
+    count = 0
+    f.write("[")
+    for chunk in chunks:
+        for row in chunk:
+            f.write(",\n" if count else "\n")
+            f.write(json.dumps(dict(zip(columns, row)), ensure_ascii=False))
+            count += 1
+    f.write("\n]" if count else "]")
+    return count
+
+
+def _write_json(f, columns, chunks):
+    count = _write_json_array(f, columns, chunks)
+    f.write("\n")
+    return count
+
+
+def _write_jsonl(f, columns, chunks):
+    count = 0
+    for chunk in chunks:
+        f.write("".join(json.dumps(dict(zip(columns, row)), ensure_ascii=False, separators=(",", ":")) + "\n" for row in chunk))
+        count += len(chunk)
+    return count
+
+
+def _write_csv(f, columns, chunks):
+    writer = csv.writer(f)
+    writer.writerow(columns)
+    count = 0
+    for chunk in chunks:
+        writer.writerows(chunk)
+        count += len(chunk)
+    return count
+
+
+def _write_columnar(f, columns, chunks):
+    """One JSON line per chunk holding column-major arrays (a row group)."""
+    count = 0
+    for chunk in chunks:
+        data = [list(values) for values in zip(*chunk)]
+        f.write(json.dumps({"columns": columns, "rows": len(chunk), "data": data}, ensure_ascii=False) + "\n")
+        count += len(chunk)
+    return count
+
+
+def _write_parquet(path, columns, chunks, compression):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Parquet export needs the pyarrow package; use the columnar format instead") from e
+    writer = None
+    count = 0
+    try:
+        for chunk in chunks:
+            table = pa.Table.from_pydict({name: list(values) for name, values in zip(columns, zip(*chunk))})
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema, compression=compression or "snappy")
+            writer.write_table(table)
+            count += len(chunk)
+        if writer is None:
+            # No rows to take types from: an empty file whose columns are all null-typed
+            schema = pa.schema([(name, pa.null()) for name in columns])
+            writer = pq.ParquetWriter(path, schema, compression=compression or "snappy")
+    finally:
+        if writer is not None:
+            writer.close()
+    return count
+
+
+WRITERS = {
+    "json": _write_json,
+    "jsonl": _write_jsonl,
+    "csv": _write_csv,
+    "columnar": _write_columnar,
+}
+
+
+def _export_chunks(chunks, columns, filename, fmt=None, compression=None, transform=None):
+    detected_fmt, detected_compression = detect(filename)
+    fmt = fmt or detected_fmt
+    compression = compression or detected_compression
+    if transform:
+        chunks = ([transform(row) for row in chunk] for chunk in chunks)
+    columns = list(columns)
+    # Write to a temporary name so a failed export never leaves a truncated file behind
+    tmp_path = f"{filename}.tmp"
+    try:
+        if fmt == "parquet":
+            count = _write_parquet(tmp_path, columns, chunks, compression)
+        elif fmt in WRITERS:
+            with _open_output(tmp_path, compression) as f:
+                count = WRITERS[fmt](f, columns, chunks)
+        else:
+            raise ValueError(f"Unknown export format: {fmt}")
+        os.replace(tmp_path, filename)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return count
+
+
+def export_cursor(cursor, filename, fmt=None, compression=None, columns=None, transform=None, chunk_size=CHUNK_SIZE):
+    """Stream an executed cursor to filename and return the number of rows written.
+
+    The format and compression default to the file name (e.g. todos.csv.gz).
+    `columns` overrides the names from the cursor; `transform` maps each row tuple.
+    """
+    columns = columns or [d[0] for d in cursor.description]
+    return _export_chunks(iter_chunks(cursor, chunk_size), columns, filename, fmt, compression, transform)
+
+
+def export_query(db_path, sql, filename, params=(), **kwargs):
+    """Run sql against db_path and stream the result to filename."""
+    conn = db.connect(db_path)
+    try:
+        c = conn.cursor()
+        c.execute(sql, params)
+        return export_cursor(c, filename, **kwargs)
+    finally:
+        conn.close()
+
+
+def export_rows(rows, columns, filename, fmt=None, compression=None, transform=None, chunk_size=CHUNK_SIZE):
+    """Stream any iterable of row tuples (e.g. a generator) to filename."""
+    return _export_chunks(chunked(rows, chunk_size), columns, filename, fmt, compression, transform)
+
+
+def export_json_sections(filename, sections, compression=None, chunk_size=CHUNK_SIZE):
+    """Write {"name": [records...], ...} with each section streamed from a cursor."""
+    compression = compression or detect(filename)[1]
+    tmp_path = f"{filename}.tmp"
+    try:
+        with _open_output(tmp_path, compression) as f:
+            f.write("{")
+            for i, (name, cursor) in enumerate(sections.items()):
+                columns = [d[0] for d in cursor.description]
+                f.write(f'{", " if i else ""}{json.dumps(name)}: ')
+                _write_json_array(f, columns, iter_chunks(cursor, chunk_size))
+            f.write("}\n")
+        os.replace(tmp_path, filename)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def export_lines(lines, filename, compression=None, newline="\n"):
+    """Stream an iterable of text lines (without newlines) to filename; returns the count."""
+    compression = compression or detect(filename)[1]
+    tmp_path = f"{filename}.tmp"
+    count = 0
+    try:
+        with _open_output(tmp_path, compression) as f:
+            for chunk in chunked(lines, CHUNK_SIZE):
+                f.write("".join(line + newline for line in chunk))
+                count += len(chunk)
+        os.replace(tmp_path, filename)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return count
+
+
+# --- Readers: stream records back from the formats above, one at a time ---
+READ_BLOCK = 64 * 1024
+MAX_ELEMENT = 16 * 2**20  # characters; a JSON element that never closes is malformed, not large
+
+
+class _ReadProgress(io.RawIOBase):
+    """Pass reads through to a file and report the fraction of its bytes read so far.
+
+    Counts the file's own bytes, so progress is right for compressed files too.
+    """
+
+    def __init__(self, f, callback):
+        self.f = f
+        self.callback = callback
+        self.size = os.fstat(f.fileno()).st_size or 1
+        self.read_bytes = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        n = self.f.readinto(buffer)
+        self.read_bytes += n or 0
+        self.callback(min(1.0, self.read_bytes / self.size))
+        return n
+
+
+def _open_input(f, compression):
+    """Wrap the binary file f for text reading; closing the result doesn't always close f."""
+    if compression == "gzip":
+        f = gzip.open(f, "rb")
+    elif compression == "zstd":
+        try:
+            import zstandard
+        except ImportError as e:
+            raise ImportError("zstd compression needs the zstandard package") from e
+        f = zstandard.ZstdDecompressor().stream_reader(f)
+    elif compression is None:
+        pass
+    else:
+        raise ValueError(f"Unknown compression: {compression}")
+    # utf-8-sig drops the byte order mark spreadsheet programs put in front of CSV files
+    return io.TextIOWrapper(f, encoding="utf-8-sig", newline="")
+
+
+def _read_json_array(f):
+    """Yield the elements of a top-level JSON array without loading the whole file."""
+    decoder = json.JSONDecoder()
+    buf = ""
+    while not buf:
+        block = f.read(READ_BLOCK)
+        if not block:
+            break
+        buf = block.lstrip()
+    if not buf.startswith("["):
+        raise ValueError("Expected a JSON array")
+    pos = 1
+    while True:
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+            if pos < len(buf):
+                break
+            buf, pos = f.read(READ_BLOCK), 0
+            if not buf:
+                raise ValueError("Unterminated JSON array")
+        if buf[pos] == "]":
+            return
+        while True:
+            try:
+                value, end = decoder.raw_decode(buf, pos)
+                if end < len(buf) and buf[end] in " \t\r\n,]":
+                    break
+                # A number cut off by the end of the block ("12" of "125") continues in the next one
+                error = None
+            except json.JSONDecodeError as e:
+                error = e  # the element continues in the next block, or is malformed
+            more = f.read(READ_BLOCK)
+            if not more:
+                if error is not None:
+                    raise error
+                break
+            if len(buf) - pos > MAX_ELEMENT:
+                raise ValueError("JSON element too large or malformed")
+            buf, pos = buf[pos:] + more, 0
+        yield value
+        pos = end
+
+
+def _read_jsonl(f):
+    for number, line in enumerate(f, 1):
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Line {number}: {e}") from e
+
+
+def _read_csv(f):
+    yield from csv.DictReader(f)
+
+
+def _read_columnar(f):
+    for line in f:
+        if line.strip():
+            group = json.loads(line)
+            for row in zip(*group["data"]):
+                yield dict(zip(group["columns"], row))
+
+
+READERS = {
+    "json": _read_json_array,
+    "jsonl": _read_jsonl,
+    "csv": _read_csv,
+    "columnar": _read_columnar,
+}
+
+
+def _read(filename, compression, progress):
+    raw = open(filename, "rb")
+    try:
+        source = io.BufferedReader(_ReadProgress(raw, progress), READ_BLOCK) if progress else raw
+        return raw, _open_input(source, compression)
+    except Exception:
+        raw.close()
+        raise
+
+
+def iter_records(filename, fmt=None, compression=None, progress=None):
+    """Yield each record of an exported file as a dict, holding only one block in memory.
+
+    The format and compression default to the file name, as for export. If
+    given, progress(fraction) is called as the file is read.
+    """
+    detected_fmt, detected_compression = detect(filename)
+    fmt = fmt or detected_fmt
+    if fmt not in READERS:
+        raise ValueError(f"Unknown import format: {fmt}")
+    raw, f = _read(filename, compression or detected_compression, progress)
+    with raw, f:
+        yield from READERS[fmt](f)
+
+
+def iter_lines(filename, compression=None, progress=None):
+    """Yield the lines of a (possibly compressed) text file without their newlines."""
+    raw, f = _read(filename, compression or detect(filename)[1], progress)
+    with raw, f:
+        for line in f:
+            yield line.rstrip("\r\n")
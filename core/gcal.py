@@ -0,0 +1,343 @@
+"""Two-way incremental sync between the events table and a Google Calendar.
+
+Remote changes come from events.list with the syncToken stored after the last
+run; local changes are rows whose updated_at moved past the last push. The
+gcal_events table maps local ids to remote ids and etags, so our own writes are
+recognised when they come back and updates are sent with If-Match. Writes go out
+in batch requests of BATCH_SIZE. When the two sides changed the same event, the
+later edit wins.
+
+Set GOOGLE_CALENDAR_API_URL to point the sync at another server, such as
+scripts/fake_gcal.py, instead of googleapis.com.
+"""
+from core import db
+from core import events
+from core import export
+from core import recurrence
+from core.credentials import get_credentials
+from datetime import date, timedelta
+from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
+from googleapiclient.http import BatchHttpRequest
+import os
+
+SCOPES = ["https://www.googleapis.com/auth/calendar"]
+CALENDAR_ID = "primary"
+API_URL = os.getenv("GOOGLE_CALENDAR_API_URL", "").rstrip("/")
+PAGE_SIZE = 2500  # events.list maximum
+BATCH_SIZE = 50  # requests per batch call, the Calendar API limit
+NOW = "strftime('%Y-%m-%dT%H:%M:%fZ', 'now')"  # same format as the API's `updated`
+
+
+def init_db():
+    conn = db.connect("links.db")
+    c = conn.cursor()
+    c.execute("PRAGMA table_info(events)")
+    if "updated_at" not in {row[1] for row in c.fetchall()}:
+        c.execute("ALTER TABLE events ADD COLUMN updated_at TEXT")
+    c.execute(f"UPDATE events SET updated_at = {NOW} WHERE updated_at IS NULL")
+    # gcal_deleted keeps the remote ids of deleted mapped events until the delete is pushed
+    c.executescript(
+        f"""
+        CREATE INDEX IF NOT EXISTS idx_events_updated ON events(updated_at);
+        CREATE TABLE IF NOT EXISTS gcal_events (
+            event_id INTEGER PRIMARY KEY,
+            remote_id TEXT NOT NULL UNIQUE,
+            etag TEXT,
+            synced_at TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS gcal_deleted (remote_id TEXT PRIMARY KEY, etag TEXT);
+        CREATE TABLE IF NOT EXISTS gcal_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            sync_token TEXT,
+            pushed_until TEXT NOT NULL DEFAULT ''
+        );
+        INSERT OR IGNORE INTO gcal_state (id) VALUES (1);
+        CREATE TRIGGER IF NOT EXISTS events_touch_insert AFTER INSERT ON events WHEN new.updated_at IS NULL BEGIN
+            UPDATE events SET updated_at = {NOW} WHERE id = new.id;
+        END;
+        CREATE TRIGGER IF NOT EXISTS events_touch_update
+        AFTER UPDATE OF title, date, description, recurrence ON events BEGIN
+            UPDATE events SET updated_at = {NOW} WHERE id = new.id;
+        END;
+        CREATE TRIGGER IF NOT EXISTS events_gcal_delete AFTER DELETE ON events BEGIN
+            INSERT OR REPLACE INTO gcal_deleted (remote_id, etag)
+            SELECT remote_id, etag FROM gcal_events WHERE event_id = old.id;
+            DELETE FROM gcal_events WHERE event_id = old.id;
+        END;
+        """
+    )
+    conn.commit()
+    conn.close()
+
+
+init_db()
+
+
+def _credentials():
+    creds = None
+    for cred in get_credentials():
+        id_, name, server_type, url, username, password, token, extra, created_at = cred
+        if "google" in name.lower() or "google" in server_type.lower():
+            try:
+                from google.oauth2.credentials import Credentials
+                creds = Credentials(token=token, scopes=SCOPES)
+                break
+            except Exception:
+                continue
+    if not creds:
+        if os.path.exists("token.json"):
+            from google.oauth2.credentials import Credentials
+            creds = Credentials.from_authorized_user_file("token.json", SCOPES)
+        else:
+            from google_auth_oauthlib.flow import InstalledAppFlow
+            flow = InstalledAppFlow.from_client_secrets_file("credentials.json", SCOPES)
+            creds = flow.run_local_server(port=0)
+            with open("token.json", "w") as token:
+                token.write(creds.to_json())
+    return creds
+
+
+def calendar_service():
+    if API_URL:
+        import httplib2
+        return build(
+            "calendar", "v3", http=httplib2.Http(), client_options={"api_endpoint": f"{API_URL}/calendar/v3/"}
+        )
+    return build("calendar", "v3", credentials=_credentials())
+
+
+def _new_batch(service, callback):
+    # The discovery document hard-codes the batch URL, so a custom server needs its own
+    if API_URL:
+        return BatchHttpRequest(callback=callback, batch_uri=f"{API_URL}/batch/calendar/v3")
+    return service.new_batch_http_request(callback=callback)
+
+
+def remote_body(title, day, description, rule):
+    """Return the API body for a local event (all-day, so `end` is the next day)."""
+    start = date.fromisoformat(day)
+    body = {
+        "summary": title,
+        "description": description or "",
+        "start": {"date": day},
+        "end": {"date": (start + timedelta(days=1)).isoformat()},
+        "recurrence": [],
+    }
+    rule = (rule or "").strip()
+    if rule.upper().startswith("RRULE:"):
+        rule = rule[6:]
+    if "=" not in rule:
+        # Legacy keywords ("weekly") become FREQ=...; RRULEs go out as stored, even ones we can't expand
+        rule = recurrence.format_rule(recurrence.parse(rule)) if rule.upper() in recurrence.FREQS else ""
+    if rule:
+        body["recurrence"] = ["RRULE:" + rule]
+    return body
+
+
+def local_fields(item):
+    """Return (title, date, description, recurrence) for an API event, or None without a start."""
+    start = item.get("start", {})
+    day = start.get("date") or start.get("dateTime", "")[:10]
+    if not day:
+        return None
+    rule = next((line[6:] for line in item.get("recurrence", []) if line.upper().startswith("RRULE:")), "")
+    return item.get("summary", "Untitled"), day, item.get("description", ""), rule
+
+
+def _mark_synced(c, event_id, remote_id, etag, synced_at=None):
+    c.execute(
+        "INSERT OR REPLACE INTO gcal_events (event_id, remote_id, etag, synced_at) "
+        "SELECT id, ?, ?, coalesce(?, updated_at) FROM events WHERE id = ?",
+        (remote_id, etag, synced_at, event_id),
+    )
+
+
+def _apply_remote(c, items, seen):
+    """Write one page of remote changes to the events table. Returns the number applied."""
+    applied = 0
+    for item in items:
+        if item.get("recurringEventId"):
+            continue  # changes to a single instance of a series aren't kept locally
+        remote_id = item["id"]
+        c.execute(
+            "SELECT m.event_id, m.etag, m.synced_at, e.updated_at FROM gcal_events m "
+            "JOIN events e ON e.id = m.event_id WHERE m.remote_id = ?",
+            (remote_id,),
+        )
+        mapped = c.fetchone()
+        if item.get("status") == "cancelled":
+            c.execute("DELETE FROM gcal_deleted WHERE remote_id = ?", (remote_id,))
+            if mapped:
+                # Unmap first so the delete trigger doesn't queue a remote delete
+                c.execute("DELETE FROM gcal_events WHERE event_id = ?", (mapped[0],))
+                c.execute("DELETE FROM events WHERE id = ?", (mapped[0],))
+                applied += 1
+            continue
+        if seen is not None:
+            seen.add(remote_id)
+        fields = local_fields(item)
+        if fields is None:
+            continue
+        if mapped:
+            event_id, etag, synced_at, updated_at = mapped
+            if etag == item.get("etag"):
+                continue  # our own write coming back
+            if updated_at > synced_at and updated_at > item.get("updated", ""):
+                # The local edit is newer and will be pushed; take the etag so If-Match passes
+                c.execute("UPDATE gcal_events SET etag = ? WHERE event_id = ?", (item.get("etag"), event_id))
+                continue
+            c.execute(
+                "UPDATE events SET title = ?, date = ?, description = ?, recurrence = ? WHERE id = ?",
+                (*fields, event_id),
+            )
+        else:
+            c.execute("SELECT 1 FROM gcal_deleted WHERE remote_id = ?", (remote_id,))
+            if c.fetchone():
+                continue  # deleted here; the pending delete wins
+            # Link to an unsynced local event with the same title and day, e.g. one the
+            # old sync copied to Google, rather than importing a duplicate
+            c.execute(
+                "SELECT id FROM events e WHERE date = ? AND title = ? "
+                "AND NOT EXISTS (SELECT 1 FROM gcal_events WHERE event_id = e.id) LIMIT 1",
+                (fields[1], fields[0]),
+            )
+            match = c.fetchone()
+            if match:
+                event_id = match[0]
+                c.execute(
+                    "UPDATE events SET title = ?, date = ?, description = ?, recurrence = ? WHERE id = ?",
+                    (*fields, event_id),
+                )
+            else:
+                c.execute("INSERT INTO events (title, date, description, recurrence) VALUES (?, ?, ?, ?)", fields)
+                event_id = c.lastrowid
+        _mark_synced(c, event_id, remote_id, item.get("etag"))
+        applied += 1
+    return applied
+
+
+def _pull(service, c, token, job=None):
+    """Apply remote changes page by page. Returns (next sync token, changes applied)."""
+    seen = None if token else set()  # a full listing also reveals remote deletes we missed
+    page_token = None
+    applied = 0
+    while True:
+        if job:
+            job.check_cancelled()
+        params = {"calendarId": CALENDAR_ID, "maxResults": PAGE_SIZE}
+        if page_token:
+            params["pageToken"] = page_token
+        elif token:
+            params["syncToken"] = token
+        try:
+            response = service.events().list(**params).execute()
+        except HttpError as ex:
+            if ex.resp.status == 410 and token:
+                # Sync token expired: start over with a full listing
+                token, seen, page_token = None, set(), None
+                continue
+            raise
+        applied += _apply_remote(c, response.get("items", []), seen)
+        c.connection.commit()
+        if job:
+            job.set_progress(0.1, f"Fetched {applied} remote changes")
+        page_token = response.get("nextPageToken")
+        if not page_token:
+            break
+    if seen is not None:
+        c.execute("SELECT event_id, remote_id FROM gcal_events")
+        gone = [(event_id,) for event_id, remote_id in c.fetchall() if remote_id not in seen]
+        c.executemany("DELETE FROM gcal_events WHERE event_id = ?", gone)
+        c.executemany("DELETE FROM events WHERE id = ?", gone)
+        c.connection.commit()
+        applied += len(gone)
+    return response.get("nextSyncToken"), applied
+
+
+def _push(service, c, pushed_until, job=None):
+    """Send local inserts, edits and deletes in batches. Returns (pushed, failed, new pushed_until)."""
+    c.execute(
+        "SELECT e.id, e.title, e.date, e.description, e.recurrence, e.updated_at, m.remote_id, m.etag "
+        "FROM events e LEFT JOIN gcal_events m ON m.event_id = e.id "
+        "WHERE e.updated_at >= ? AND (m.event_id IS NULL OR e.updated_at > m.synced_at) ORDER BY e.updated_at",
+        (pushed_until,),
+    )
+    changed = c.fetchall()
+    c.execute("SELECT remote_id, etag FROM gcal_deleted")
+    deleted = c.fetchall()
+    calendar = service.events()
+    ops = []  # (request, op, key, updated_at)
+    for event_id, title, day, description, rule, updated_at, remote_id, etag in changed:
+        try:
+            body = remote_body(title, day, description, rule)
+        except (TypeError, ValueError):
+            continue  # no valid date to send
+        if remote_id:
+            request = calendar.patch(calendarId=CALENDAR_ID, eventId=remote_id, body=body)
+            if etag:
+                request.headers["If-Match"] = etag
+            ops.append((request, "update", event_id, updated_at))
+        else:
+            ops.append((calendar.insert(calendarId=CALENDAR_ID, body=body), "insert", event_id, updated_at))
+    for remote_id, etag in deleted:
+        request = calendar.delete(calendarId=CALENDAR_ID, eventId=remote_id)
+        if etag:
+            request.headers["If-Match"] = etag
+        ops.append((request, "delete", remote_id, None))
+    max_seen = changed[-1][5] if changed else pushed_until
+    failed_from = []  # updated_at of rows to retry next time
+    pushed = 0
+    for done, chunk in enumerate(export.chunked(ops, BATCH_SIZE), 1):
+        if job:
+            job.check_cancelled()
+        results = {}
+        batch = _new_batch(service, lambda request_id, response, exception: results.update(
+            {request_id: (response, exception)}
+        ))
+        for n, (request, *_) in enumerate(chunk):
+            batch.add(request, request_id=str(n))
+        batch.execute()
+        for n, (_, op, key, updated_at) in enumerate(chunk):
+            response, exception = results.get(str(n), (None, None))
+            status = exception.resp.status if isinstance(exception, HttpError) else None
+            if op == "delete":
+                if exception is None or status in (404, 410):
+                    c.execute("DELETE FROM gcal_deleted WHERE remote_id = ?", (key,))
+                    pushed += 1
+                continue
+            if exception is None:
+                _mark_synced(c, key, response["id"], response.get("etag"), updated_at)
+                pushed += 1
+                continue
+            if status in (404, 410):
+                # Gone remotely: forget the mapping so the event is inserted again
+                c.execute("DELETE FROM gcal_events WHERE event_id = ?", (key,))
+            failed_from.append(updated_at)
+        c.connection.commit()
+        if job:
+            job.set_progress(0.1 + 0.9 * done * BATCH_SIZE / len(ops), f"Pushed {pushed} of {len(ops)} changes")
+    return pushed, len(ops) - pushed, min(failed_from, default=max_seen)
+
+
+def sync(job=None):
+    """Pull remote changes, then push local ones. Returns {"pulled": n, "pushed": n, "failed": n}."""
+    service = calendar_service()
+    conn = db.connect("links.db")
+    try:
+        c = conn.cursor()
+        c.execute("SELECT sync_token, pushed_until FROM gcal_state WHERE id = 1")
+        token, pushed_until = c.fetchone()
+        if job:
+            job.set_progress(0, "Fetching remote changes")
+        token, pulled = _pull(service, c, token, job)
+        c.execute("UPDATE gcal_state SET sync_token = ? WHERE id = 1", (token,))
+        conn.commit()
+        pushed, failed, pushed_until = _push(service, c, pushed_until, job)
+        c.execute("UPDATE gcal_state SET pushed_until = ? WHERE id = 1", (pushed_until,))
+        conn.commit()
+    finally:
+        conn.close()
+    if pulled:
+        events.publish("events", "sync")
+    return {"pulled": pulled, "pushed": pushed, "failed": failed}
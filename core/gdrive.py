@@ -5,55 +5,23 @@ from googleapiclient.http import MediaFileUpload, MediaIoBaseDownload
 import os
 from pathlib import Path
 import io
-import json
-import csv
-import sqlite3
+from core import export
 from core.settings import load_setting
 
-def export_notes_to_json(filename="notes_export.json"):
-    conn = sqlite3.connect("links.db")
-    c = conn.cursor()
-    c.execute("SELECT id, title, content, tags FROM notes ORDER BY created_at DESC")
-    notes = c.fetchall()
-    conn.close()
-    notes_list = []
-    for note in notes:
-        notes_list.append({
-            "id": note[0],
-            "title": note[1],
-            "content": note[2],
-            "tags": note[3]
-        })
-    with open(filename, "w", encoding="utf-8") as f:
-        json.dump(notes_list, f, ensure_ascii=False, indent=4)
-
 def export_rss_to_csv(filename="rss_export.csv"):
-    conn = sqlite3.connect("links.db")
-    c = conn.cursor()
-    c.execute("SELECT id, title, link, published FROM rss ORDER BY published DESC")
-    rss_items = c.fetchall()
-    conn.close()
-    with open(filename, "w", newline="", encoding="utf-8") as f:
-        writer = csv.writer(f)
-        writer.writerow(["id", "title", "link", "published"])
-        for item in rss_items:
-            writer.writerow(item)
+    export.export_query(
+        "links.db", "SELECT id, title, link, published FROM rss_items ORDER BY published DESC", filename
+    )
 
 def export_events_to_json(filename="events_export.json"):
-    conn = sqlite3.connect("links.db")
-    c = conn.cursor()
-    c.execute("SELECT id, title, date, description FROM events")
-    events = c.fetchall()
-    conn.close()
-    with open(filename, "w", encoding="utf-8") as f:
-        json.dump([{"id": e[0], "title": e[1], "date": e[2], "description": e[3]} for e in events], f, indent=4)
+    export.export_query("links.db", "SELECT id, title, date, description FROM events", filename)
 
 def sync_selected_modules():
     sync_modules = load_setting("sync_modules", ["notes", "todo", "calendar", "weblinks", "credentials"])
     for module in sync_modules:
         if module == "notes":
-            export_notes_to_json()
-            upload_file_stub("notes_export.json")
+            from core.notes import sync_notes
+            sync_notes()
         elif module == "todo":
             from core.todo import export_todos
             export_todos()
@@ -69,6 +37,23 @@ def sync_selected_modules():
     ui.notify("Selected modules synced to Google Drive", type="positive")
 
 def upload_file_stub(filename):
+    _upload(filename)
+    ui.notify(f"Uploaded {filename} to Google Drive", type="positive")
+
+def drive_connected():
+    return os.path.exists("token.json")
+
+def upload_file(filename, name=None):
+    """Upload without notifying, for background jobs; `name` defaults to the file name."""
+    _upload(filename, name)
+
+async def upload_file_async(filename):
+    """Upload on the shared IO pool so the calling handler doesn't block."""
+    from core import jobs
+    await jobs.run(f"gdrive.upload:{filename}", _upload, filename)
+    ui.notify(f"Uploaded {filename} to Google Drive", type="positive")
+
+def _upload(filename, name=None):
     creds = None
     SCOPES = ["https://www.googleapis.com/auth/drive.file"]
     DRIVE_FOLDER = "HomepageModules"
@@ -109,12 +94,11 @@ def upload_file_stub(filename):
         return folder[0].get("id")
 
     service = authenticate()
-    file_metadata = {"name": filename, "parents": [get_folder_id(service)]}
+    file_metadata = {"name": name or filename, "parents": [get_folder_id(service)]}
     media = MediaFileUpload(filename)
     service.files().create(
         body=file_metadata, media_body=media, fields="id"
     ).execute()
-    ui.notify(f"Uploaded {filename} to Google Drive", type="positive")
 
 def render():
     with ui.card().classes("p-6 bg-gray-700"):
@@ -234,9 +218,18 @@ def render():
         ui.upload(on_upload=upload_file, auto_upload=True).props(
             "accept=.py label=Upload to Drive"
         ).classes("bg-gray-600 text-white rounded mb-2")
+        async def sync_notes_now():
+            from core import jobs
+            from core.notes import sync_notes
+            try:
+                result = await jobs.run("notes.sync", sync_notes)
+                ui.notify(f"Notes synced ({result['kind']}, {result['changes']} changes)", type="positive")
+            except Exception as e:
+                ui.notify(f"Notes sync failed: {str(e)}", type="negative")
+
         ui.button(
-            "Export Notes",
-            on_click=lambda: [export_notes_to_json(), upload_file_stub("notes_export.json")],
+            "Sync Notes",
+            on_click=sync_notes_now,
         ).classes("bg-blue-600 hover:bg-blue-500 text-white rounded px-4 py-2 mb-4")
         ui.button(
             "Export RSS",
@@ -0,0 +1,336 @@
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+import httpx
+import requests
+from nicegui import app
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from core import metrics
+
+DEFAULT_TIMEOUT = (float(os.getenv("HTTP_CONNECT_TIMEOUT", "5")), float(os.getenv("HTTP_READ_TIMEOUT", "15")))
+RETRIES = int(os.getenv("HTTP_RETRIES", "3"))
+RETRY_BACKOFF = 0.5  # seconds before the first retry; doubles per retry
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# A longer Retry-After than this is not waited out; the 429/503 goes back to the caller
+RETRY_AFTER_MAX = float(os.getenv("HTTP_RETRY_AFTER_MAX", "30"))
+RETRY_METHODS = Retry.DEFAULT_ALLOWED_METHODS  # idempotent methods only
+ASYNC_MAX_CONNECTIONS = int(os.getenv("HTTP_ASYNC_CONNECTIONS", "64"))
+POOL_HOSTS = 32  # host pools kept open
+POOL_SIZE = 8  # connections per host
+CACHE_SIZE = int(os.getenv("HTTP_CACHE_SIZE", "256"))
+DEFAULT_RATE = float(os.getenv("HTTP_RATE_PER_HOST", "10"))  # requests per second
+# Hosts with published limits get a slower pace than DEFAULT_RATE
+RATE_LIMITS = {
+    "api.github.com": 1.0,
+    "api.openweathermap.org": 1.0,
+    "radio.garden": 2.0,
+}
+
+# One session for the whole app: urllib3 keeps a connection pool per host and
+# retries idempotent methods with exponential backoff (honouring Retry-After).
+session = requests.Session()
+_adapter = HTTPAdapter(
+    pool_connections=POOL_HOSTS,
+    pool_maxsize=POOL_SIZE,
+    max_retries=Retry(
+        total=RETRIES,
+        backoff_factor=RETRY_BACKOFF,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=RETRY_METHODS,
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    ),
+)
+session.mount("http://", _adapter)
+session.mount("https://", _adapter)
+
+# The async API has its own httpx client, bound to the event loop it was made on
+_async_client = None
+_async_loop = None
+
+_lock = threading.Lock()
+_next_slot = {}  # host -> earliest monotonic time of the next request, shared by both APIs
+_cache = OrderedDict()  # (url, params, authorization) -> CacheEntry, in LRU order
+
+
+def set_rate_limit(host, per_second):
+    with _lock:
+        RATE_LIMITS[host] = per_second
+
+
+def _reserve_slot(host):
+    """Book the next request slot for host; returns the seconds to wait for it."""
+    interval = 1.0 / RATE_LIMITS.get(host, DEFAULT_RATE)
+    with _lock:
+        now = time.monotonic()
+        slot = max(now, _next_slot.get(host, now))
+        _next_slot[host] = slot + interval
+    return slot - now
+
+
+def _throttle(host):
+    """Space requests to one host at least 1/rate seconds apart."""
+    delay = _reserve_slot(host)
+    if delay > 0:
+        time.sleep(delay)
+
+
+async def _athrottle(host):
+    delay = _reserve_slot(host)
+    if delay > 0:
+        await asyncio.sleep(delay)
+
+
+# --- RFC 7234 private cache ---
+def _cache_control(value):
+    directives = {}
+    for part in (value or "").split(","):
+        name, _, arg = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = arg.strip('"')
+    return directives
+
+
+def _http_date(value):
+    try:
+        return parsedate_to_datetime(value).timestamp() if value else None
+    except (TypeError, ValueError):
+        return None
+
+
+class CacheEntry:
+    def __init__(self, response):
+        self.response = response
+        self.refresh(response.headers)
+
+    def refresh(self, headers):
+        """Recompute freshness from response headers (also used after a 304)."""
+        self.stored_at = time.time()
+        for name in ("Cache-Control", "Expires", "Date", "ETag", "Last-Modified", "Age"):
+            if name in headers:
+                self.response.headers[name] = headers[name]
+        h = self.response.headers
+        cc = _cache_control(h.get("Cache-Control"))
+        self.no_cache = "no-cache" in cc
+        self.etag = h.get("ETag")
+        self.last_modified = h.get("Last-Modified")
+        try:
+            self.age = float(h.get("Age", 0))
+        except ValueError:
+            self.age = 0.0
+        date = _http_date(h.get("Date")) or self.stored_at
+        if "max-age" in cc:
+            try:
+                self.lifetime = float(cc["max-age"])
+            except ValueError:
+                self.lifetime = 0.0
+        elif _http_date(h.get("Expires")) is not None:
+            self.lifetime = _http_date(h.get("Expires")) - date
+        elif _http_date(self.last_modified) is not None:
+            # Heuristic freshness (RFC 7234 4.2.2): 10% of the time since last modification
+            self.lifetime = max(0.0, (date - _http_date(self.last_modified)) * 0.1)
+        else:
+            self.lifetime = 0.0
+
+    @property
+    def fresh(self):
+        return not self.no_cache and self.age + (time.time() - self.stored_at) < self.lifetime
+
+    @property
+    def validators(self):
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+def _storable(response):
+    cc = _cache_control(response.headers.get("Cache-Control"))
+    if "no-store" in cc or response.status_code != 200:
+        return False
+    return (
+        "max-age" in cc
+        or "Expires" in response.headers
+        or "ETag" in response.headers
+        or "Last-Modified" in response.headers
+    )
+
+
+def _cache_get(key):
+    with _lock:
+        entry = _cache.get(key)
+        if entry is not None:
+            _cache.move_to_end(key)
+        return entry
+
+
+def _cache_put(key, entry):
+    with _lock:
+        _cache[key] = entry
+        _cache.move_to_end(key)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def clear_cache():
+    with _lock:
+        _cache.clear()
+
+
+def request(module, method, url, cache=True, **kwargs):
+    """Send a request through the shared session on behalf of `module`.
+
+    Applies DEFAULT_TIMEOUT unless one is given, the per-host rate limit and,
+    for GET, the response cache: fresh entries are returned without a network
+    call and stale ones are revalidated with If-None-Match/If-Modified-Since.
+    """
+    kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+    method = method.upper()
+    headers = dict(kwargs.pop("headers", None) or {})
+    cacheable = cache and method == "GET" and "no-cache" not in _cache_control(headers.get("Cache-Control"))
+    key = (url, repr(kwargs.get("params")), headers.get("Authorization"))
+    entry = _cache_get(key) if cacheable else None
+    if entry is not None:
+        if entry.fresh:
+            metrics.record_http(module, url, 0.0, ok=True, cached=True)
+            return entry.response
+        headers.update(entry.validators)
+
+    host = urlsplit(url).hostname or ""
+    _throttle(host)
+    start = time.perf_counter()
+    ok = False
+    try:
+        response = session.request(method, url, headers=headers, **kwargs)
+        ok = response.status_code < 500
+    finally:
+        metrics.record_http(module, url, time.perf_counter() - start, ok)
+
+    if entry is not None and response.status_code == 304:
+        entry.refresh(response.headers)
+        return entry.response
+    if cacheable and _storable(response):
+        response.content  # read the body so the cached copy can be replayed
+        _cache_put(key, CacheEntry(response))
+    return response
+
+
+def get(module, url, **kwargs):
+    return request(module, "GET", url, **kwargs)
+
+
+# --- Async API: same timeouts, rate limits and cache on httpx, without borrowing threads ---
+def _get_async_client():
+    global _async_client, _async_loop
+    loop = asyncio.get_running_loop()
+    if _async_client is None or _async_loop is not loop:
+        _async_client = httpx.AsyncClient(
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=ASYNC_MAX_CONNECTIONS, max_keepalive_connections=POOL_HOSTS),
+        )
+        _async_loop = loop
+    return _async_client
+
+
+async def aclose():
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+
+
+app.on_shutdown(aclose)
+
+
+def _httpx_timeout(timeout):
+    if isinstance(timeout, tuple):
+        connect, read = timeout
+        return httpx.Timeout(read, connect=connect)
+    return httpx.Timeout(timeout)
+
+
+def _retry_after(response):
+    value = response.headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        when = _http_date(value)
+        return max(0.0, when - time.time()) if when is not None else None
+
+
+async def arequest(module, method, url, cache=True, retries=RETRIES, stream=False, **kwargs):
+    """request() for async code, on an httpx.AsyncClient.
+
+    Waiting for the rate limit, a retry or the network never holds a thread.
+    Idempotent methods are retried up to `retries` times on connection errors
+    and 429/5xx answers, honouring a Retry-After of up to RETRY_AFTER_MAX
+    seconds; a longer one is returned as-is. `allow_redirects` is accepted
+    as in requests (redirects are followed by default). With stream=True the
+    body is not read and the caller must `await response.aclose()`.
+    """
+    timeout = _httpx_timeout(kwargs.pop("timeout", DEFAULT_TIMEOUT))
+    follow_redirects = kwargs.pop("allow_redirects", True)
+    method = method.upper()
+    headers = dict(kwargs.pop("headers", None) or {})
+    cacheable = (
+        cache and not stream and method == "GET" and "no-cache" not in _cache_control(headers.get("Cache-Control"))
+    )
+    # httpx and requests responses aren't interchangeable, so each API has its own entries
+    key = ("async", url, repr(kwargs.get("params")), headers.get("Authorization"))
+    entry = _cache_get(key) if cacheable else None
+    if entry is not None:
+        if entry.fresh:
+            metrics.record_http(module, url, 0.0, ok=True, cached=True)
+            return entry.response
+        headers.update(entry.validators)
+
+    client = _get_async_client()
+    http_request = client.build_request(method, url, headers=headers, timeout=timeout, **kwargs)
+    host = urlsplit(url).hostname or ""
+    attempt = 0
+    while True:
+        await _athrottle(host)
+        start = time.perf_counter()
+        response, error = None, None
+        try:
+            response = await client.send(http_request, stream=stream, follow_redirects=follow_redirects)
+        except httpx.TransportError as e:
+            error = e
+        finally:
+            ok = response is not None and response.status_code < 500
+            metrics.record_http(module, url, time.perf_counter() - start, ok)
+        delay = _retry_after(response) if response is not None else None
+        retry = (
+            attempt < retries
+            and method in RETRY_METHODS
+            and (error is not None or response.status_code in RETRY_STATUSES)
+            and (delay is None or delay <= RETRY_AFTER_MAX)
+        )
+        if not retry:
+            break
+        if response is not None:
+            await response.aclose()
+        await asyncio.sleep(delay if delay is not None else RETRY_BACKOFF * 2**attempt)
+        attempt += 1
+    if error is not None:
+        raise error
+
+    if entry is not None and response.status_code == 304:
+        entry.refresh(response.headers)
+        return entry.response
+    if cacheable and _storable(response):
+        _cache_put(key, CacheEntry(response))
+    return response
+
+
+async def aget(module, url, **kwargs):
+    return await arequest(module, "GET", url, **kwargs)
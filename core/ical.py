@@ -0,0 +1,148 @@
+"""Streaming iCalendar (RFC 5545) reading and writing for calendar events.
+
+iter_vevents() turns an iterable of lines into one dict of properties per VEVENT
+without holding more than the current event, so files of any size read in
+constant memory. Components nested in an event (VALARM) are skipped. Writing
+produces all-day events with CRLF line endings and lines folded at 75 octets.
+"""
+import re
+from datetime import date, datetime, timezone
+
+FOLD_AT = 75  # octets per line, not counting the CRLF
+PRODID = "-//Homepage//Calendar//EN"
+_ESCAPES = {"\\n": "\n", "\\N": "\n", "\\,": ",", "\\;": ";", "\\\\": "\\"}
+_ESCAPE_RE = re.compile(r"\\[nN,;\\]")
+
+
+def unescape(value):
+    """Undo TEXT escaping (\\n, \\, \\; and \\\\)."""
+    if "\\" not in value:
+        return value
+    return _ESCAPE_RE.sub(lambda m: _ESCAPES[m.group(0)], value)
+
+
+def escape(value):
+    value = (value or "").replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+    return value.replace("\r\n", "\\n").replace("\n", "\\n")
+
+
+def unfold(lines):
+    """Join continuation lines (those starting with a space or tab) onto the line before."""
+    current = None
+    for line in lines:
+        if line[:1] in (" ", "\t") and current is not None:
+            current += line[1:]
+            continue
+        if current is not None:
+            yield current
+        current = line
+    if current is not None:
+        yield current
+
+
+def split_line(line):
+    """Split a content line into (NAME, [params], value); None if it has no value."""
+    if '"' in line:
+        # A colon inside a quoted parameter value doesn't end the parameters
+        quoted = False
+        for i, char in enumerate(line):
+            if char == '"':
+                quoted = not quoted
+            elif char == ":" and not quoted:
+                break
+        else:
+            return None
+    else:
+        i = line.find(":")
+        if i < 0:
+            return None
+    name, *params = line[:i].split(";")
+    return name.strip().upper(), params, line[i + 1 :]
+
+
+def parse_date(value):
+    """Return the date of a DATE or DATE-TIME value (YYYYMMDD[THHMMSS[Z]])."""
+    value = value.strip()
+    try:
+        return date(int(value[:4]), int(value[4:6]), int(value[6:8]))
+    except ValueError:
+        raise ValueError(f"Invalid date: {value!r}") from None
+
+
+def iter_vevents(lines):
+    """Yield {"UID": ..., "SUMMARY": ..., "EXDATE": [...], ...} for each VEVENT.
+
+    Values are unescaped; EXDATE values from every EXDATE line are collected into
+    one list. Other properties keep their last value.
+    """
+    event = None
+    depth = 0  # components open inside the current event
+    for line in unfold(lines):
+        parsed = split_line(line)
+        if parsed is None:
+            continue
+        name, params, value = parsed
+        if name == "BEGIN":
+            if event is not None:
+                depth += 1
+            elif value.strip().upper() == "VEVENT":
+                event = {"EXDATE": []}
+        elif name == "END":
+            if event is None:
+                continue
+            if depth:
+                depth -= 1
+            elif value.strip().upper() == "VEVENT":
+                yield event
+                event = None
+        elif event is not None and not depth:
+            if name == "EXDATE":
+                event["EXDATE"].extend(part for part in value.split(",") if part.strip())
+            else:
+                event[name] = unescape(value)
+
+
+def fold(line):
+    """Split a line into RFC 5545 chunks of at most FOLD_AT octets, never inside a character."""
+    if len(line.encode()) <= FOLD_AT:
+        return [line]
+    chunks, current, size = [], "", 0
+    for char in line:
+        width = len(char.encode())
+        if size + width > FOLD_AT:
+            chunks.append(current)
+            current, size = " ", 1
+        current += char
+        size += width
+    chunks.append(current)
+    return chunks
+
+
+def vevent_lines(uid, title, day, description, rule, exdates, stamp):
+    """Yield the folded lines of one all-day VEVENT; `day` and `exdates` are dates."""
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:{uid}",
+        f"DTSTAMP:{stamp}",
+        f"DTSTART;VALUE=DATE:{day.strftime('%Y%m%d')}",
+        f"DTEND;VALUE=DATE:{date.fromordinal(day.toordinal() + 1).strftime('%Y%m%d')}",
+        f"SUMMARY:{escape(title)}",
+    ]
+    if description:
+        lines.append(f"DESCRIPTION:{escape(description)}")
+    if rule:
+        lines.append(f"RRULE:{rule}")
+    if exdates:
+        lines.append("EXDATE;VALUE=DATE:" + ",".join(d.strftime("%Y%m%d") for d in exdates))
+    lines.append("END:VEVENT")
+    for line in lines:
+        yield from fold(line)
+
+
+def calendar_lines(events):
+    """Yield a whole VCALENDAR for an iterable of vevent_lines() argument tuples (without stamp)."""
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    yield from ("BEGIN:VCALENDAR", "VERSION:2.0", f"PRODID:{PRODID}", "CALSCALE:GREGORIAN")
+    for event in events:
+        yield from vevent_lines(*event, stamp)
+    yield "END:VCALENDAR"
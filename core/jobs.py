@@ -0,0 +1,361 @@
+from nicegui import app, ui
+import asyncio
+import os
+from core import db
+from core import events
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from datetime import datetime, timedelta
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+
+DB_FILE = "db/db.db"
+IO_WORKERS = int(os.getenv("JOBS_IO_WORKERS", "8"))
+CPU_WORKERS = int(os.getenv("JOBS_CPU_WORKERS", str(os.cpu_count() or 2)))
+HISTORY_LIMIT = 100
+
+os.makedirs("db", exist_ok=True)
+
+
+def init_db():
+    conn = db.connect(DB_FILE)
+    c = conn.cursor()
+    c.execute(
+        "CREATE TABLE IF NOT EXISTS job_schedules (key TEXT PRIMARY KEY, seconds REAL, last_run TEXT, next_run TEXT)"
+    )
+    conn.commit()
+    conn.close()
+
+
+init_db()
+
+# One scheduler and one pair of pools for the whole app. IO-bound work (HTTP,
+# subprocesses, Drive uploads) goes to threads; CPU-bound work goes to processes.
+scheduler = AsyncIOScheduler()
+io_pool = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="jobs-io")
+_cpu_pool = None
+
+_lock = threading.Lock()
+_active = {}  # key -> Job, for deduplication
+history = deque(maxlen=HISTORY_LIMIT)
+
+
+class JobCancelled(Exception):
+    """Raised inside a job that noticed its cancellation request, and by Job.wait() for any cancelled job."""
+
+
+def cpu_pool():
+    """Return the process pool, creating it on first use."""
+    global _cpu_pool
+    if _cpu_pool is None:
+        _cpu_pool = ProcessPoolExecutor(max_workers=CPU_WORKERS)
+    return _cpu_pool
+
+
+class Job:
+    """A unit of background work with progress, cancellation and a result."""
+
+    def __init__(self, key, kind):
+        self.id = uuid.uuid4().hex[:8]
+        self.key = key
+        self.kind = kind  # io, cpu, async
+        self.status = "pending"  # pending, running, done, failed, cancelled
+        self.progress = 0.0
+        self.message = ""
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.future = None
+        self._cancel = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    @property
+    def done(self):
+        return self.status in ("done", "failed", "cancelled")
+
+    def set_progress(self, value, message=""):
+        """Report progress between 0 and 1. Only IO and async jobs can report."""
+        self.progress = max(0.0, min(1.0, float(value)))
+        if message:
+            self.message = message
+
+    def check_cancelled(self):
+        """Raise JobCancelled if cancellation was requested; call from long loops."""
+        if self._cancel.is_set():
+            raise JobCancelled(self.key)
+
+    def cancel(self):
+        """Request cancellation. Pending work is dropped, running work must poll."""
+        self._cancel.set()
+        if self.future is not None and self.future.cancel():
+            self._finish("cancelled")
+
+    async def wait(self):
+        """Wait for the job and return its result, re-raising its error.
+
+        A job cancelled before it finished raises JobCancelled, like one that
+        noticed the request itself. Cancelling the waiter leaves the job running,
+        since other callers may share it.
+        """
+        future = self.future if isinstance(self.future, asyncio.Future) else asyncio.wrap_future(self.future)
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            if self.future.cancelled():
+                raise JobCancelled(self.key) from None
+            raise  # the waiter itself was cancelled
+
+    def _finish(self, status, result=None, error=None):
+        if self.done:
+            return
+        self.status = status
+        self.result = result
+        self.error = error
+        self.finished_at = time.time()
+        if status == "done":
+            self.progress = 1.0
+        with _lock:
+            if _active.get(self.key) is self:
+                del _active[self.key]
+            history.appendleft(self)
+        events.publish("job.finished", status, self.key, job=self)
+
+    def _on_future_done(self, future):
+        if future.cancelled():
+            self._finish("cancelled")
+            return
+        error = future.exception()
+        if isinstance(error, JobCancelled):
+            self._finish("cancelled")
+        elif error is not None:
+            self._finish("failed", error=error)
+        else:
+            self._finish("done", result=future.result())
+
+
+def _call(job, fn, args, kwargs, report):
+    job.check_cancelled()
+    job.status = "running"
+    job.started_at = time.time()
+    if report:
+        return fn(job, *args, **kwargs)
+    return fn(*args, **kwargs)
+
+
+async def _call_async(job, fn, args, kwargs, report):
+    job.status = "running"
+    job.started_at = time.time()
+    if report:
+        return await fn(job, *args, **kwargs)
+    return await fn(*args, **kwargs)
+
+
+def submit(key, fn, *args, kind=None, report=False, **kwargs):
+    """Hand work off to the background and return its Job.
+
+    If a job with the same key is still pending or running, that job is returned
+    instead of starting a second one. `kind` is "io" (thread pool, the default),
+    "cpu" (process pool; fn and its arguments must be picklable) or "async"
+    (coroutine on the event loop, inferred for coroutine functions). With
+    `report=True`, fn receives the Job as its first argument so it can call
+    `set_progress()` and `check_cancelled()`.
+    """
+    if kind is None:
+        kind = "async" if asyncio.iscoroutinefunction(fn) else "io"
+    with _lock:
+        existing = _active.get(key)
+        if existing is not None and not existing.done:
+            return existing
+        job = Job(key, kind)
+        _active[key] = job
+    if kind == "async":
+        job.future = asyncio.ensure_future(_call_async(job, fn, args, kwargs, report))
+    elif kind == "cpu":
+        job.status = "running"
+        job.started_at = time.time()
+        job.future = cpu_pool().submit(fn, *args, **kwargs)
+    else:
+        job.future = io_pool.submit(_call, job, fn, args, kwargs, report)
+    job.future.add_done_callback(job._on_future_done)
+    events.publish("job.submitted", "submit", key, job=job)
+    return job
+
+
+async def run(key, fn, *args, kind=None, report=False, **kwargs):
+    """Submit work and await its result without blocking the event loop."""
+    return await submit(key, fn, *args, kind=kind, report=report, **kwargs).wait()
+
+
+def get_job(key):
+    with _lock:
+        return _active.get(key)
+
+
+def list_jobs():
+    """Return active jobs followed by recently finished ones."""
+    with _lock:
+        return list(_active.values()) + list(history)
+
+
+def cancel(key):
+    job = get_job(key)
+    if job is not None:
+        job.cancel()
+    return job
+
+
+# --- Scheduling ---
+def _load_schedule(key):
+    conn = db.connect(DB_FILE)
+    c = conn.cursor()
+    c.execute("SELECT seconds, last_run FROM job_schedules WHERE key = ?", (key,))
+    row = c.fetchone()
+    conn.close()
+    return row
+
+
+def _save_schedule(key, seconds, last_run=None, next_run=None):
+    conn = db.connect(DB_FILE)
+    c = conn.cursor()
+    c.execute(
+        "INSERT INTO job_schedules (key, seconds, last_run, next_run) VALUES (?, ?, ?, ?) "
+        "ON CONFLICT(key) DO UPDATE SET seconds = excluded.seconds, "
+        "last_run = COALESCE(excluded.last_run, last_run), next_run = excluded.next_run",
+        (key, seconds, last_run, next_run),
+    )
+    conn.commit()
+    conn.close()
+
+
+def _next_run_time(key, seconds):
+    now = datetime.now()
+    row = _load_schedule(key)
+    if row and row[1]:
+        next_run = datetime.fromisoformat(row[1]) + timedelta(seconds=seconds)
+        # Overdue schedules (the app was down) run shortly after startup.
+        return max(next_run, now + timedelta(seconds=30))
+    return now + timedelta(seconds=seconds)
+
+
+async def _run_scheduled(key, fn, seconds):
+    now = datetime.now()
+    _save_schedule(key, seconds, now.isoformat(), (now + timedelta(seconds=seconds)).isoformat())
+    try:
+        await run(key, fn)
+    except Exception as e:
+        print(f"Scheduled job {key} failed: {e}")
+
+
+def schedule(key, fn, seconds):
+    """Run fn every `seconds`. Calling again with the same key replaces the job.
+
+    The last run time is stored in SQLite so intervals survive restarts.
+    """
+    next_run = _next_run_time(key, seconds)
+    scheduler.add_job(
+        _run_scheduled,
+        "interval",
+        seconds=seconds,
+        id=key,
+        args=[key, fn, seconds],
+        next_run_time=next_run,
+        replace_existing=True,
+        coalesce=True,
+        max_instances=1,
+    )
+    _save_schedule(key, seconds, next_run=next_run.isoformat())
+    _ensure_started()
+
+
+def unschedule(key):
+    if scheduler.get_job(key):
+        scheduler.remove_job(key)
+    conn = db.connect(DB_FILE)
+    conn.execute("DELETE FROM job_schedules WHERE key = ?", (key,))
+    conn.commit()
+    conn.close()
+
+
+def list_schedules():
+    conn = db.connect(DB_FILE)
+    c = conn.cursor()
+    c.execute("SELECT key, seconds, last_run, next_run FROM job_schedules ORDER BY key")
+    rows = c.fetchall()
+    conn.close()
+    return rows
+
+
+def _ensure_started():
+    if scheduler.running:
+        return
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return  # started by the on_startup hook below
+    scheduler.start()
+
+
+def shutdown():
+    if scheduler.running:
+        scheduler.shutdown(wait=False)
+    io_pool.shutdown(wait=False, cancel_futures=True)
+    if _cpu_pool is not None:
+        _cpu_pool.shutdown(wait=False, cancel_futures=True)
+
+
+app.on_startup(_ensure_started)
+app.on_shutdown(shutdown)
+
+
+def render():
+    with ui.card().classes("p-6 bg-gray-700"):
+        ui.label("Background Jobs").classes("text-2xl font-semibold text-gray-100 mb-4")
+        jobs_list = ui.column().classes("w-full mb-4")
+        ui.label("Schedules").classes("text-lg font-semibold text-gray-100 mb-2")
+        schedules_table = ui.table(
+            columns=[
+                {"name": "key", "label": "Key", "field": "key"},
+                {"name": "every", "label": "Every", "field": "every"},
+                {"name": "last_run", "label": "Last Run", "field": "last_run"},
+                {"name": "next_run", "label": "Next Run", "field": "next_run"},
+            ],
+            rows=[],
+        ).classes("w-full bg-gray-600 text-gray-100")
+
+        def refresh():
+            jobs_list.clear()
+            for job in list_jobs()[:50]:
+                with jobs_list:
+                    with ui.row().classes("items-center w-full"):
+                        ui.label(f"{job.key} [{job.kind}]").classes("text-gray-100 w-1/3")
+                        ui.linear_progress(value=job.progress, show_value=False).classes("w-1/4")
+                        status = job.status if not job.error else f"{job.status}: {job.error}"
+                        ui.label(status).classes("text-gray-300 text-sm")
+                        if not job.done:
+                            ui.button("Cancel", on_click=lambda j=job: j.cancel()).classes(
+                                "bg-red-600 hover:bg-red-500 text-white rounded px-2 py-1"
+                            )
+            schedules_table.rows = [
+                {
+                    "key": key,
+                    "every": str(timedelta(seconds=int(seconds))),
+                    "last_run": last_run or "-",
+                    "next_run": next_run or "-",
+                }
+                for key, seconds, last_run, next_run in list_schedules()
+            ]
+            schedules_table.update()
+            progress_timer.active = any(not job.done for job in list_jobs())
+
+        # Progress has no event, so poll only while something is running
+        progress_timer = ui.timer(1.0, refresh, active=False)
+        events.listen("job.submitted", lambda e: refresh())
+        events.listen("job.finished", lambda e: refresh())
+        refresh()
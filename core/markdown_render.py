@@ -0,0 +1,32 @@
+"""Markdown rendering for notes, kept free of side effects on import.
+
+Worker processes of jobs.cpu_pool() import this module to run render_html().
+Under the spawn start method (Windows, macOS) a worker re-imports the module
+that defines its function, so anything here that touched the database or the
+scheduler would run again in every worker.
+"""
+import hashlib
+import bleach
+import markdown2
+
+PREVIEW_CHARS = 100
+# bleach exposes ALLOWED_TAGS as a frozenset in recent versions
+MARKDOWN_TAGS = set(bleach.sanitizer.ALLOWED_TAGS) | {"p", "pre", "span", "h1", "h2", "h3", "h4", "h5", "h6"}
+
+
+def markdown_html(text):
+    return bleach.clean(markdown2.markdown(text or ""), tags=MARKDOWN_TAGS, attributes=bleach.sanitizer.ALLOWED_ATTRIBUTES)
+
+
+def content_hash(content):
+    return hashlib.blake2b((content or "").encode("utf-8"), digest_size=16).hexdigest()
+
+
+def preview_text(content):
+    content = content or ""
+    return content[:PREVIEW_CHARS] + ("..." if len(content) > PREVIEW_CHARS else "")
+
+
+def render_html(content):
+    """Return (content_hash, full HTML, list preview HTML) for a note's markdown."""
+    return content_hash(content), markdown_html(content), markdown_html(preview_text(content))
@@ -1,11 +1,11 @@
 from nicegui import ui
-import sqlite3
+from core import db
 from pathlib import Path
 import os
 
 
 def init_db():
-    conn = sqlite3.connect("links.db")
+    conn = db.connect("links.db")
     c = conn.cursor()
     c.execute(
         "CREATE TABLE IF NOT EXISTS marketplace (id INTEGER PRIMARY KEY, name TEXT, description TEXT, author TEXT, filename TEXT)"
@@ -30,14 +30,14 @@ init_db()
 
 
 def load_modules():
-    conn = sqlite3.connect("links.db")
+    conn = db.connect("links.db")
     c = conn.cursor()
     c.execute("SELECT name, description, author, filename, version FROM marketplace")
     return c.fetchall()
 
 
 def save_module(name, description, author, filename, version=None):
-    conn = sqlite3.connect("links.db")
+    conn = db.connect("links.db")
     c = conn.cursor()
     c.execute(
         "INSERT INTO marketplace (name, description, author, filename, version) VALUES (?, ?, ?, ?, ?)",
@@ -48,7 +48,7 @@ def save_module(name, description, author, filename, version=None):
 
 
 def delete_module(filename):
-    conn = sqlite3.connect("links.db")
+    conn = db.connect("links.db")
     c = conn.cursor()
     c.execute("DELETE FROM marketplace WHERE filename = ?", (filename,))
     conn.commit()
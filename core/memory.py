@@ -0,0 +1,379 @@
+from nicegui import app, background_tasks, ui, Client
+import gc
+import os
+import time
+import tracemalloc
+from collections import OrderedDict, deque
+from datetime import datetime
+import psutil
+from apscheduler.schedulers.base import BaseScheduler
+from core import events
+from core import jobs
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TRACE_FRAMES = int(os.getenv("MEMORY_TRACE_FRAMES", "10"))
+SNAPSHOT_INTERVAL = int(os.getenv("MEMORY_SNAPSHOT_INTERVAL", "0"))  # seconds, 0 = on demand only
+HISTORY_LIMIT = 100  # snapshot summaries kept
+RAW_LIMIT = 4  # full snapshots kept for line-level diffs
+TOP_LIMIT = 25
+SUSPECT_MIN_GROWTH = 64 * 1024  # bytes
+# Shared plumbing: allocations made here are charged to the module that called it
+PLUMBING = {"core/db.py", "core/events.py", "core/metrics.py", "core/memory.py"}
+
+_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+]
+
+history = deque(maxlen=HISTORY_LIMIT)  # summaries, oldest first
+_raw = OrderedDict()  # snapshot id -> tracemalloc.Snapshot
+_process = psutil.Process()
+
+if os.getenv("MEMORY_TRACE") == "1":
+    tracemalloc.start(TRACE_FRAMES)
+
+
+def start(frames=TRACE_FRAMES):
+    """Start tracing allocations. Only memory allocated afterwards is attributed."""
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+
+
+def stop():
+    """Stop tracing and drop the full snapshots (summaries are kept)."""
+    tracemalloc.stop()
+    _raw.clear()
+
+
+def _project_file(filename):
+    """Return the repo-relative path of a project source file, else None."""
+    path = os.path.abspath(filename)
+    if path.startswith(ROOT + os.sep) and "site-packages" not in path:
+        return os.path.relpath(path, ROOT).replace(os.sep, "/")
+    return None
+
+
+def _owner(filename):
+    """Map a source file to the project file or package that owns it."""
+    project = _project_file(filename)
+    if project:
+        return project
+    path = os.path.abspath(filename)
+    if "site-packages" in path:
+        return path.split("site-packages" + os.sep, 1)[1].split(os.sep)[0].removesuffix(".py")
+    return f"python:{os.path.basename(path)}"
+
+
+def _attribute(snapshot):
+    """Return {owner: [size, count]}, charging each allocation to the innermost project frame."""
+    owners = {}
+    for stat in snapshot.statistics("traceback"):
+        owner = None
+        for frame in reversed(stat.traceback):  # innermost first
+            project = _project_file(frame.filename)
+            if project and project not in PLUMBING:
+                owner = project
+                break
+        if owner is None:
+            owner = _owner(stat.traceback[-1].filename)
+        total = owners.setdefault(owner, [0, 0])
+        total[0] += stat.size
+        total[1] += stat.count
+    return owners
+
+
+def take_snapshot(label="manual"):
+    """Take a tracemalloc snapshot, attribute it to source files and return its summary."""
+    if not tracemalloc.is_tracing():
+        raise RuntimeError("Memory tracing is off; start it first or set MEMORY_TRACE=1")
+    snapshot = tracemalloc.take_snapshot().filter_traces(_FILTERS)
+    summary = {
+        "id": datetime.now().strftime("%Y%m%d_%H%M%S_%f"),
+        "taken_at": datetime.now().isoformat(timespec="seconds"),
+        "label": label,
+        "rss_mb": round(_process.memory_info().rss / 2**20, 1),
+        "traced_mb": round(tracemalloc.get_traced_memory()[0] / 2**20, 1),
+        "owners": _attribute(snapshot),
+    }
+    history.append(summary)
+    _raw[summary["id"]] = snapshot
+    while len(_raw) > RAW_LIMIT:
+        _raw.popitem(last=False)
+    return summary
+
+
+def _scheduled_snapshot():
+    if tracemalloc.is_tracing():
+        take_snapshot("scheduled")
+
+
+def get_summary(snapshot_id):
+    return next((s for s in history if s["id"] == snapshot_id), None)
+
+
+def diff(old_id, new_id, limit=TOP_LIMIT):
+    """Compare two snapshots by owner and, while both are still held, by source line."""
+    old, new = get_summary(old_id), get_summary(new_id)
+    if old is None or new is None:
+        raise ValueError("Unknown snapshot")
+    owners = []
+    for owner in set(old["owners"]) | set(new["owners"]):
+        old_size, old_count = old["owners"].get(owner, (0, 0))
+        new_size, new_count = new["owners"].get(owner, (0, 0))
+        owners.append((owner, new_size - old_size, new_count - old_count, new_size))
+    owners.sort(key=lambda o: abs(o[1]), reverse=True)
+    lines = []
+    if old_id in _raw and new_id in _raw:
+        for stat in _raw[new_id].compare_to(_raw[old_id], "lineno")[:limit]:
+            frame = stat.traceback[0]
+            location = _owner(frame.filename)
+            if "site-packages" in frame.filename:
+                location += "/" + os.path.basename(frame.filename)
+            lines.append((f"{location}:{frame.lineno}", stat.size_diff, stat.count_diff, stat.size))
+    return owners[:limit], lines
+
+
+def suspects(window=3):
+    """Owners that grew in each of the last `window` snapshots by SUSPECT_MIN_GROWTH in total."""
+    recent = list(history)[-(window + 1) :]
+    if len(recent) < window + 1:
+        return []
+    found = []
+    for owner in recent[-1]["owners"]:
+        sizes = [s["owners"].get(owner, (0, 0))[0] for s in recent]
+        if all(b > a for a, b in zip(sizes, sizes[1:])) and sizes[-1] - sizes[0] >= SUSPECT_MIN_GROWTH:
+            found.append((owner, sizes[-1] - sizes[0]))
+    return sorted(found, key=lambda f: f[1], reverse=True)
+
+
+def live_objects():
+    """Per-client timers and event listeners, app scheduler jobs and leftovers of closed pages."""
+    _, listeners = events.subscriber_counts()
+    clients = []
+    for client in list(Client.instances.values()):
+        timers = [e for e in client.elements.values() if isinstance(e, ui.timer)]
+        clients.append(
+            {
+                "id": client.id[:8],
+                "page": client.page.path,
+                "age": int(time.time() - client.created),
+                "connected": client.has_socket_connection,
+                "elements": len(client.elements),
+                "timers": len(timers),
+                "active_timers": sum(1 for t in timers if t.active),
+                "listeners": listeners.get(client.id, 0),
+            }
+        )
+    # Timers of deleted pages that something still references, and schedulers other than
+    # the shared one in core.jobs, are what closed tabs leave behind
+    stale_timers = 0
+    stray_schedulers = []
+    for obj in gc.get_objects():
+        if isinstance(obj, ui.timer):
+            client = obj._client()
+            if client is None or client.is_deleted or obj.is_deleted:
+                stale_timers += 1
+        elif isinstance(obj, BaseScheduler) and obj is not jobs.scheduler:
+            stray_schedulers.append(len(obj.get_jobs()))
+    scheduled = [
+        {"id": job.id, "trigger": str(job.trigger), "next_run": str(job.next_run_time or "-")}
+        for job in jobs.scheduler.get_jobs()
+    ]
+    return {
+        "clients": clients,
+        "scheduler_jobs": scheduled,
+        "stale_timers": stale_timers,
+        "stray_schedulers": stray_schedulers,
+        "running_tasks": len(background_tasks.running_tasks),
+        "orphan_listeners": sum(n for cid, n in listeners.items() if cid not in Client.instances),
+    }
+
+
+if SNAPSHOT_INTERVAL > 0:
+    jobs.schedule("memory.take_snapshot", _scheduled_snapshot, seconds=SNAPSHOT_INTERVAL)
+
+
+@app.get("/memory")
+def memory_endpoint():
+    latest = history[-1] if history else None
+    top = sorted(latest["owners"].items(), key=lambda o: o[1][0], reverse=True)[:TOP_LIMIT] if latest else []
+    return {
+        "tracing": tracemalloc.is_tracing(),
+        "rss_mb": round(_process.memory_info().rss / 2**20, 1),
+        "latest_snapshot": latest and {k: v for k, v in latest.items() if k != "owners"},
+        "top_owners": [{"owner": owner, "size": size, "count": count} for owner, (size, count) in top],
+        "suspects": [{"owner": owner, "growth": growth} for owner, growth in suspects()],
+        "live": live_objects(),
+    }
+
+
+def _kb(size):
+    return round(size / 1024, 1)
+
+
+def render():
+    with ui.card().classes("p-6 bg-gray-700"):
+        ui.label("Memory").classes("text-2xl font-semibold text-gray-100 mb-4")
+        status_label = ui.label().classes("text-gray-300 mb-2")
+        with ui.row().classes("mb-4"):
+            trace_button = ui.button(on_click=lambda: toggle_tracing()).classes(
+                "bg-gray-600 hover:bg-gray-500 text-white rounded px-4 py-2"
+            )
+            ui.button("Take Snapshot", on_click=lambda: snapshot_now()).classes(
+                "bg-blue-600 hover:bg-blue-500 text-white rounded px-4 py-2"
+            )
+            ui.button("Compare Selected", on_click=lambda: compare()).classes(
+                "bg-blue-600 hover:bg-blue-500 text-white rounded px-4 py-2"
+            )
+            ui.button("Refresh Live Objects", on_click=lambda: refresh_live()).classes(
+                "bg-gray-600 hover:bg-gray-500 text-white rounded px-4 py-2"
+            )
+
+        ui.label("Snapshots").classes("text-lg font-semibold text-gray-100")
+        snapshots_table = ui.table(
+            columns=[
+                {"name": "taken_at", "label": "Taken", "field": "taken_at"},
+                {"name": "label", "label": "Label", "field": "label"},
+                {"name": "rss_mb", "label": "RSS (MB)", "field": "rss_mb"},
+                {"name": "traced_mb", "label": "Traced (MB)", "field": "traced_mb"},
+            ],
+            rows=[],
+            row_key="id",
+            selection="multiple",
+        ).classes("w-full bg-gray-600 text-gray-100 mb-4")
+        suspects_label = ui.label().classes("text-yellow-400 mb-2")
+
+        owners_title = ui.label("By Source File").classes("text-lg font-semibold text-gray-100")
+        owners_table = ui.table(
+            columns=[
+                {"name": "owner", "label": "File / Package", "field": "owner", "align": "left"},
+                {"name": "size", "label": "Size (KB)", "field": "size", "sortable": True},
+                {"name": "diff", "label": "Change (KB)", "field": "diff", "sortable": True},
+                {"name": "count", "label": "Blocks", "field": "count", "sortable": True},
+            ],
+            rows=[],
+            row_key="owner",
+        ).classes("w-full bg-gray-600 text-gray-100 mb-4")
+        lines_table = ui.table(
+            columns=[
+                {"name": "line", "label": "Line", "field": "line", "align": "left"},
+                {"name": "diff", "label": "Change (KB)", "field": "diff"},
+                {"name": "count", "label": "Blocks", "field": "count"},
+                {"name": "size", "label": "Size (KB)", "field": "size"},
+            ],
+            rows=[],
+        ).classes("w-full bg-gray-600 text-gray-100 mb-4")
+
+        ui.label("Live Pages").classes("text-lg font-semibold text-gray-100")
+        live_label = ui.label().classes("text-gray-300 mb-2")
+        clients_table = ui.table(
+            columns=[
+                {"name": "page", "label": "Page", "field": "page", "align": "left"},
+                {"name": "id", "label": "Client", "field": "id"},
+                {"name": "age", "label": "Age (s)", "field": "age", "sortable": True},
+                {"name": "connected", "label": "Connected", "field": "connected"},
+                {"name": "elements", "label": "Elements", "field": "elements", "sortable": True},
+                {"name": "timers", "label": "Timers", "field": "timers", "sortable": True},
+                {"name": "active_timers", "label": "Active", "field": "active_timers"},
+                {"name": "listeners", "label": "Listeners", "field": "listeners"},
+            ],
+            rows=[],
+            row_key="id",
+        ).classes("w-full bg-gray-600 text-gray-100 mb-4")
+        schedule_table = ui.table(
+            columns=[
+                {"name": "id", "label": "Scheduled Job", "field": "id", "align": "left"},
+                {"name": "trigger", "label": "Trigger", "field": "trigger"},
+                {"name": "next_run", "label": "Next Run", "field": "next_run"},
+            ],
+            rows=[],
+            row_key="id",
+        ).classes("w-full bg-gray-600 text-gray-100")
+
+        def show_owners(title, owners, lines=()):
+            owners_title.set_text(title)
+            owners_table.rows = [
+                {"owner": owner, "size": _kb(size), "diff": _kb(size_diff), "count": count}
+                for owner, size_diff, count, size in owners
+            ]
+            lines_table.rows = [
+                {"line": line, "diff": _kb(size_diff), "count": count_diff, "size": _kb(size)}
+                for line, size_diff, count_diff, size in lines
+            ]
+            owners_table.update()
+            lines_table.update()
+            lines_table.set_visibility(bool(lines))
+
+        def refresh():
+            tracing = tracemalloc.is_tracing()
+            status_label.set_text(
+                f"Tracing {'on' if tracing else 'off'} | RSS {_process.memory_info().rss / 2**20:.1f} MB"
+                + (f" | traced {tracemalloc.get_traced_memory()[0] / 2**20:.1f} MB" if tracing else "")
+                + (f" | snapshot every {SNAPSHOT_INTERVAL}s" if SNAPSHOT_INTERVAL > 0 else "")
+            )
+            trace_button.set_text("Stop Tracing" if tracing else "Start Tracing")
+            snapshots_table.rows = [
+                {k: s[k] for k in ("id", "taken_at", "label", "rss_mb", "traced_mb")} for s in reversed(history)
+            ]
+            snapshots_table.update()
+            found = suspects()
+            suspects_label.set_text(
+                "Growing in every recent snapshot: " + ", ".join(f"{o} (+{_kb(g)} KB)" for o, g in found[:5])
+                if found
+                else ""
+            )
+            if history:
+                latest = history[-1]
+                owners = sorted(latest["owners"].items(), key=lambda o: o[1][0], reverse=True)[:TOP_LIMIT]
+                show_owners(
+                    f"By Source File ({latest['taken_at']})",
+                    [(owner, size, count, size) for owner, (size, count) in owners],
+                )
+
+        def refresh_live():
+            live = live_objects()
+            clients_table.rows = live["clients"]
+            schedule_table.rows = live["scheduler_jobs"]
+            clients_table.update()
+            schedule_table.update()
+            live_label.set_text(
+                f"{len(live['clients'])} pages | {live['running_tasks']} background tasks | "
+                f"{live['stale_timers']} timers of closed pages still referenced | "
+                f"{live['orphan_listeners']} listeners of closed pages | "
+                f"{len(live['stray_schedulers'])} schedulers outside core.jobs"
+            )
+
+        def toggle_tracing():
+            if tracemalloc.is_tracing():
+                stop()
+            else:
+                start()
+            refresh()
+
+        async def snapshot_now():
+            try:
+                await jobs.run("memory.take_snapshot", take_snapshot, "manual")
+            except Exception as e:
+                ui.notify(f"Snapshot failed: {str(e)}", type="negative")
+            refresh()
+
+        def compare():
+            selected = sorted(snapshots_table.selected, key=lambda s: s["id"])
+            if len(selected) != 2:
+                ui.notify("Select two snapshots to compare", type="warning")
+                return
+            old, new = selected
+            try:
+                owners, lines = diff(old["id"], new["id"])
+            except ValueError as e:
+                ui.notify(str(e), type="negative")
+                return
+            show_owners(f"Change from {old['taken_at']} to {new['taken_at']}", owners, lines)
+            if not lines:
+                ui.notify("Line-level detail is only kept for the latest snapshots", type="info")
+
+        lines_table.set_visibility(False)
+        refresh()
+        refresh_live()
@@ -0,0 +1,322 @@
+from nicegui import app, ui
+from fastapi.responses import PlainTextResponse
+import asyncio
+import functools
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from urllib.parse import urlsplit
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "50"))
+SLOW_QUERY_LOG_SIZE = 200
+
+_lock = threading.Lock()
+_timings = {}  # name -> [count, total_seconds, max_seconds]
+_http = {}  # (module, host) -> [count, total_seconds, errors, cache_hits]
+slow_queries = deque(maxlen=SLOW_QUERY_LOG_SIZE)
+
+
+def observe(name, seconds):
+    """Record one duration under `name`."""
+    with _lock:
+        stat = _timings.get(name)
+        if stat is None:
+            _timings[name] = [1, seconds, seconds]
+        else:
+            stat[0] += 1
+            stat[1] += seconds
+            if seconds > stat[2]:
+                stat[2] = seconds
+
+
+@contextmanager
+def timer(name):
+    """Time the enclosed block: `with metrics.timer("notes.refresh"): ...`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start)
+
+
+def timed(name=None):
+    """Decorator that records the latency of a sync or async handler."""
+
+    def decorator(fn):
+        label = name or f"{fn.__module__}.{fn.__qualname__}"
+        if asyncio.iscoroutinefunction(fn):
+
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    observe(label, time.perf_counter() - start)
+
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                observe(label, time.perf_counter() - start)
+
+        return wrapper
+
+    return decorator
+
+
+# --- SQLite statement timing ---
+def _record_query(path, sql, seconds):
+    observe("sqlite", seconds)
+    if seconds * 1000 >= SLOW_QUERY_MS:
+        with _lock:
+            slow_queries.appendleft(
+                (datetime.now().isoformat(timespec="seconds"), path, round(seconds * 1000, 2), " ".join(sql.split())[:500])
+            )
+
+
+class TimedCursor(sqlite3.Cursor):
+    """Cursor that times every statement, including fetching its rows; see core.db.connect.
+
+    SQLite does most of a SELECT's work while its rows are stepped through, so a
+    statement that returns rows is recorded once they run out, the next statement
+    starts, or the cursor is closed or collected.
+    """
+
+    _sql = None
+    _seconds = 0.0
+
+    def _flush(self):
+        if self._sql is not None:
+            sql, self._sql = self._sql, None
+            _record_query(self.connection.path, sql, self._seconds)
+
+    def _run(self, sql, run, *args):
+        self._flush()
+        start = time.perf_counter()
+        try:
+            return run(*args)
+        finally:
+            self._sql, self._seconds = sql, time.perf_counter() - start
+            if self.description is None:  # no rows to fetch
+                self._flush()
+
+    def _fetch(self, fetch, *args):
+        start = time.perf_counter()
+        try:
+            return fetch(*args)
+        finally:
+            self._seconds += time.perf_counter() - start
+
+    def execute(self, sql, parameters=()):
+        return self._run(sql, super().execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self._run(sql, super().executemany, sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self._run(sql_script, super().executescript, sql_script)
+
+    def fetchone(self):
+        row = self._fetch(super().fetchone)
+        if row is None:
+            self._flush()
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        rows = self._fetch(super().fetchmany, size)
+        if len(rows) < size:
+            self._flush()
+        return rows
+
+    def fetchall(self):
+        rows = self._fetch(super().fetchall)
+        self._flush()
+        return rows
+
+    def __next__(self, _next=sqlite3.Cursor.__next__, _clock=time.perf_counter):
+        # Called once per row, so kept lean
+        start = _clock()
+        try:
+            return _next(self)
+        except StopIteration:
+            self._flush()
+            raise
+        finally:
+            self._seconds += _clock() - start
+
+    def close(self):
+        self._flush()
+        super().close()
+
+    def __del__(self):
+        self._flush()
+
+
+class TimedConnection(sqlite3.Connection):
+    """Connection whose cursors (and shortcut execute methods) are timed."""
+
+    def __init__(self, database, *args, **kwargs):
+        super().__init__(database, *args, **kwargs)
+        self.path = str(database)
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    # sqlite3.Connection.execute* bypass an overridden cursor(), so route them explicitly
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+
+# --- Outbound HTTP (recorded by core.httpclient) ---
+def record_http(module, url, seconds, ok=True, cached=False):
+    """Count one outbound HTTP call made on behalf of `module`."""
+    host = urlsplit(url).hostname or "?"
+    with _lock:
+        stat = _http.get((module, host))
+        if stat is None:
+            stat = _http[(module, host)] = [0, 0.0, 0, 0]
+        stat[0] += 1
+        stat[1] += seconds
+        if not ok:
+            stat[2] += 1
+        if cached:
+            stat[3] += 1
+
+
+def snapshot():
+    """Return copies of all counters for display or export."""
+    with _lock:
+        timings = {name: list(stat) for name, stat in _timings.items()}
+        http = {key: list(stat) for key, stat in _http.items()}
+        slow = list(slow_queries)
+    return timings, http, slow
+
+
+def reset():
+    with _lock:
+        _timings.clear()
+        _http.clear()
+        slow_queries.clear()
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"')
+
+
+def prometheus_text():
+    """Render counters in the Prometheus text exposition format."""
+    timings, http, slow = snapshot()
+    lines = [
+        "# TYPE dashboard_handler_seconds summary",
+    ]
+    for name, (count, total, maximum) in sorted(timings.items()):
+        label = f'name="{_escape(name)}"'
+        lines.append(f"dashboard_handler_seconds_count{{{label}}} {count}")
+        lines.append(f"dashboard_handler_seconds_sum{{{label}}} {total:.6f}")
+        lines.append(f"dashboard_handler_seconds_max{{{label}}} {maximum:.6f}")
+    lines.append("# TYPE dashboard_http_requests_total counter")
+    for (module, host), (count, total, errors, cache_hits) in sorted(http.items()):
+        label = f'module="{_escape(module)}",host="{_escape(host)}"'
+        lines.append(f"dashboard_http_requests_total{{{label}}} {count}")
+        lines.append(f"dashboard_http_errors_total{{{label}}} {errors}")
+        lines.append(f"dashboard_http_cache_hits_total{{{label}}} {cache_hits}")
+        lines.append(f"dashboard_http_seconds_sum{{{label}}} {total:.6f}")
+    lines.append("# TYPE dashboard_slow_queries gauge")
+    lines.append(f"dashboard_slow_queries {len(slow)}")
+    return "\n".join(lines) + "\n"
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics_endpoint():
+    return prometheus_text()
+
+
+def render():
+    with ui.card().classes("p-6 bg-gray-700"):
+        ui.label("Diagnostics").classes("text-2xl font-semibold text-gray-100 mb-4")
+        ui.label(f"Slow query threshold: {SLOW_QUERY_MS:.0f} ms. Scrape /metrics for Prometheus.").classes(
+            "text-gray-400 text-sm mb-2"
+        )
+        ui.label("Handler Latency").classes("text-lg font-semibold text-gray-100")
+        timings_table = ui.table(
+            columns=[
+                {"name": "name", "label": "Name", "field": "name", "sortable": True},
+                {"name": "count", "label": "Calls", "field": "count", "sortable": True},
+                {"name": "avg", "label": "Avg ms", "field": "avg", "sortable": True},
+                {"name": "max", "label": "Max ms", "field": "max", "sortable": True},
+            ],
+            rows=[],
+            row_key="name",
+        ).classes("w-full bg-gray-600 text-gray-100 mb-4")
+        ui.label("Outbound HTTP").classes("text-lg font-semibold text-gray-100")
+        http_table = ui.table(
+            columns=[
+                {"name": "module", "label": "Module", "field": "module", "sortable": True},
+                {"name": "host", "label": "Host", "field": "host"},
+                {"name": "count", "label": "Calls", "field": "count", "sortable": True},
+                {"name": "errors", "label": "Errors", "field": "errors"},
+                {"name": "cached", "label": "Cache Hits", "field": "cached"},
+                {"name": "avg", "label": "Avg ms", "field": "avg", "sortable": True},
+            ],
+            rows=[],
+        ).classes("w-full bg-gray-600 text-gray-100 mb-4")
+        ui.label("Slow Queries").classes("text-lg font-semibold text-gray-100")
+        slow_table = ui.table(
+            columns=[
+                {"name": "time", "label": "Time", "field": "time"},
+                {"name": "db", "label": "Database", "field": "db"},
+                {"name": "ms", "label": "ms", "field": "ms"},
+                {"name": "sql", "label": "Statement", "field": "sql", "align": "left"},
+            ],
+            rows=[],
+        ).classes("w-full bg-gray-600 text-gray-100 mb-4")
+
+        def refresh():
+            timings, http, slow = snapshot()
+            timings_table.rows = [
+                {"name": name, "count": count, "avg": round(total / count * 1000, 2), "max": round(maximum * 1000, 2)}
+                for name, (count, total, maximum) in sorted(timings.items())
+            ]
+            http_table.rows = [
+                {
+                    "module": module,
+                    "host": host,
+                    "count": count,
+                    "errors": errors,
+                    "cached": cache_hits,
+                    "avg": round(total / count * 1000, 1),
+                }
+                for (module, host), (count, total, errors, cache_hits) in sorted(http.items())
+            ]
+            slow_table.rows = [
+                {"time": ts, "db": path, "ms": ms, "sql": sql} for ts, path, ms, sql in slow
+            ]
+            timings_table.update()
+            http_table.update()
+            slow_table.update()
+
+        with ui.row():
+            ui.button("Refresh", on_click=refresh).classes(
+                "bg-blue-600 hover:bg-blue-500 text-white rounded px-4 py-2"
+            )
+            ui.button("Reset", on_click=lambda: [reset(), refresh()]).classes(
+                "bg-gray-600 hover:bg-gray-500 text-white rounded px-4 py-2"
+            )
+        ui.timer(5.0, refresh)
+        refresh()
@@ -1,14 +1,39 @@
-from nicegui import ui
-import sqlite3
+from nicegui import app, ui
+from core import db
+from core import metrics
 from datetime import datetime
-import json
-import markdown2
+import html
+import os
+import re
+import threading
+from core import export
 from core import gdrive
+from core import events
+from core import jobs
+from core.markdown_render import content_hash, markdown_html, preview_text, render_html
 
-import bleach
+# BM25 column weights for full-text search: title, content, tags, category
+RANK = "bm25(10.0, 1.0, 5.0, 2.0)"
+PAGE_SIZE = 30
+SYNC_DIR = os.path.join("exports", "notes_sync")
+COMPACT_AFTER_DELTAS = int(os.getenv("NOTES_COMPACT_AFTER_DELTAS", "50"))
+COMPACT_INTERVAL = int(os.getenv("NOTES_COMPACT_INTERVAL_SECONDS", str(7 * 24 * 3600)))
+BACKFILL_BATCH = 500
+FACET_LIMIT = 50
+
+# Triggers cannot use CTEs, so a comma-separated tags value is split by turning it into
+# a JSON array for json_each. Values that still are not valid JSON (control characters) index no tags.
+_TAG_ARRAY = """'["' || replace(replace(replace({tags}, '\\', '\\\\'), '"', '\\"'), ',', '","') || '"]'"""
+_TAG_VALUES = f"json_each(CASE WHEN json_valid({_TAG_ARRAY}) THEN {_TAG_ARRAY} ELSE '[]' END)"
+TAG_NAMES_SQL = f"SELECT DISTINCT trim(j.value) FROM {{source}}{_TAG_VALUES} j WHERE trim(j.value) <> ''"
+# tags.name is NOCASE, so "Python" and "python" link to the same tag
+NOTE_TAGS_SQL = (
+    f"SELECT {{note_id}}, t.id FROM {{source}}{_TAG_VALUES} j "
+    "JOIN tags t ON t.name = trim(j.value) WHERE trim(j.value) <> ''"
+)
 
 def init_db():
-    conn = sqlite3.connect("links.db")
+    conn = db.connect("links.db")
     c = conn.cursor()
     # Add category column if not exists
     c.execute("CREATE TABLE IF NOT EXISTS notes (id INTEGER PRIMARY KEY, title TEXT, content TEXT, tags TEXT, category TEXT, created_at TEXT)")
@@ -19,58 +44,560 @@ def init_db():
     if "category" not in columns:
         c.execute("ALTER TABLE notes ADD COLUMN category TEXT")
         conn.commit()
+    # Sanitized HTML rendered on write; content_hash is the hash of the content it was rendered from
+    for column in ("content_hash", "content_html", "preview_html"):
+        if column not in columns:
+            c.execute(f"ALTER TABLE notes ADD COLUMN {column} TEXT")
+    conn.commit()
+    # Content changed without new HTML (e.g. by an import): drop the stale HTML for the backfill
+    c.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS notes_html_stale AFTER UPDATE OF content ON notes
+        WHEN new.content IS NOT old.content AND new.content_hash IS old.content_hash BEGIN
+            UPDATE notes SET content_hash = NULL, content_html = NULL, preview_html = NULL WHERE id = new.id;
+        END
+        """
+    )
+    # Full-text index over the notes table, kept in sync by triggers
+    c.execute("SELECT 1 FROM sqlite_master WHERE name = 'notes_fts'")
+    fts_exists = c.fetchone() is not None
+    c.executescript(
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts USING fts5(
+            title, content, tags, category,
+            content='notes', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        );
+        CREATE TRIGGER IF NOT EXISTS notes_fts_insert AFTER INSERT ON notes BEGIN
+            INSERT INTO notes_fts(rowid, title, content, tags, category)
+            VALUES (new.id, new.title, new.content, new.tags, new.category);
+        END;
+        CREATE TRIGGER IF NOT EXISTS notes_fts_delete AFTER DELETE ON notes BEGIN
+            INSERT INTO notes_fts(notes_fts, rowid, title, content, tags, category)
+            VALUES ('delete', old.id, old.title, old.content, old.tags, old.category);
+        END;
+        CREATE TRIGGER IF NOT EXISTS notes_fts_update AFTER UPDATE OF title, content, tags, category ON notes BEGIN
+            INSERT INTO notes_fts(notes_fts, rowid, title, content, tags, category)
+            VALUES ('delete', old.id, old.title, old.content, old.tags, old.category);
+            INSERT INTO notes_fts(rowid, title, content, tags, category)
+            VALUES (new.id, new.title, new.content, new.tags, new.category);
+        END;
+        """
+    )
+    c.execute("INSERT INTO notes_fts(notes_fts, rank) VALUES ('rank', ?)", (RANK,))
+    # Change tracking for sync: every write takes the next change_seq from sync_state and
+    # deletes leave a tombstone, so a sync reads exactly the changes after its cursor
+    for column in ("updated_at", "change_seq"):
+        if column not in columns:
+            c.execute(f"ALTER TABLE notes ADD COLUMN {column} {'INTEGER' if column == 'change_seq' else 'TEXT'}")
+    c.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS sync_state (
+            name TEXT PRIMARY KEY,
+            change_seq INTEGER NOT NULL DEFAULT 0,
+            synced_seq INTEGER NOT NULL DEFAULT 0,
+            last_sync TEXT,
+            last_compaction TEXT,
+            deltas INTEGER NOT NULL DEFAULT 0
+        );
+        INSERT OR IGNORE INTO sync_state (name) VALUES ('notes');
+        CREATE TABLE IF NOT EXISTS notes_tombstones (id INTEGER PRIMARY KEY, deleted_at TEXT, change_seq INTEGER);
+        CREATE INDEX IF NOT EXISTS idx_notes_change_seq ON notes(change_seq);
+        CREATE INDEX IF NOT EXISTS idx_notes_tombstones_change_seq ON notes_tombstones(change_seq);
+        CREATE TRIGGER IF NOT EXISTS notes_sync_insert AFTER INSERT ON notes BEGIN
+            UPDATE sync_state SET change_seq = change_seq + 1 WHERE name = 'notes';
+            UPDATE notes SET updated_at = strftime('%Y-%m-%dT%H:%M:%fZ', 'now'),
+                change_seq = (SELECT change_seq FROM sync_state WHERE name = 'notes') WHERE id = new.id;
+            DELETE FROM notes_tombstones WHERE id = new.id;
+        END;
+        CREATE TRIGGER IF NOT EXISTS notes_sync_update AFTER UPDATE OF title, content, tags, category ON notes BEGIN
+            UPDATE sync_state SET change_seq = change_seq + 1 WHERE name = 'notes';
+            UPDATE notes SET updated_at = strftime('%Y-%m-%dT%H:%M:%fZ', 'now'),
+                change_seq = (SELECT change_seq FROM sync_state WHERE name = 'notes') WHERE id = new.id;
+        END;
+        CREATE TRIGGER IF NOT EXISTS notes_sync_delete AFTER DELETE ON notes BEGIN
+            UPDATE sync_state SET change_seq = change_seq + 1 WHERE name = 'notes';
+            INSERT OR REPLACE INTO notes_tombstones (id, deleted_at, change_seq)
+            VALUES (old.id, strftime('%Y-%m-%dT%H:%M:%fZ', 'now'), (SELECT change_seq FROM sync_state WHERE name = 'notes'));
+        END;
+        """
+    )
+    # Notes from before change tracking have change_seq 0; the first sync is a full snapshot anyway
+    c.execute("UPDATE notes SET updated_at = strftime('%Y-%m-%dT%H:%M:%fZ', 'now'), change_seq = 0 WHERE change_seq IS NULL")
+    # The list pages newest first by (created_at, id); a NULL created_at would never compare as older
+    c.execute("UPDATE notes SET created_at = '' WHERE created_at IS NULL")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_notes_created ON notes(created_at, id)")
+    # Normalized tags: one row per distinct tag (case-insensitive) with its note count, and
+    # the note_tags links, both kept in step with notes.tags by triggers
+    c.execute("SELECT 1 FROM sqlite_master WHERE name = 'note_tags'")
+    tags_exist = c.fetchone() is not None
+    c.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS tags (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE COLLATE NOCASE,
+            note_count INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE TABLE IF NOT EXISTS note_tags (
+            note_id INTEGER NOT NULL,
+            tag_id INTEGER NOT NULL,
+            PRIMARY KEY (note_id, tag_id)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS idx_note_tags_tag ON note_tags(tag_id, note_id);
+        CREATE INDEX IF NOT EXISTS idx_tags_count ON tags(note_count DESC, name);
+        """
+    )
+    if not tags_exist:
+        # Split the tags of notes written before the tag tables existed
+        c.execute(f"INSERT OR IGNORE INTO tags (name) {TAG_NAMES_SQL.format(tags='notes.tags', source='notes, ')}")
+        c.execute(f"INSERT OR IGNORE INTO note_tags (note_id, tag_id) {NOTE_TAGS_SQL.format(note_id='notes.id', tags='notes.tags', source='notes, ')}")
+        c.execute("UPDATE tags SET note_count = (SELECT count(*) FROM note_tags WHERE tag_id = tags.id)")
+    c.executescript(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS note_tags_count_insert AFTER INSERT ON note_tags BEGIN
+            UPDATE tags SET note_count = note_count + 1 WHERE id = new.tag_id;
+        END;
+        CREATE TRIGGER IF NOT EXISTS note_tags_count_delete AFTER DELETE ON note_tags BEGIN
+            UPDATE tags SET note_count = note_count - 1 WHERE id = old.tag_id;
+        END;
+        CREATE TRIGGER IF NOT EXISTS notes_tags_insert AFTER INSERT ON notes WHEN new.tags IS NOT NULL BEGIN
+            INSERT OR IGNORE INTO tags (name) {TAG_NAMES_SQL.format(tags='new.tags', source='')};
+            INSERT OR IGNORE INTO note_tags (note_id, tag_id) {NOTE_TAGS_SQL.format(note_id='new.id', tags='new.tags', source='')};
+        END;
+        CREATE TRIGGER IF NOT EXISTS notes_tags_update AFTER UPDATE OF tags ON notes WHEN new.tags IS NOT old.tags BEGIN
+            DELETE FROM note_tags WHERE note_id = new.id;
+            INSERT OR IGNORE INTO tags (name) {TAG_NAMES_SQL.format(tags='new.tags', source='')};
+            INSERT OR IGNORE INTO note_tags (note_id, tag_id) {NOTE_TAGS_SQL.format(note_id='new.id', tags='new.tags', source='')};
+        END;
+        CREATE TRIGGER IF NOT EXISTS notes_tags_delete AFTER DELETE ON notes BEGIN
+            DELETE FROM note_tags WHERE note_id = old.id;
+        END;
+        """
+    )
+    if not fts_exists:
+        # Index notes written before the FTS table existed
+        c.execute("INSERT INTO notes_fts(notes_fts) VALUES ('rebuild')")
+    conn.commit()
     conn.close()
 
 init_db()
 
-def render():
-    with ui.card().classes("p-6 bg-gray-700"):
-        ui.label("Notes").classes("text-2xl font-semibold text-gray-100 mb-4")
-        search_input = ui.input("Search by title or tags").props("clearable").classes("bg-gray-600 text-white rounded w-full mb-4")
-        notes_list = ui.list().classes("w-full")
+NOTES_QUERY = "SELECT id, title, content, tags, category FROM notes ORDER BY created_at DESC"
+# List rows carry no content: (id, title, tags, category, preview_html, created_at)
+LIST_COLUMNS = "id, title, tags, category, preview_html, created_at"
+PAGE_QUERY = f"SELECT {LIST_COLUMNS} FROM notes {{where}} ORDER BY created_at DESC, id DESC LIMIT ?"
+SEARCH_LIMIT = 100
+# bm25 costs a few microseconds per match. A query matching more notes than this
+# is too broad for ranking to help, so its matches are listed newest first instead.
+RANK_MAX_MATCHES = 5000
+# The inner query only computes snippets for the rows it returns; FTS5 orders by rank or rowid itself
+SEARCH_QUERY = (
+    "SELECT n.id, n.title, n.tags, n.category, n.preview_html, n.created_at, f.snippet FROM ("
+    "SELECT rowid, {position} AS position, snippet(notes_fts, 1, char(2), char(3), '...', 16) AS snippet "
+    "FROM notes_fts WHERE notes_fts MATCH ?{tagged} ORDER BY {order} LIMIT ? OFFSET ?"
+    ") f JOIN notes n ON n.id = f.rowid ORDER BY f.position"
+)
+# FTS5's own rank order scores every match before other filters apply; with a tag filter the
+# same bm25 written out is only evaluated for the notes that pass it
+TAGGED_RANK = RANK.replace("bm25(", "bm25(notes_fts, ")
+SEARCH_ORDERS = {
+    "ranked": {"position": "rank", "order": "rank"},
+    "tagged": {"position": TAGGED_RANK, "order": TAGGED_RANK},
+    "recent": {"position": "-rowid", "order": "rowid DESC"},
+}
+# Notes carrying all (or any) of a set of tag ids, read from the tag_id index
+ALL_TAGS_QUERY = "SELECT note_id FROM note_tags WHERE tag_id IN ({marks}) GROUP BY note_id HAVING count(*) = ?"
+ANY_TAGS_QUERY = "SELECT note_id FROM note_tags WHERE tag_id IN ({marks})"
+TAG_COUNTS_QUERY = "SELECT name, note_count FROM tags WHERE note_count > 0 ORDER BY note_count DESC, name LIMIT ?"
+SEARCH_EXPORT_QUERY = (
+    "SELECT n.id, n.title, n.content, n.tags, n.category "
+    "FROM notes_fts JOIN notes n ON n.id = notes_fts.rowid WHERE notes_fts MATCH ? ORDER BY rank"
+)
 
-        def load_notes():
-            conn = sqlite3.connect("links.db")
-            c = conn.cursor()
-            search = f"%{search_input.value}%" if search_input.value else "%"
+def load_note_html(note_id):
+    """Return (content_hash, content_html) as stored for a note."""
+    conn = db.connect("links.db")
+    c = conn.cursor()
+    c.execute("SELECT content_hash, content_html FROM notes WHERE id = ?", (note_id,))
+    row = c.fetchone()
+    conn.close()
+    return row or (None, None)
+
+def backfill_html(job):
+    """Render HTML for notes that have none, in parallel on the CPU pool."""
+    conn = db.connect("links.db")
+    c = conn.cursor()
+    c.execute("SELECT count(*) FROM notes WHERE content_hash IS NULL")
+    total = c.fetchone()[0]
+    done = 0
+    last_id = -1
+    while done < total:
+        job.check_cancelled()
+        c.execute(
+            "SELECT id, content FROM notes WHERE content_hash IS NULL AND id > ? ORDER BY id LIMIT ?",
+            (last_id, BACKFILL_BATCH),
+        )
+        rows = c.fetchall()
+        if not rows:
+            break
+        rendered = jobs.cpu_pool().map(render_html, [content for _, content in rows], chunksize=50)
+        # Skip rows edited meanwhile; their writer stored fresh HTML
+        c.executemany(
+            "UPDATE notes SET content_hash = ?, content_html = ?, preview_html = ? WHERE id = ? AND content IS ?",
+            [(h, full, preview, note_id, content) for (note_id, content), (h, full, preview) in zip(rows, rendered)],
+        )
+        conn.commit()
+        last_id = rows[-1][0]
+        done += len(rows)
+        job.set_progress(done / total, f"{done}/{total} notes")
+    conn.close()
+    return done
+
+# Started from the app, not at import, so scripts importing notes don't kick it off
+app.on_startup(lambda: jobs.submit("notes.backfill_html", backfill_html, report=True))
+
+# --- Drive sync: compact JSONL deltas on top of periodic full snapshots ---
+SYNC_CHANGES_QUERY = (
+    "SELECT 'upsert' AS op, id, title, content, tags, category, created_at, updated_at, change_seq "
+    "FROM notes WHERE change_seq > ? AND change_seq <= ? "
+    "UNION ALL SELECT 'delete', id, NULL, NULL, NULL, NULL, NULL, deleted_at, change_seq "
+    "FROM notes_tombstones WHERE change_seq > ? AND change_seq <= ? "
+    "ORDER BY change_seq"
+)
+SYNC_SNAPSHOT_QUERY = (
+    "SELECT 'upsert' AS op, id, title, content, tags, category, created_at, updated_at, change_seq "
+    "FROM notes ORDER BY id"
+)
+
+def load_sync_state():
+    """Return (change_seq, synced_seq, last_sync, last_compaction, deltas) for notes."""
+    conn = db.connect("links.db")
+    c = conn.cursor()
+    c.execute("SELECT change_seq, synced_seq, last_sync, last_compaction, deltas FROM sync_state WHERE name = 'notes'")
+    state = c.fetchone()
+    conn.close()
+    return state
+
+# Held for a whole sync or compaction (re-entrant: a sync may turn into one), so a
+# scheduled compaction and a manual sync never interleave reads and writes of
+# sync_state or delete each other's files
+_sync_lock = threading.RLock()
+
+def _upload_sync_file(path, upload):
+    if upload:
+        gdrive.upload_file(path, name=os.path.basename(path))
+
+def _advance_sync_state(c, expected, upto, snapshot):
+    """Move synced_seq from `expected` to `upto` in one IMMEDIATE transaction; False if it had moved."""
+    now = datetime.now().isoformat(timespec="seconds")
+    c.execute("BEGIN IMMEDIATE")
+    try:
+        c.execute("SELECT synced_seq FROM sync_state WHERE name = 'notes'")
+        if c.fetchone()[0] != expected:
+            c.execute("ROLLBACK")
+            return False
+        if snapshot:
+            c.execute(
+                "UPDATE sync_state SET synced_seq = ?, last_sync = ?, last_compaction = ?, deltas = 0 WHERE name = 'notes'",
+                (upto, now, now),
+            )
+            # The snapshot no longer contains deleted notes, so their tombstones are done
+            c.execute("DELETE FROM notes_tombstones WHERE change_seq <= ?", (upto,))
+        else:
             c.execute(
-                "SELECT id, title, content, tags, category FROM notes WHERE title LIKE ? OR tags LIKE ? ORDER BY created_at DESC",
-                (search, search)
+                "UPDATE sync_state SET synced_seq = ?, last_sync = ?, deltas = deltas + 1 WHERE name = 'notes'",
+                (upto, now),
             )
-            return c.fetchall()
+        c.execute("COMMIT")
+    except BaseException:
+        c.execute("ROLLBACK")
+        raise
+    return True
+
+def compact_notes_sync(job=None, upload=True):
+    """Write and upload a full snapshot; later deltas apply on top of it."""
+    with _sync_lock:
+        os.makedirs(SYNC_DIR, exist_ok=True)
+        conn = db.connect("links.db")
+        try:
+            c = conn.cursor()
+            # One read transaction, so the snapshot and its sequence numbers agree
+            c.execute("BEGIN")
+            c.execute("SELECT change_seq, synced_seq FROM sync_state WHERE name = 'notes'")
+            upto, synced_seq = c.fetchone()
+            path = os.path.join(SYNC_DIR, f"notes_snapshot_{upto:010d}.jsonl.gz")
+            c.execute(SYNC_SNAPSHOT_QUERY)
+            count = export.export_cursor(c, path)
+            c.execute("COMMIT")
+            _upload_sync_file(path, upload)
+            if not _advance_sync_state(c, synced_seq, upto, snapshot=True):
+                raise RuntimeError("Notes sync state changed during compaction")
+        finally:
+            conn.close()
+        # Local files the snapshot covers (their last sequence number is at most upto) are superseded
+        for name in os.listdir(SYNC_DIR):
+            numbers = re.findall(r"\d+", name)
+            if name != os.path.basename(path) and numbers and int(numbers[-1]) <= upto:
+                os.remove(os.path.join(SYNC_DIR, name))
+        return {"kind": "snapshot", "changes": count, "file": path}
+
+def sync_notes(job=None, upload=True):
+    """Export and upload the notes changed since the last successful sync.
+
+    Cost follows the number of changes: both tables are read through their
+    change_seq index. With no snapshot yet, or after COMPACT_AFTER_DELTAS deltas,
+    a full snapshot is written instead.
+    """
+    with _sync_lock:
+        change_seq, synced_seq, _, last_compaction, deltas = load_sync_state()
+        if last_compaction is None or deltas >= COMPACT_AFTER_DELTAS:
+            return compact_notes_sync(job, upload)
+        if change_seq == synced_seq:
+            return {"kind": "delta", "changes": 0, "file": None}
+        os.makedirs(SYNC_DIR, exist_ok=True)
+        path = os.path.join(SYNC_DIR, f"notes_delta_{synced_seq + 1:010d}_{change_seq:010d}.jsonl")
+        count = export.export_query(
+            "links.db", SYNC_CHANGES_QUERY, path, params=(synced_seq, change_seq, synced_seq, change_seq)
+        )
+        _upload_sync_file(path, upload)
+        # Advance the cursor only after the upload succeeded
+        conn = db.connect("links.db")
+        try:
+            if not _advance_sync_state(conn.cursor(), synced_seq, change_seq, snapshot=False):
+                raise RuntimeError("Notes sync state changed during sync")
+        finally:
+            conn.close()
+        return {"kind": "delta", "changes": count, "file": path}
+
+def _scheduled_compaction():
+    # Uploading without a token would start the interactive OAuth flow
+    if gdrive.drive_connected():
+        compact_notes_sync()
+
+jobs.schedule("notes.compact_sync", _scheduled_compaction, seconds=COMPACT_INTERVAL)
+
+def fts_query(search):
+    """Turn free text into an FTS5 query; the last word is a prefix so results follow typing."""
+    words = re.findall(r"\w+", search or "")
+    terms = [f'"{word}"' for word in words]
+    if words and len(words[-1]) >= 2:  # a single letter would expand to most of the vocabulary
+        terms[-1] += "*"
+    return " ".join(terms)
+
+def tag_counts(limit=FACET_LIMIT):
+    """Return [(tag, note count)] for the most used tags, read from the maintained counts."""
+    conn = db.connect("links.db")
+    c = conn.cursor()
+    c.execute(TAG_COUNTS_QUERY, (limit,))
+    counts = c.fetchall()
+    conn.close()
+    return counts
+
+def _tag_filter(c, tags, match_all):
+    """Return (subquery, params) selecting the ids of notes with all/any of tags, or None without tags."""
+    if not tags:
+        return None
+    c.execute(f"SELECT id FROM tags WHERE name IN ({','.join('?' * len(tags))})", list(tags))
+    tag_ids = [row[0] for row in c.fetchall()]
+    if match_all and len(tag_ids) < len(set(tag.lower() for tag in tags)):
+        tag_ids = [-1]  # an unknown tag: no note has all of them
+    marks = ",".join("?" * len(tag_ids)) or "NULL"
+    if match_all:
+        return ALL_TAGS_QUERY.format(marks=marks), [*tag_ids, len(tag_ids)]
+    return ANY_TAGS_QUERY.format(marks=marks), tag_ids
+
+def search_notes(search, limit=SEARCH_LIMIT, offset=0, tags=(), match_all=True):
+    """Best matches first as list rows, each with a snippet of the content around the match."""
+    query = fts_query(search)
+    conn = db.connect("links.db")
+    c = conn.cursor()
+    tagged, tag_params = "", []
+    tag_filter = _tag_filter(c, tags, match_all)
+    if tag_filter:
+        # "+rowid" keeps the set out of FTS5, which would otherwise run the match once per id
+        tagged, tag_params = f" AND +rowid IN ({tag_filter[0]})", tag_filter[1]
+    # Broadness is judged before the tag filter: it bounds how many matches bm25 has to score
+    c.execute("SELECT count(*) FROM (SELECT rowid FROM notes_fts WHERE notes_fts MATCH ? LIMIT ?)", (query, RANK_MAX_MATCHES + 1))
+    broad = c.fetchone()[0] > RANK_MAX_MATCHES
+    order = "recent" if broad else "tagged" if tagged else "ranked"
+    c.execute(SEARCH_QUERY.format(tagged=tagged, **SEARCH_ORDERS[order]), (query, *tag_params, limit, offset))
+    notes = _with_previews(c, c.fetchall())
+    conn.close()
+    return notes
+
+def _with_previews(c, notes):
+    """Render previews for rows the HTML backfill has not reached yet."""
+    missing = [note[0] for note in notes if note[4] is None]
+    if not missing:
+        return notes
+    c.execute(f"SELECT id, content FROM notes WHERE id IN ({','.join('?' * len(missing))})", missing)
+    previews = {note_id: markdown_html(preview_text(content)) for note_id, content in c.fetchall()}
+    return [note[:4] + (previews.get(note[0], ""),) + note[5:] if note[4] is None else note for note in notes]
+
+def snippet_html(snippet):
+    """Escape a search snippet and highlight the matched words."""
+    return html.escape(snippet).replace("\x02", "<mark>").replace("\x03", "</mark>")
+
+def load_notes(search="", cursor=None, limit=PAGE_SIZE, tags=(), match_all=True):
+    """Return (rows, next_cursor) for one page of the list; next_cursor is None on the last page.
+
+    Without a search the list is newest first and the cursor is the (created_at, id)
+    of the last row, so every page is an index seek. Search results are ranked, so
+    their cursor is an offset; they have an extra snippet column. With tags, only
+    notes carrying all of them (or any, when match_all is False) are listed.
+    """
+    if fts_query(search):
+        offset = cursor or 0
+        notes = search_notes(search, limit, offset, tags, match_all)
+        return notes, (offset + limit if len(notes) == limit else None)
+    conn = db.connect("links.db")
+    c = conn.cursor()
+    conditions, params = [], []
+    if cursor is not None:
+        conditions.append("(created_at, id) < (?, ?)")
+        params.extend(cursor)
+    tag_filter = _tag_filter(c, tags, match_all)
+    if tag_filter:
+        conditions.append(f"id IN ({tag_filter[0]})")
+        params.extend(tag_filter[1])
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    c.execute(PAGE_QUERY.format(where=where), (*params, limit))
+    notes = _with_previews(c, c.fetchall())
+    conn.close()
+    return notes, ((notes[-1][5], notes[-1][0]) if len(notes) == limit else None)
+
+def load_note(note_id):
+    """Return the full (id, title, content, tags, category) of one note, or None."""
+    conn = db.connect("links.db")
+    c = conn.cursor()
+    c.execute("SELECT id, title, content, tags, category FROM notes WHERE id = ?", (note_id,))
+    note = c.fetchone()
+    conn.close()
+    return note
+
+def render():
+    with ui.card().classes("p-6 bg-gray-700"):
+        ui.label("Notes").classes("text-2xl font-semibold text-gray-100 mb-4")
+        search_input = ui.input("Search notes").props("clearable debounce=250").classes("bg-gray-600 text-white rounded w-full mb-4")
+        selected_tags = {}  # lowercased tag -> tag, as shown in the facets
+        with ui.row().classes("w-full no-wrap gap-4"):
+            with ui.column().classes("w-48 shrink-0"):
+                ui.label("Tags").classes("text-lg font-semibold text-gray-100")
+                match_toggle = ui.toggle({True: "All", False: "Any"}, value=True)
+                facets = ui.column().classes("gap-1")
+            # Only the scroll area's own content is sent; more pages load as it nears the bottom
+            notes_area = ui.scroll_area().classes("grow h-[70vh]")
+            with notes_area:
+                notes_list = ui.list().classes("w-full")
 
         def save_note(title, content, tags, category):
-            conn = sqlite3.connect("links.db")
+            h, content_html, preview_html = render_html(content)
+            created_at = datetime.now().isoformat()
+            conn = db.connect("links.db")
             c = conn.cursor()
             c.execute(
-                "INSERT INTO notes (title, content, tags, category, created_at) VALUES (?, ?, ?, ?, ?)",
-                (title, content, tags, category, datetime.now().isoformat())
+                "INSERT INTO notes (title, content, tags, category, created_at, content_hash, content_html, preview_html) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (title, content, tags, category, created_at, h, content_html, preview_html)
             )
             conn.commit()
+            note_id = c.lastrowid
             conn.close()
+            events.row_inserted("notes", note_id, note=(note_id, title, tags, category, preview_html, created_at))
 
         def delete_note(note_id):
-            conn = sqlite3.connect("links.db")
+            conn = db.connect("links.db")
             c = conn.cursor()
             c.execute("DELETE FROM notes WHERE id = ?", (note_id,))
             conn.commit()
             conn.close()
-            refresh_notes()
+            events.row_deleted("notes", note_id)
+
+        note_cards = {}  # note_id -> card
+        next_cursor = None  # None once the last page is shown
+
+        def fill_card(card, note, snippet=None):
+            note_id, title, tags, category, preview_html, _ = note
+            card.clear()
+            with card:
+                ui.label(title or "Untitled").classes("text-lg font-semibold text-gray-100")
+                if snippet:
+                    ui.html(snippet_html(snippet)).classes("text-gray-300")
+                else:
+                    ui.html(preview_html or "").classes("nicegui-markdown text-gray-300")
+                if tags:
+                    ui.label(f"Tags: {tags}").classes("text-gray-400 text-sm")
+                if category:
+                    ui.label(f"Category: {category}").classes("text-gray-400 text-sm")
+                with ui.row():
+                    ui.button("Edit", on_click=lambda i=note_id: edit_note(i)).classes("bg-blue-600 hover:bg-blue-500 text-white rounded px-2 py-1")
+                    ui.button("Delete", on_click=lambda i=note_id: delete_note(i)).classes("bg-red-600 hover:bg-red-500 text-white rounded px-2 py-1")
+
+        def render_note(note, snippet=None):
+            with notes_list:
+                card = ui.card().classes("p-4 bg-gray-600 mb-2")
+            fill_card(card, note, snippet)
+            note_cards[note[0]] = card
+            return card
 
+        @metrics.timed("notes.load_more")
+        def load_more():
+            nonlocal next_cursor
+            notes, next_cursor = load_notes(search_input.value, next_cursor, tags=list(selected_tags.values()), match_all=match_toggle.value)
+            for note in notes:
+                render_note(note[:6], note[6] if len(note) > 6 else None)
+
+        @metrics.timed("notes.refresh_notes")
         def refresh_notes():
+            nonlocal next_cursor
             notes_list.clear()
-            for note_id, title, content, tags, category in load_notes():
-                with notes_list:
-                    with ui.card().classes("p-4 bg-gray-600 mb-2"):
-                        ui.label(title or "Untitled").classes("text-lg font-semibold text-gray-100")
-                        ui.markdown(bleach.clean(markdown2.markdown(content[:100] + ("..." if len(content) > 100 else "")), tags=bleach.sanitizer.ALLOWED_TAGS + ['p', 'pre', 'span', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6'], attributes=bleach.sanitizer.ALLOWED_ATTRIBUTES)).classes("text-gray-300")
-                        if tags:
-                            ui.label(f"Tags: {tags}").classes("text-gray-400 text-sm")
-                        if category:
-                            ui.label(f"Category: {category}").classes("text-gray-400 text-sm")
-                        with ui.row():
-                            ui.button("Edit", on_click=lambda n=(note_id, title, content, tags, category): edit_note(n)).classes("bg-blue-600 hover:bg-blue-500 text-white rounded px-2 py-1")
-                            ui.button("Delete", on_click=lambda i=note_id: delete_note(i)).classes("bg-red-600 hover:bg-red-500 text-white rounded px-2 py-1")
+            note_cards.clear()
+            next_cursor = None
+            load_more()
+            notes_area.scroll_to(percent=0)
+
+        def on_scroll(e):
+            remaining = e.args["verticalSize"] - e.args["verticalPosition"] - e.args["verticalContainerSize"]
+            if next_cursor is not None and remaining < 600:  # pixels left below the viewport
+                load_more()
+
+        notes_area.on("scroll", on_scroll, args=["verticalPosition", "verticalSize", "verticalContainerSize"], throttle=0.2)
+
+        def toggle_tag(tag, selected):
+            if selected:
+                selected_tags[tag.lower()] = tag
+            else:
+                selected_tags.pop(tag.lower(), None)
+            refresh_notes()
+
+        def refresh_facets():
+            counts = tag_counts()
+            shown = {tag.lower() for tag, _ in counts}
+            # Keep selected tags visible even when they drop out of the top FACET_LIMIT
+            counts += [(tag, 0) for key, tag in selected_tags.items() if key not in shown]
+            facets.clear()
+            with facets:
+                for tag, count in counts:
+                    ui.chip(
+                        f"{tag} ({count})",
+                        selectable=True,
+                        selected=tag.lower() in selected_tags,
+                        on_selection_change=lambda e, t=tag: toggle_tag(t, e.value),
+                    ).props("dense")
+
+        match_toggle.on_value_change(refresh_notes)
+
+        def on_note_changed(e):
+            refresh_facets()
+            if fts_query(search_input.value) or selected_tags:
+                refresh_notes()  # ranking or tag membership may change; re-running the query is cheap
+            elif e.action == "insert":
+                render_note(e.data["note"]).move(target_index=0)  # newest first
+            elif e.action == "update" and e.id in note_cards:
+                fill_card(note_cards[e.id], e.data["note"])
+            elif e.action == "delete" and e.id in note_cards:
+                notes_list.remove(note_cards.pop(e.id))
+
+        events.listen("notes", on_note_changed)
 
         def add_note():
             with ui.dialog().props("persistent") as dialog, ui.card().classes("p-4 bg-gray-700"):
@@ -80,10 +607,10 @@ def render():
                 tags = ui.input("Tags (comma-separated)").props("clearable").classes("bg-gray-600 text-white rounded w-full mb-2")
                 category = ui.input("Category").props("clearable").classes("bg-gray-600 text-white rounded w-full mb-2")
                 preview_checkbox = ui.checkbox("Preview").classes("mb-2")
-                preview_markdown = ui.markdown("").classes("text-gray-300 hidden")
+                preview_markdown = ui.html("").classes("nicegui-markdown text-gray-300 hidden")
                 def toggle_preview(e):
                     if e.value:
-                        preview_markdown.content = bleach.clean(markdown2.markdown(content.value), tags=bleach.sanitizer.ALLOWED_TAGS + ['p', 'pre', 'span', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6'], attributes=bleach.sanitizer.ALLOWED_ATTRIBUTES)
+                        preview_markdown.content = markdown_html(content.value)
                         preview_markdown.classes("block")
                         content.classes("hidden")
                     else:
@@ -91,12 +618,17 @@ def render():
                         content.classes("block")
                 preview_checkbox.on_change(toggle_preview)
                 with ui.row():
-                    ui.button("Save", on_click=lambda: [save_note(title.value, content.value, tags.value, category.value), refresh_notes(), dialog.close()]).classes("bg-green-600 hover:bg-green-500 text-white rounded px-4 py-2")
+                    ui.button("Save", on_click=lambda: [save_note(title.value, content.value, tags.value, category.value), dialog.close()]).classes("bg-green-600 hover:bg-green-500 text-white rounded px-4 py-2")
                     ui.button("Cancel", on_click=dialog.close).classes("bg-gray-600 hover:bg-gray-500 text-white rounded px-4 py-2")
             dialog.open()
 
-        def edit_note(note):
-            note_id, title_text, content_text, tags_text, category_text = note
+        def edit_note(note_id):
+            # The list only holds previews; fetch the full note when it is opened
+            note = load_note(note_id)
+            if note is None:
+                ui.notify("This note was deleted", type="warning")
+                return
+            _, title_text, content_text, tags_text, category_text = note
             with ui.dialog().props("persistent") as dialog, ui.card().classes("p-4 bg-gray-700"):
                 ui.label("Edit Note").classes("text-gray-100")
                 title = ui.input("Title", value=title_text).props("clearable").classes("bg-gray-600 text-white rounded w-full mb-2")
@@ -104,10 +636,12 @@ def render():
                 tags = ui.input("Tags (comma-separated)", value=tags_text).props("clearable").classes("bg-gray-600 text-white rounded w-full mb-2")
                 category = ui.input("Category", value=category_text).props("clearable").classes("bg-gray-600 text-white rounded w-full mb-2")
                 preview_checkbox = ui.checkbox("Preview").classes("mb-2")
-                preview_markdown = ui.markdown("").classes("text-gray-300 hidden")
+                preview_markdown = ui.html("").classes("nicegui-markdown text-gray-300 hidden")
                 def toggle_preview(e):
                     if e.value:
-                        preview_markdown.content = bleach.clean(markdown2.markdown(content.value), tags=bleach.sanitizer.ALLOWED_TAGS + ['p', 'pre', 'span', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6'], attributes=bleach.sanitizer.ALLOWED_ATTRIBUTES)
+                        stored_hash, stored_html = load_note_html(note_id)
+                        unchanged = stored_html is not None and stored_hash == content_hash(content.value)
+                        preview_markdown.content = stored_html if unchanged else markdown_html(content.value)
                         preview_markdown.classes("block")
                         content.classes("hidden")
                     else:
@@ -115,37 +649,56 @@ def render():
                         content.classes("block")
                 preview_checkbox.on_change(toggle_preview)
                 with ui.row():
-                    ui.button("Save", on_click=lambda: [update_note(note_id, title.value, content.value, tags.value, category.value), refresh_notes(), dialog.close()]).classes("bg-green-600 hover:bg-green-500 text-white rounded px-4 py-2")
+                    ui.button("Save", on_click=lambda: [update_note(note_id, title.value, content.value, tags.value, category.value), dialog.close()]).classes("bg-green-600 hover:bg-green-500 text-white rounded px-4 py-2")
                     ui.button("Cancel", on_click=dialog.close).classes("bg-gray-600 hover:bg-gray-500 text-white rounded px-4 py-2")
             dialog.open()
 
         def update_note(note_id, title, content, tags, category):
-            conn = sqlite3.connect("links.db")
+            stored_hash, _ = load_note_html(note_id)
+            conn = db.connect("links.db")
             c = conn.cursor()
-            c.execute(
-                "UPDATE notes SET title = ?, content = ?, tags = ?, category = ? WHERE id = ?",
-                (title, content, tags, category, note_id)
-            )
+            if stored_hash == content_hash(content):
+                c.execute(
+                    "UPDATE notes SET title = ?, tags = ?, category = ? WHERE id = ?",
+                    (title, tags, category, note_id)
+                )
+            else:
+                h, content_html, preview_html = render_html(content)
+                c.execute(
+                    "UPDATE notes SET title = ?, content = ?, tags = ?, category = ?, content_hash = ?, content_html = ?, preview_html = ? WHERE id = ?",
+                    (title, content, tags, category, h, content_html, preview_html, note_id)
+                )
+            c.execute("SELECT preview_html, created_at FROM notes WHERE id = ?", (note_id,))
+            preview_html, created_at = c.fetchone()
             conn.commit()
             conn.close()
+            events.row_updated("notes", note_id, note=(note_id, title, tags, category, preview_html, created_at))
 
-        def export_and_sync_notes():
-            notes = []
-            for note_id, title, content, tags, category in load_notes():
-                notes.append({
-                    "id": note_id,
-                    "title": title,
-                    "content": content,
-                    "tags": tags,
-                    "category": category
-                })
+        def export_notes():
             filename = "notes_export.json"
-            with open(filename, "w", encoding="utf-8") as f:
-                json.dump(notes, f, ensure_ascii=False, indent=4)
-            gdrive.upload_file_stub(filename)
-            ui.notify("Notes exported and synced to Google Drive", type="positive")
+            if fts_query(search_input.value):
+                export.export_query("links.db", SEARCH_EXPORT_QUERY, filename, params=(fts_query(search_input.value),))
+            else:
+                export.export_query("links.db", NOTES_QUERY, filename)
+            ui.notify(f"Notes exported to {filename}", type="positive")
+
+        async def sync_to_drive():
+            try:
+                result = await jobs.run("notes.sync", sync_notes)
+            except Exception as e:
+                ui.notify(f"Notes sync failed: {str(e)}", type="negative")
+                return
+            if result["kind"] == "snapshot":
+                ui.notify(f"Uploaded a full snapshot of {result['changes']} notes to Google Drive", type="positive")
+            elif result["changes"]:
+                ui.notify(f"Synced {result['changes']} changed notes to Google Drive", type="positive")
+            else:
+                ui.notify("Notes are already in sync", type="info")
 
-        search_input.on("change", refresh_notes)
+        search_input.on_value_change(refresh_notes)
+        refresh_facets()
         ui.button("New Note", on_click=add_note).classes("bg-blue-600 hover:bg-blue-500 text-white rounded px-4 py-2 mb-4")
-        ui.button("Export & Sync Notes", on_click=export_and_sync_notes).classes("bg-green-600 hover:bg-green-500 text-white rounded px-4 py-2 mb-4")
+        with ui.row():
+            ui.button("Export Notes", on_click=export_notes).classes("bg-gray-600 hover:bg-gray-500 text-white rounded px-4 py-2 mb-4")
+            ui.button("Sync to Drive", on_click=sync_to_drive).classes("bg-green-600 hover:bg-green-500 text-white rounded px-4 py-2 mb-4")
         refresh_notes()
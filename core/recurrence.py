@@ -0,0 +1,206 @@
+"""RRULE-style recurrence expansion (the subset of RFC 5545 the calendar uses).
+
+Supported parts: FREQ (DAILY, WEEKLY, MONTHLY, YEARLY), INTERVAL, COUNT, UNTIL,
+BYDAY (weekly: MO,WE; monthly: 2TU, -1FR), BYMONTHDAY (monthly: 15, -1) and
+WKST (MO, or any day when INTERVAL is 1). Rules using anything else raise
+ValueError rather than expanding to the wrong dates. The legacy values "daily", "weekly", "monthly" and "yearly" mean FREQ=<value>.
+Dates that do not exist (the 31st in a short month, Feb 29 in other years) are
+skipped, as RFC 5545 specifies.
+"""
+import calendar
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+
+FREQS = ("DAILY", "WEEKLY", "MONTHLY", "YEARLY")
+WEEKDAYS = ("MO", "TU", "WE", "TH", "FR", "SA", "SU")
+PARTS = ("FREQ", "INTERVAL", "COUNT", "UNTIL", "BYDAY", "BYMONTHDAY", "WKST")
+
+
+class Rule:
+    __slots__ = ("freq", "interval", "count", "until", "byday", "bymonthday")
+
+    def __init__(self, freq, interval=1, count=None, until=None, byday=(), bymonthday=()):
+        self.freq = freq
+        self.interval = interval
+        self.count = count
+        self.until = until
+        self.byday = byday  # ((ordinal or None, weekday 0-6), ...)
+        self.bymonthday = bymonthday
+
+    def __repr__(self):
+        return f"Rule({format_rule(self)!r})"
+
+
+def _parse_date(value):
+    """Accept YYYYMMDD, YYYY-MM-DD and the date part of YYYYMMDDTHHMMSS(Z)."""
+    value = value.strip()
+    try:
+        if "-" in value:
+            return date.fromisoformat(value[:10])
+        return datetime.strptime(value[:8], "%Y%m%d").date()
+    except ValueError:
+        raise ValueError(f"Invalid date in recurrence rule: {value!r}") from None
+
+
+@lru_cache(maxsize=1024)
+def parse(text):
+    """Parse an RRULE (with or without the "RRULE:" prefix) or a legacy keyword into a Rule.
+
+    Returns None for an empty rule and raises ValueError for one that cannot be expanded.
+    """
+    text = (text or "").strip()
+    if not text:
+        return None
+    if text.upper() in FREQS:
+        return Rule(text.upper())
+    if text.upper().startswith("RRULE:"):
+        text = text[6:]
+    parts = {}
+    for part in text.split(";"):
+        name, sep, value = part.partition("=")
+        if sep:
+            parts[name.strip().upper()] = value.strip()
+    freq = parts.get("FREQ", "").upper()
+    if freq not in FREQS:
+        raise ValueError(f"Unsupported recurrence: {text!r}")
+    unsupported = sorted(set(parts) - set(PARTS))
+    if unsupported:
+        raise ValueError(f"Unsupported {', '.join(unsupported)} in recurrence: {text!r}")
+    if "BYDAY" in parts and freq not in ("WEEKLY", "MONTHLY"):
+        raise ValueError(f"BYDAY needs FREQ=WEEKLY or MONTHLY: {text!r}")
+    if "BYMONTHDAY" in parts and freq != "MONTHLY":
+        raise ValueError(f"BYMONTHDAY needs FREQ=MONTHLY: {text!r}")
+    try:
+        interval = int(parts.get("INTERVAL", 1))
+        count = int(parts["COUNT"]) if "COUNT" in parts else None
+        bymonthday = tuple(int(day) for day in parts["BYMONTHDAY"].split(",")) if "BYMONTHDAY" in parts else ()
+    except ValueError:
+        raise ValueError(f"Invalid number in recurrence: {text!r}") from None
+    if interval < 1:
+        raise ValueError(f"INTERVAL must be positive: {text!r}")
+    byday = []
+    for day in filter(None, parts.get("BYDAY", "").upper().split(",")):
+        ordinal, weekday = day[:-2], day[-2:]
+        if weekday not in WEEKDAYS or (ordinal and not ordinal.lstrip("+-").isdigit()):
+            raise ValueError(f"Invalid BYDAY {day!r} in recurrence: {text!r}")
+        if ordinal and freq == "WEEKLY":
+            raise ValueError(f"Numbered BYDAY {day!r} needs FREQ=MONTHLY: {text!r}")
+        byday.append((int(ordinal) if ordinal else None, WEEKDAYS.index(weekday)))
+    # Weeks are counted from Monday, which gives other week starts the same dates unless weeks are skipped
+    wkst = parts.get("WKST", "MO").upper()
+    if wkst not in WEEKDAYS:
+        raise ValueError(f"Invalid WKST {wkst!r} in recurrence: {text!r}")
+    if wkst != "MO" and interval > 1:
+        raise ValueError(f"Unsupported WKST={wkst} with INTERVAL={interval}: {text!r}")
+    until = _parse_date(parts["UNTIL"]) if "UNTIL" in parts else None
+    return Rule(freq, interval, count, until, tuple(byday), bymonthday)
+
+
+def format_rule(rule):
+    """Return the RRULE value (without the "RRULE:" prefix) for a Rule."""
+    parts = [f"FREQ={rule.freq}"]
+    if rule.interval != 1:
+        parts.append(f"INTERVAL={rule.interval}")
+    if rule.count is not None:
+        parts.append(f"COUNT={rule.count}")
+    if rule.until is not None:
+        parts.append(f"UNTIL={rule.until.strftime('%Y%m%d')}")
+    if rule.byday:
+        parts.append("BYDAY=" + ",".join(f"{n or ''}{WEEKDAYS[wd]}" for n, wd in rule.byday))
+    if rule.bymonthday:
+        parts.append("BYMONTHDAY=" + ",".join(str(day) for day in rule.bymonthday))
+    return ";".join(parts)
+
+
+def _month_days(year, month, dtstart, rule):
+    """Candidate days of one month for a MONTHLY rule, sorted."""
+    last = calendar.monthrange(year, month)[1]
+    days = set()
+    for day in rule.bymonthday:
+        day = day if day > 0 else last + 1 + day
+        if 1 <= day <= last:
+            days.add(day)
+    for ordinal, weekday in rule.byday:
+        first = (weekday - date(year, month, 1).weekday()) % 7 + 1
+        matches = list(range(first, last + 1, 7))
+        if ordinal is None:
+            days.update(matches)
+        elif 0 < ordinal <= len(matches) or 0 < -ordinal <= len(matches):
+            days.add(matches[ordinal - 1 if ordinal > 0 else ordinal])
+    if not rule.bymonthday and not rule.byday and dtstart.day <= last:
+        days.add(dtstart.day)
+    return [date(year, month, day) for day in sorted(days)]
+
+
+def _periods(dtstart, rule, since):
+    """Yield (period start, sorted candidate dates) for each period of the rule,
+    beginning with the period that contains `since` (or dtstart, if later)."""
+    step = rule.interval
+    if rule.freq == "DAILY":
+        k = max(0, -(-(since - dtstart).days // step))
+        while True:
+            day = dtstart + timedelta(days=k * step)
+            yield day, [day]
+            k += 1
+    elif rule.freq == "WEEKLY":
+        week0 = dtstart - timedelta(days=dtstart.weekday())
+        weekdays = sorted({weekday for _, weekday in rule.byday}) or [dtstart.weekday()]
+        k = max(0, (since - week0).days // 7 // step)
+        while True:
+            week = week0 + timedelta(weeks=k * step)
+            yield week, [week + timedelta(days=weekday) for weekday in weekdays]
+            k += 1
+    elif rule.freq == "MONTHLY":
+        month0 = dtstart.year * 12 + dtstart.month - 1
+        k = max(0, (since.year * 12 + since.month - 1 - month0) // step)
+        while True:
+            year, month = divmod(month0 + k * step, 12)
+            if year > 9999:
+                return
+            yield date(year, month + 1, 1), _month_days(year, month + 1, dtstart, rule)
+            k += 1
+    else:  # YEARLY
+        k = max(0, (since.year - dtstart.year) // step)
+        while True:
+            year = dtstart.year + k * step
+            if year > 9999:
+                return
+            try:
+                candidates = [date(year, dtstart.month, dtstart.day)]
+            except ValueError:
+                candidates = []  # Feb 29 outside leap years
+            yield date(year, 1, 1), candidates
+            k += 1
+
+
+def occurrences(dtstart, rule, start, end, exdates=()):
+    """Yield the dates of a series starting on dtstart that fall in [start, end), in order.
+
+    `rule` is a Rule or rule text. Without COUNT the expansion jumps straight to
+    `start`, so the cost follows the range asked for, not the age of the series.
+    EXDATE dates are skipped but still count towards COUNT, as in RFC 5545.
+    """
+    if isinstance(rule, str):
+        rule = parse(rule)
+    if rule is None:
+        if start <= dtstart < end and dtstart not in exdates:
+            yield dtstart
+        return
+    if rule.until is not None and rule.until < end:
+        end = rule.until + timedelta(days=1)
+    # COUNT is a position in the whole series, so counted series are walked from the start
+    since = dtstart if rule.count is not None else max(start, dtstart)
+    seen = 0
+    for period_start, candidates in _periods(dtstart, rule, since):
+        if period_start >= end:
+            return
+        for day in candidates:
+            if day < dtstart:
+                continue
+            seen += 1
+            if rule.count is not None and seen > rule.count:
+                return
+            if day >= end:
+                return
+            if day >= start and day not in exdates:
+                yield day
@@ -0,0 +1,117 @@
+from nicegui import app, background_tasks, ui, Client
+import asyncio
+import heapq
+import time
+from collections import deque
+from core import events
+
+MAX_SLEEP = 3600  # seconds; re-reads the wall clock after a suspend or clock change
+MISSED_LIMIT = 20  # reminders kept for the next page when none is open
+
+_heap = []  # (when, key), earliest first; may hold stale entries
+_pending = {}  # key -> (when, message), the live reminders
+_wake = None  # asyncio.Event set when the earliest deadline moves earlier
+_task = None
+_missed = deque(maxlen=MISSED_LIMIT)
+
+
+def schedule(key, when, message):
+    """Remind at `when` (a Unix timestamp), replacing any reminder for `key`. O(log n).
+
+    The replaced entry stays in the heap and is skipped when it comes up, so
+    neither rescheduling nor cancelling has to search the heap.
+    """
+    _pending[key] = (when, message)
+    heapq.heappush(_heap, (when, key))
+    if _wake is not None and _heap[0] == (when, key):
+        _wake.set()
+    _compact()
+
+
+def cancel(key):
+    """Drop the reminder for `key`, if any. O(1)."""
+    _pending.pop(key, None)
+    _compact()
+
+
+def load(reminders):
+    """Replace all reminders with [(key, when, message)] in one O(n) heapify."""
+    global _heap
+    _pending.clear()
+    for key, when, message in reminders:
+        _pending[key] = (when, message)
+    _heap = [(when, key) for key, (when, _) in _pending.items()]
+    heapq.heapify(_heap)
+    if _wake is not None:
+        _wake.set()
+
+
+def upcoming(limit=10):
+    """Return [(when, key, message)] for the next reminders, earliest first."""
+    live = (entry for entry in heapq.nsmallest(limit + len(_heap) - len(_pending), _heap) if _live(entry))
+    return [(when, key, _pending[key][1]) for when, key in live][:limit]
+
+
+def _live(entry):
+    when, key = entry
+    return key in _pending and _pending[key][0] == when
+
+
+def _compact():
+    # Rebuild once stale entries outnumber live ones, so the heap stays O(live reminders)
+    global _heap
+    if len(_heap) > 64 and len(_heap) > 2 * len(_pending):
+        _heap = [entry for entry in _heap if _live(entry)]
+        heapq.heapify(_heap)
+
+
+def _due(now):
+    """Pop and return the reminders whose time has come."""
+    due = []
+    while _heap and _heap[0][0] <= now:
+        entry = heapq.heappop(_heap)
+        if _live(entry):
+            due.append((entry[1], _pending.pop(entry[1])[1]))
+    return due
+
+
+def notify_clients(message, type="info"):
+    """Show a notification on every open page, or on the next one to connect."""
+    clients = [client for client in list(Client.instances.values()) if client.has_socket_connection]
+    if not clients:
+        _missed.append((message, type))
+    for client in clients:
+        with client:
+            ui.notify(message, type=type, close_button=True, timeout=0)
+
+
+def _show_missed(client):
+    while _missed:
+        message, type = _missed.popleft()
+        with client:
+            ui.notify(message, type=type, close_button=True, timeout=0)
+
+
+async def _run():
+    """Sleep until the earliest deadline (or a schedule() that moves it earlier), then fire."""
+    while True:
+        _wake.clear()
+        for key, message in _due(time.time()):
+            events.publish("reminders", "due", key, message=message)
+            notify_clients(message)
+        timeout = min(_heap[0][0] - time.time(), MAX_SLEEP) if _heap else MAX_SLEEP
+        try:
+            await asyncio.wait_for(_wake.wait(), max(timeout, 0))
+        except asyncio.TimeoutError:
+            pass
+
+
+def start():
+    global _wake, _task
+    if _task is None:
+        _wake = asyncio.Event()
+        _task = background_tasks.create(_run(), name="reminders")
+
+
+app.on_startup(start)
+app.on_connect(_show_missed)
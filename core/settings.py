@@ -1,5 +1,10 @@
+import ast
+import copy
+import json
 import os
-import sqlite3
+import threading
+from core import db
+from core import events
 from pathlib import Path
 from nicegui import ui
 
@@ -7,41 +12,98 @@ from nicegui import ui
 db_path = Path("db/db.db")
 
 
+class SettingsStore:
+    """Key/value settings in a SQLite table, cached in memory after the first read.
+
+    Values are stored as JSON and marked with encoding 'json'. Rows written by
+    the old str()/eval() scheme (encoding 'repr') are parsed with
+    ast.literal_eval and rewritten as JSON on first load. Saves write through to
+    the database and then publish an "update" event on the table's topic, with
+    the key as id and the new value as `value`.
+    """
+
+    def __init__(self, path, table="settings"):
+        self.path = path
+        self.table = table
+        self._cache = None
+        self._lock = threading.RLock()
+
+    def init_db(self):
+        with db.connect(self.path) as conn:
+            conn.execute(f"CREATE TABLE IF NOT EXISTS {self.table} (key TEXT PRIMARY KEY, value TEXT)")
+            columns = [info[1] for info in conn.execute(f"PRAGMA table_info({self.table})")]
+            if "encoding" not in columns:
+                # Every row so far came from str(); the column, not the text, says how to read a row
+                conn.execute(f"ALTER TABLE {self.table} ADD COLUMN encoding TEXT NOT NULL DEFAULT 'repr'")
+            conn.commit()
+
+    @staticmethod
+    def _decode_legacy(text):
+        """Read a value saved with str() the way the old eval() did."""
+        try:
+            return ast.literal_eval(text)
+        except (ValueError, SyntaxError):
+            return text  # a plain string, which eval() could not read back
+
+    def _load(self):
+        with self._lock:
+            if self._cache is not None:
+                return self._cache
+            cache = {}
+            migrated = []
+            with db.connect(self.path) as conn:
+                for key, text, encoding in conn.execute(f"SELECT key, value, encoding FROM {self.table}").fetchall():
+                    if encoding == "json":
+                        cache[key] = json.loads(text)
+                    else:
+                        cache[key] = self._decode_legacy(text)
+                        migrated.append((json.dumps(cache[key]), key))
+                if migrated:
+                    conn.executemany(
+                        f"UPDATE {self.table} SET value = ?, encoding = 'json' WHERE key = ?", migrated
+                    )
+                    conn.commit()
+            self._cache = cache
+            return cache
+
+    def get(self, key, default=None):
+        """Return the cached value; treat dicts and lists as read-only."""
+        return self._load().get(key, default)
+
+    def set(self, key, value):
+        text = json.dumps(value)
+        with self._lock:
+            cache = self._load()
+            with db.connect(self.path) as conn:
+                conn.execute(
+                    f"INSERT OR REPLACE INTO {self.table} (key, value, encoding) VALUES (?, ?, 'json')",
+                    (key, text),
+                )
+                conn.commit()
+            # Cache the JSON round-trip so readers see what a restart would see
+            cache[key] = json.loads(text)
+        events.row_updated(self.table, key, value=copy.deepcopy(cache[key]))
+
+    def reload(self):
+        """Drop the cache so the next read comes from the database."""
+        with self._lock:
+            self._cache = None
+
+
+store = SettingsStore(db_path)
+
+
 def init_db():
-    with sqlite3.connect(db_path) as conn:
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS settings (
-                key TEXT PRIMARY KEY,
-                value TEXT
-            )
-        """
-        )
-        conn.commit()
+    store.init_db()
 
 
 # Load and save settings
 def load_setting(key, default):
-    with sqlite3.connect(db_path) as conn:
-        cursor = conn.execute("SELECT value FROM settings WHERE key = ?", (key,))
-        result = cursor.fetchone()
-        if result:
-            try:
-                return eval(
-                    result[0], {}, {}
-                )  # Safely evaluate string to Python object
-            except Exception:
-                return default
-        return default
+    return store.get(key, default)
 
 
 def save_setting(key, value):
-    with sqlite3.connect(db_path) as conn:
-        conn.execute(
-            "INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
-            (key, str(value)),
-        )
-        conn.commit()
+    store.set(key, value)
 
 
 # Initialize database
@@ -133,6 +195,28 @@ def render():
             label="Modules to Sync"
         ).classes("w-full")
 
+        def on_setting_changed(e):
+            # Saves from another tab (or this one) show up here without a reload
+            value = e.data["value"]
+            if e.id == "modules":
+                for name, checkbox in checkboxes.items():
+                    checkbox.value = value.get(name, True)
+            elif e.id == "homepage_widgets":
+                for name, checkbox in widget_checkboxes.items():
+                    checkbox.value = value.get(name, True)
+            elif e.id == "custom_colors":
+                bg_color.value, card_color.value = value["bg"], value["card"]
+                text_color.value, accent_color.value = value["text"], value["accent"]
+            elif e.id == "api_keys":
+                openweathermap_key.value = value.get("openweathermap", "")
+                github_key.value = value.get("github", "")
+                gitea_key.value = value.get("gitea", "")
+                gitlab_key.value = value.get("gitlab", "")
+            elif e.id == "sync_modules":
+                sync_modules.value = value
+
+        events.listen("settings", on_setting_changed)
+
         # Apply Settings
         def apply_settings():
             # Save module visibility
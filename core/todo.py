@@ -1,11 +1,34 @@
-from nicegui import ui
-import sqlite3
-from datetime import datetime
-import json
+from nicegui import app, background_tasks, ui
+from core import db
+from core import metrics
+from datetime import date, datetime
+import os
+import re
+from core import export
+from core import events
+from core import jobs
+from core import reminders
 from core.gdrive import upload_file_stub
 
+PAGE_SIZE = 50
+# Sort keys are indexed expressions: todos without a due date sort last, a missing priority counts as Medium
+DUE_KEY = "coalesce(nullif(due_date, ''), '9999-12-31')"
+PRIORITY_KEY = "coalesce(priority, 2)"
+# sort name -> (key, direction); ties are broken by id in the same direction
+SORTS = {
+    "Newest": ("created_at", "DESC"),
+    "Due date": (DUE_KEY, "ASC"),
+    "Priority": (PRIORITY_KEY, "DESC"),
+}
+FILTERS = {"All": (0, 1), "Pending": (0,), "Done": (1,)}
+# One index seek per done value; "All" merges the two sorted partitions
+PARTITION_QUERY = (
+    "SELECT * FROM (SELECT id, task, done, due_date, priority, {key} AS sort_key FROM todos "
+    "WHERE done = ?{after} ORDER BY {key} {direction}, id {direction} LIMIT ?)"
+)
+
 def init_db():
-    conn = sqlite3.connect("links.db")
+    conn = db.connect("links.db")
     c = conn.cursor()
     # Add columns due_date and priority if they don't exist
     c.execute("CREATE TABLE IF NOT EXISTS todos (id INTEGER PRIMARY KEY, task TEXT, done BOOLEAN, created_at TEXT, due_date TEXT, priority INTEGER)")
@@ -16,19 +39,273 @@ def init_db():
         c.execute("ALTER TABLE todos ADD COLUMN due_date TEXT")
     if "priority" not in columns:
         c.execute("ALTER TABLE todos ADD COLUMN priority INTEGER")
+    # Every list query filters or partitions on done, so it leads each index
+    c.execute("UPDATE todos SET done = 0 WHERE done IS NULL")
+    c.execute("UPDATE todos SET created_at = '' WHERE created_at IS NULL")  # NULLs never compare in the keyset
+    c.execute("CREATE INDEX IF NOT EXISTS idx_todos_done_created ON todos(done, created_at)")
+    c.execute(f"CREATE INDEX IF NOT EXISTS idx_todos_done_due ON todos(done, {DUE_KEY})")
+    c.execute(f"CREATE INDEX IF NOT EXISTS idx_todos_done_priority ON todos(done, {PRIORITY_KEY})")
     conn.commit()
     conn.close()
 
 init_db()
 
+def load_todos(filter_value="All", sort="Newest", cursor=None, limit=PAGE_SIZE):
+    """Return (rows, next_cursor) for one page; next_cursor is None on the last page.
+
+    Rows are (id, task, done, due_date, priority, sort_key). The cursor is the
+    (sort_key, id) of the last row, so each page is an index seek whatever its depth.
+    """
+    key, direction = SORTS.get(sort, SORTS["Newest"])
+    op = "<" if direction == "DESC" else ">"
+    # The plain range on the key lets SQLite seek the expression indexes; the row value alone only filters
+    after = f" AND {key} {op}= ? AND ({key}, id) {op} (?, ?)" if cursor is not None else ""
+    partitions = FILTERS.get(filter_value, FILTERS["All"])
+    query = " UNION ALL ".join([PARTITION_QUERY.format(key=key, direction=direction, after=after)] * len(partitions))
+    query += f" ORDER BY sort_key {direction}, id {direction} LIMIT ?"
+    params = []
+    for done in partitions:
+        params += [done, *((cursor[0], *cursor) if cursor is not None else ()), limit]
+    conn = db.connect("links.db")
+    c = conn.cursor()
+    c.execute(query, (*params, limit))
+    todos = c.fetchall()
+    conn.close()
+    return todos, ((todos[-1][5], todos[-1][0]) if len(todos) == limit else None)
+
+PRIORITY_NAMES = {1: "Low", 2: "Medium", 3: "High"}
+
+# --- Due-date reminders: pending todos with a due date sit in the reminders heap ---
+REMINDER_TIME = os.getenv("TODO_REMINDER_TIME", "09:00")  # local time on the due date
+# Read once at startup through idx_todos_done_due; later changes arrive as todos events
+UPCOMING_QUERY = f"SELECT id, task, due_date FROM todos WHERE done = 0 AND {DUE_KEY} >= ? AND {DUE_KEY} < '9999-12-31'"
+
+def reminder_time(due_date):
+    """Return the Unix time to remind of a todo due on `due_date`, or None without a valid date."""
+    try:
+        return datetime.strptime(f"{due_date} {REMINDER_TIME}", "%Y-%m-%d %H:%M").timestamp()
+    except (TypeError, ValueError):
+        return None
+
+def schedule_reminder(todo_id, task, due_date):
+    when = reminder_time(due_date)
+    if when is None:
+        reminders.cancel(("todo", todo_id))
+    else:
+        reminders.schedule(("todo", todo_id), when, f"Todo due {due_date}: {task}")
+
+def load_upcoming():
+    """Return [(key, when, message)] for pending todos due today or later."""
+    conn = db.connect("links.db")
+    c = conn.cursor()
+    c.execute(UPCOMING_QUERY, (datetime.now().strftime("%Y-%m-%d"),))
+    rows = c.fetchall()
+    conn.close()
+    upcoming = []
+    for todo_id, task, due_date in rows:
+        when = reminder_time(due_date)
+        if when is not None:
+            upcoming.append((("todo", todo_id), when, f"Todo due {due_date}: {task}"))
+    return upcoming
+
+def load_todo(todo_id):
+    """Return (id, task, done, due_date, priority) of one todo, or None."""
+    conn = db.connect("links.db")
+    c = conn.cursor()
+    c.execute("SELECT id, task, done, due_date, priority FROM todos WHERE id = ?", (todo_id,))
+    todo = c.fetchone()
+    conn.close()
+    return todo
+
+async def reload_reminders():
+    reminders.load(await jobs.run("todo.load_reminders", load_upcoming))
+
+def update_reminder(e):
+    """Keep the reminders heap in step with adds, edits, completions and deletes."""
+    if e.action == "import":
+        background_tasks.create(reload_reminders(), name="todo.reload_reminders")
+    elif e.action == "delete" or e.data.get("done"):
+        reminders.cancel(("todo", e.id))
+    elif "due_date" in e.data and "task" in e.data:
+        schedule_reminder(e.id, e.data["task"], e.data["due_date"])
+    else:
+        todo = load_todo(e.id)  # reopened: the event only carries the done flag
+        if todo is not None and not todo[2]:
+            schedule_reminder(todo[0], todo[1], todo[3])
+
+async def start_reminders():
+    # Todos due earlier today whose reminder time has passed are announced right away
+    await reload_reminders()
+    events.subscribe("todos", update_reminder)
+
+app.on_startup(start_reminders)
+
+# --- Bulk import/export: CSV, JSON, JSONL (optionally .gz) and todo.txt, streamed both ways ---
+EXPORT_QUERY = "SELECT id, task, done, created_at, due_date, priority FROM todos ORDER BY id"
+INSERT_QUERY = "INSERT INTO todos (task, done, created_at, due_date, priority) VALUES (?, ?, ?, ?, ?)"
+IMPORT_BATCH = 5000  # rows per executemany and transaction
+IMPORT_DIR = os.path.join("exports", "todo_import")
+EXPORT_DIR = "exports"
+EXPORT_NAMES = {"CSV": "todos.csv", "JSON": "todos.json", "JSONL": "todos.jsonl", "todo.txt": "todo.txt"}
+IMPORT_ERRORS_KEPT = 20
+PRIORITY_VALUES = {**{name.lower(): n for n, name in PRIORITY_NAMES.items()}, "a": 3, "b": 2, "c": 1}
+TRUE_VALUES = {"1", "true", "yes", "y", "x", "done"}
+FALSE_VALUES = {"", "0", "false", "no", "n"}
+# todo.txt: [x [completed [created]]] [(A)] [created] text with key:value tags, e.g. "(A) 2024-01-02 Pay rent due:2024-02-01"
+TODOTXT_RE = re.compile(
+    r"^(?:(?P<done>x) (?:\d{4}-\d{2}-\d{2} (?:(?P<done_created>\d{4}-\d{2}-\d{2}) )?)?)?"
+    r"(?:\((?P<priority>[A-Z])\) )?(?:(?P<created>\d{4}-\d{2}-\d{2}) )?(?P<text>.*)$"
+)
+TAG_RE = re.compile(r"(?:^|\s)(due|pri):(\S+)")
+DATE_RE = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+def is_todotxt(filename):
+    return re.search(r"\.txt(\.gz|\.zst)?$", filename, re.IGNORECASE) is not None
+
+def _date(value, field):
+    value = str(value or "").strip()
+    if value:
+        try:
+            if not DATE_RE.fullmatch(value):
+                raise ValueError
+            date.fromisoformat(value)
+        except ValueError:
+            raise ValueError(f"{field} {value!r} is not a YYYY-MM-DD date") from None
+    return value
+
+def todo_row(record):
+    """Validate one imported record (a dict) into INSERT_QUERY parameters, or raise ValueError."""
+    task = str(record.get("task") or record.get("title") or "").strip()
+    if not task:
+        raise ValueError("task is empty")
+    done = record.get("done")
+    if not isinstance(done, bool):
+        done = str(done if done is not None else "").strip().lower()
+        if done not in TRUE_VALUES | FALSE_VALUES:
+            raise ValueError(f"done {record.get('done')!r} is not a boolean")
+        done = done in TRUE_VALUES
+    priority = record.get("priority")
+    if priority is None or str(priority).strip() == "":
+        priority = 2
+    elif str(priority).strip().lower() in PRIORITY_VALUES:
+        priority = PRIORITY_VALUES[str(priority).strip().lower()]
+    elif str(priority).strip() in ("1", "2", "3"):
+        priority = int(priority)
+    else:
+        raise ValueError(f"priority {priority!r} is not Low, Medium or High")
+    due_date = _date(record.get("due_date") or record.get("due"), "due_date")
+    created_at = str(record.get("created_at") or "").strip() or datetime.now().isoformat()
+    return (task, done, created_at, due_date, priority)
+
+def iter_todotxt(filename, progress=None):
+    """Yield todo.txt lines as records for todo_row()."""
+    for line in export.iter_lines(filename, progress=progress):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        match = TODOTXT_RE.match(line)
+        tags = dict(TAG_RE.findall(match.group("text")))
+        yield {
+            "task": TAG_RE.sub("", match.group("text")).strip(),
+            "done": bool(match.group("done")),
+            "priority": match.group("priority") or tags.get("pri"),  # completed tasks keep theirs as pri:A
+            "created_at": match.group("done_created") or match.group("created"),
+            "due_date": tags.get("due", ""),
+        }
+
+def todotxt_line(todo):
+    todo_id, task, done, created_at, due_date, priority = todo
+    letter = "ABC"[3 - priority] if priority in (1, 2, 3) else "B"
+    created = created_at[:10] if created_at and re.match(r"\d{4}-\d{2}-\d{2}", created_at) else None
+    if done:
+        # A creation date needs a completion date in front of it; the completion day is not stored
+        parts = ["x", created, created] if created else ["x"]
+    else:
+        parts = [f"({letter})", created] if created else [f"({letter})"]
+    parts.append(" ".join((task or "").split()))  # one todo per line
+    if due_date:
+        parts.append(f"due:{due_date}")
+    if done:
+        parts.append(f"pri:{letter}")
+    return " ".join(parts)
+
+def import_todos(job, filename):
+    """Stream todos from filename into the table in IMPORT_BATCH transactions.
+
+    The format follows the name: .csv, .json, .jsonl or .txt (todo.txt), each
+    optionally .gz. Invalid records are skipped and reported; memory stays at one
+    batch whatever the file size. Progress is the share of the file read; `job`
+    may be None. Returns {"imported", "skipped", "errors"}.
+    """
+    progress = job.set_progress if job is not None else None
+    records = (
+        iter_todotxt(filename, progress) if is_todotxt(filename) else export.iter_records(filename, progress=progress)
+    )
+    imported, skipped, errors = 0, 0, []
+    conn = db.connect("links.db")
+    try:
+        c = conn.cursor()
+        number = 0
+        for batch in export.chunked(records, IMPORT_BATCH):
+            rows = []
+            for record in batch:
+                number += 1
+                try:
+                    if not isinstance(record, dict):
+                        raise ValueError("not an object")
+                    rows.append(todo_row(record))
+                except ValueError as e:
+                    skipped += 1
+                    if len(errors) < IMPORT_ERRORS_KEPT:
+                        errors.append(f"Record {number}: {e}")
+            c.executemany(INSERT_QUERY, rows)
+            conn.commit()
+            imported += len(rows)
+            if job is not None:
+                job.check_cancelled()
+                job.set_progress(job.progress, f"{imported} todos imported")
+    finally:
+        conn.close()
+        if imported:
+            # One event for the whole import; pages and reminders reload instead of patching 50k rows
+            events.publish("todos", "import", None, count=imported)
+    return {"imported": imported, "skipped": skipped, "errors": errors}
+
+def export_todos_file(filename):
+    """Stream all todos to filename in the format its name asks for; returns the count."""
+    conn = db.connect("links.db")
+    try:
+        c = conn.cursor()
+        c.execute(EXPORT_QUERY)
+        if is_todotxt(filename):
+            return export.export_lines((todotxt_line(todo) for todo in c), filename)
+        return export.export_cursor(
+            c, filename, transform=lambda t: (t[0], t[1], bool(t[2]), t[3], t[4], PRIORITY_NAMES.get(t[5], "Medium"))
+        )
+    finally:
+        conn.close()
+
+def export_todos(filename="todos.json"):
+    export_todos_file(filename)
+    upload_file_stub(filename)
+
 def render():
     with ui.card().classes("p-6 bg-gray-700"):
         ui.label("Todo List").classes("text-2xl font-semibold text-gray-100 mb-4")
         task_input = ui.input("New Task").props("clearable").classes("bg-gray-600 text-white rounded w-full mb-2")
         due_date_input = ui.input("Due Date (YYYY-MM-DD)").classes("bg-gray-600 text-white rounded w-full mb-2")
         priority_select = ui.select(["Low", "Medium", "High"], value="Medium").classes("bg-gray-600 text-white rounded w-full mb-2")
-        filter_select = ui.select(["All", "Pending", "Done"], value="All").classes("bg-gray-600 text-white rounded w-full mb-4")
-        todos_list = ui.list().classes("w-full")
+        with ui.row().classes("w-full mb-4"):
+            filter_select = ui.select(list(FILTERS), value="All").classes("bg-gray-600 text-white rounded grow")
+            sort_select = ui.select(list(SORTS), value="Newest").classes("bg-gray-600 text-white rounded grow")
+        # Pages load as the list nears its bottom, so the page holds what was scrolled to
+        todos_area = ui.scroll_area().classes("w-full h-[60vh]")
+        with todos_area:
+            todos_list = ui.list().classes("w-full")
+        next_cursor = None  # None once the last page is shown
+
+        todo_rows = {}  # id -> (row, checkbox, label)
+        todo_done = {}  # id -> done state shown on this page
 
         def add_todo():
             task = task_input.value.strip()
@@ -36,70 +313,129 @@ def render():
             priority_map = {"Low": 1, "Medium": 2, "High": 3}
             priority = priority_map.get(priority_select.value, 2)
             if task:
-                conn = sqlite3.connect("links.db")
+                conn = db.connect("links.db")
                 c = conn.cursor()
                 c.execute("INSERT INTO todos (task, done, created_at, due_date, priority) VALUES (?, ?, ?, ?, ?)", (task, False, datetime.now().isoformat(), due_date, priority))
                 conn.commit()
+                todo_id = c.lastrowid
                 conn.close()
                 task_input.value = ""
                 due_date_input.value = ""
                 priority_select.value = "Medium"
-                refresh_todos()
+                events.row_inserted("todos", todo_id, task=task, done=False, due_date=due_date, priority=priority)
 
         def toggle_todo(id, done):
-            conn = sqlite3.connect("links.db")
+            if todo_done.get(id) == done:
+                return  # the checkbox is echoing an event from another tab
+            todo_done[id] = done
+            conn = db.connect("links.db")
             c = conn.cursor()
-            c.execute("UPDATE todos SET done = ? WHERE id = ?", (not done, id))
+            c.execute("UPDATE todos SET done = ? WHERE id = ?", (done, id))
             conn.commit()
             conn.close()
-            refresh_todos()
+            events.row_updated("todos", id, done=done)
+
+        def render_todo(id, task, done, due_date, priority):
+            with todos_list:
+                with ui.row().classes("items-center justify-between") as row:
+                    with ui.row().classes("items-center"):
+                        checkbox = ui.checkbox(value=bool(done), on_change=lambda e, i=id: toggle_todo(i, e.value)).classes("mr-2")
+                        label_text = f"{task} (Due: {due_date})" if due_date else task
+                        label_classes = "text-gray-100" if not done else "text-gray-400 line-through"
+                        label = ui.label(label_text).classes(label_classes)
+                    ui.label(PRIORITY_NAMES.get(priority, "Medium")).classes("text-gray-300 ml-4")
+            todo_rows[id] = (row, checkbox, label)
+            todo_done[id] = bool(done)
+            return row
+
+        def shown(done):
+            return filter_select.value == "All" or (filter_select.value == "Done") == bool(done)
+
+        @metrics.timed("todo.load_more")
+        def load_more():
+            nonlocal next_cursor
+            todos, next_cursor = load_todos(filter_select.value, sort_select.value, next_cursor)
+            for todo in todos:
+                render_todo(*todo[:5])
 
+        @metrics.timed("todo.refresh_todos")
         def refresh_todos():
+            nonlocal next_cursor
             todos_list.clear()
-            conn = sqlite3.connect("links.db")
-            c = conn.cursor()
-            filter_value = filter_select.value
-            query = "SELECT id, task, done, due_date, priority FROM todos"
-            if filter_value == "Pending":
-                query += " WHERE done = 0"
-            elif filter_value == "Done":
-                query += " WHERE done = 1"
-            query += " ORDER BY created_at DESC"
-            c.execute(query)
-            for id, task, done, due_date, priority in c.fetchall():
-                with todos_list:
-                    with ui.row().classes("items-center justify-between"):
-                        with ui.row().classes("items-center"):
-                            ui.checkbox(value=done, on_change=lambda e, i=id, d=done: toggle_todo(i, d)).classes("mr-2")
-                            label_text = f"{task} (Due: {due_date})" if due_date else task
-                            label_classes = "text-gray-100" if not done else "text-gray-400 line-through"
-                            ui.label(label_text).classes(label_classes)
-                        priority_map_rev = {1: "Low", 2: "Medium", 3: "High"}
-                        ui.label(priority_map_rev.get(priority, "Medium")).classes("text-gray-300 ml-4")
-            conn.close()
+            todo_rows.clear()
+            todo_done.clear()
+            next_cursor = None
+            load_more()
+            todos_area.scroll_to(percent=0)
 
-        def export_todos():
-            conn = sqlite3.connect("links.db")
-            c = conn.cursor()
-            c.execute("SELECT id, task, done, created_at, due_date, priority FROM todos")
-            todos = c.fetchall()
-            conn.close()
-            todos_list_json = []
-            priority_map_rev = {1: "Low", 2: "Medium", 3: "High"}
-            for t in todos:
-                todos_list_json.append({
-                    "id": t[0],
-                    "task": t[1],
-                    "done": bool(t[2]),
-                    "created_at": t[3],
-                    "due_date": t[4],
-                    "priority": priority_map_rev.get(t[5], "Medium")
-                })
-            with open("todos.json", "w", encoding="utf-8") as f:
-                json.dump(todos_list_json, f, indent=4)
-            upload_file_stub("todos.json")
+        def on_scroll(e):
+            remaining = e.args["verticalSize"] - e.args["verticalPosition"] - e.args["verticalContainerSize"]
+            if next_cursor is not None and remaining < 600:  # pixels left below the viewport
+                load_more()
+
+        todos_area.on("scroll", on_scroll, args=["verticalPosition", "verticalSize", "verticalContainerSize"], throttle=0.2)
+
+        def on_todo_changed(e):
+            if e.action == "import":
+                refresh_todos()
+            elif e.action == "insert" and shown(e.data["done"]):
+                if sort_select.value != "Newest":
+                    refresh_todos()  # its position depends on the sort key
+                    return
+                row = render_todo(e.id, e.data["task"], e.data["done"], e.data["due_date"], e.data["priority"])
+                row.move(target_index=0)  # newest first, like load_todos
+            elif e.action == "update" and e.id in todo_rows:
+                row, checkbox, label = todo_rows[e.id]
+                if not shown(e.data["done"]):
+                    todos_list.remove(row)
+                    del todo_rows[e.id]
+                    return
+                todo_done[e.id] = bool(e.data["done"])
+                checkbox.set_value(bool(e.data["done"]))
+                label.classes(replace="text-gray-400 line-through" if e.data["done"] else "text-gray-100")
+            elif e.action == "update" and filter_select.value != "All" and shown(e.data["done"]):
+                refresh_todos()  # a filtered-out todo now matches; its position depends on the sort key
+            elif e.action == "delete" and e.id in todo_rows:
+                todos_list.remove(todo_rows.pop(e.id)[0])
+
+        events.listen("todos", on_todo_changed)
 
         ui.button("Add Task", on_click=add_todo).classes("bg-blue-600 hover:bg-blue-500 text-white rounded px-4 py-2 mr-2")
         ui.button("Export to Drive", on_click=export_todos).classes("bg-blue-600 hover:bg-blue-500 text-white rounded px-4 py-2")
-        filter_select.on("change", lambda e: refresh_todos())
+
+        async def import_file(e):
+            # Saved to disk first so the import streams from a file, not from memory
+            os.makedirs(IMPORT_DIR, exist_ok=True)
+            path = os.path.join(IMPORT_DIR, os.path.basename(e.file.name))
+            await e.file.save(path)
+            try:
+                result = await jobs.run(f"todo.import:{path}", import_todos, path, report=True)
+            except Exception as ex:
+                ui.notify(f"Import failed: {str(ex)}", type="negative")
+                return
+            finally:
+                os.remove(path)
+            ui.notify(f"Imported {result['imported']} todos", type="positive")
+            if result["skipped"]:
+                ui.notify(f"Skipped {result['skipped']} invalid records: " + "; ".join(result["errors"][:3]), type="warning", multi_line=True)
+
+        async def export_file():
+            os.makedirs(EXPORT_DIR, exist_ok=True)
+            path = os.path.join(EXPORT_DIR, EXPORT_NAMES[export_format.value])
+            try:
+                count = await jobs.run("todo.export", export_todos_file, path)
+            except Exception as ex:
+                ui.notify(f"Export failed: {str(ex)}", type="negative")
+                return
+            ui.download(path, os.path.basename(path))
+            ui.notify(f"Exported {count} todos", type="positive")
+
+        with ui.row().classes("items-center mt-4"):
+            ui.upload(label="Import todos", auto_upload=True, on_upload=import_file).props(
+                "accept=.csv,.json,.jsonl,.txt,.gz"
+            ).classes("bg-gray-600 text-white rounded")
+            export_format = ui.select(list(EXPORT_NAMES), value="CSV").classes("bg-gray-600 text-white rounded w-32")
+            ui.button("Export", on_click=export_file).classes("bg-gray-600 hover:bg-gray-500 text-white rounded px-4 py-2")
+        filter_select.on_value_change(refresh_todos)
+        sort_select.on_value_change(refresh_todos)
         refresh_todos()
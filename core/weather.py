@@ -1,10 +1,11 @@
 from nicegui import ui
-import requests
-import sqlite3
+from core import httpclient
+from core import db
+from core import events
 from core.settings import load_setting
 
 def init_db():
-    conn = sqlite3.connect("links.db")
+    conn = db.connect("links.db")
     c = conn.cursor()
     c.execute(
         "CREATE TABLE IF NOT EXISTS weather_cities (id INTEGER PRIMARY KEY, city TEXT UNIQUE)"
@@ -13,7 +14,7 @@ def init_db():
     conn.close()
 
 def save_city(city_name):
-    conn = sqlite3.connect("links.db")
+    conn = db.connect("links.db")
     c = conn.cursor()
     try:
         c.execute("INSERT OR IGNORE INTO weather_cities (city) VALUES (?)", (city_name,))
@@ -40,13 +41,14 @@ def render():
             api_keys = load_setting("api_keys", {})
             return api_keys.get("openweathermap", "")
 
-        def fetch_weather():
+        async def fetch_weather():
             try:
                 api_key = get_openweathermap_api_key()
                 if not api_key:
                     weather_label.set_text("API key not set. Please configure in Settings.")
                     return
-                response = requests.get(
+                response = await httpclient.aget(
+                    "weather",
                     f"https://api.openweathermap.org/data/2.5/weather?q={city.value}&appid={api_key}"
                 )
                 data = response.json()
@@ -59,13 +61,14 @@ def render():
             except Exception:
                 weather_label.set_text("Error fetching weather").classes("text-red-500")
 
-        def fetch_forecast():
+        async def fetch_forecast():
             try:
                 api_key = get_openweathermap_api_key()
                 if not api_key:
                     forecast_label.set_text("API key not set. Please configure in Settings.")
                     return
-                response = requests.get(
+                response = await httpclient.aget(
+                    "weather",
                     f"https://api.openweathermap.org/data/2.5/forecast?q={city.value}&appid={api_key}"
                 )
                 data = response.json()
@@ -82,6 +85,15 @@ def render():
             except Exception:
                 forecast_label.set_text("Error fetching forecast").classes("text-red-500")
 
+        def on_setting_changed(e):
+            # Drop the hint as soon as a key is saved in Settings
+            if e.id == "api_keys" and e.data["value"].get("openweathermap"):
+                for label in (weather_label, forecast_label):
+                    if label.text == "API key not set. Please configure in Settings.":
+                        label.set_text("")
+
+        events.listen("settings", on_setting_changed)
+
         ui.button("Get Weather", on_click=fetch_weather).classes(
             "bg-blue-600 hover:bg-blue-500 text-white rounded px-4 py-2 mr-2"
         )
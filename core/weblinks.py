@@ -1,14 +1,21 @@
-from nicegui import ui
-import sqlite3
-import requests
+from nicegui import app, ui
+from core import db
+from core import metrics
+from core import httpclient
+from core import jobs
 from pathlib import Path
+from urllib.parse import urlsplit, urlunsplit
+import asyncio
+import hashlib
 import os
-import json
+import time
+from core import export
+from core import events
 import validators
 from core.gdrive import upload_file_stub
 
 def init_db():
-    conn = sqlite3.connect("links.db")
+    conn = db.connect("links.db")
     c = conn.cursor()
     c.execute(
         "CREATE TABLE IF NOT EXISTS weblinks (id INTEGER PRIMARY KEY, name TEXT, url TEXT, category TEXT)"
@@ -17,91 +24,520 @@ def init_db():
     columns = [info[1] for info in c.fetchall()]
     if "category" not in columns:
         c.execute("ALTER TABLE weblinks ADD COLUMN category TEXT")
+    c.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_weblinks_url'")
+    if c.fetchone() is None:
+        _dedup_links(c)
+        c.execute("CREATE UNIQUE INDEX idx_weblinks_url ON weblinks(url)")
+    # One row per origin; `file` names the icon in FAVICON_DIR by content hash, '' while there is none
+    c.execute(
+        """
+        CREATE TABLE IF NOT EXISTS favicons (
+            origin TEXT PRIMARY KEY,
+            file TEXT NOT NULL DEFAULT '',
+            etag TEXT,
+            last_modified TEXT,
+            fetched_at REAL NOT NULL DEFAULT 0,
+            failures INTEGER NOT NULL DEFAULT 0,
+            retry_at REAL NOT NULL DEFAULT 0
+        )
+        """
+    )
+    c.execute(
+        """
+        CREATE TABLE IF NOT EXISTS link_health (
+            url TEXT PRIMARY KEY,
+            status INTEGER,
+            final_url TEXT NOT NULL DEFAULT '',
+            latency_ms REAL,
+            error TEXT,
+            etag TEXT,
+            last_modified TEXT,
+            checked_at REAL NOT NULL,
+            next_check REAL NOT NULL,
+            check_interval REAL NOT NULL,
+            failures INTEGER NOT NULL DEFAULT 0
+        )
+        """
+    )
+    c.execute("CREATE INDEX IF NOT EXISTS idx_link_health_next ON link_health(next_check)")
     conn.commit()
     conn.close()
 
+# --- URL canonicalization: one row per canonical URL, enforced by idx_weblinks_url ---
+DEFAULT_PORTS = {"http": 80, "https": 443, "ftp": 21}
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "gbraid", "wbraid", "msclkid", "yclid", "twclid", "igshid",
+    "mc_cid", "mc_eid", "_ga", "_gl", "_hsenc", "_hsmi", "mkt_tok", "oly_anon_id", "oly_enc_id",
+}
+TRACKING_PREFIXES = ("utm_",)
+
+def _is_tracking(param):
+    name = param.split("=", 1)[0].lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+def canonical_url(url):
+    """Return url with a lower-case scheme and host, no default port, no trailing slash
+    (the root path is "/") and no tracking parameters. Other query parameters keep
+    their order and encoding. URLs without a host are returned stripped but unchanged."""
+    url = url.strip()
+    parts = urlsplit(url)
+    if not parts.scheme or not parts.hostname:
+        return url
+    scheme = parts.scheme.lower()
+    host = parts.hostname  # already lower-case, brackets removed
+    if ":" in host:
+        host = f"[{host}]"
+    try:
+        port = parts.port
+    except ValueError:
+        return url
+    if port is not None and port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{port}"
+    userinfo, at, _ = parts.netloc.rpartition("@")
+    netloc = f"{userinfo}{at}{host}"
+    path = parts.path.rstrip("/") or "/"
+    query = "&".join(param for param in parts.query.split("&") if param and not _is_tracking(param))
+    return urlunsplit((scheme, netloc, path, query, parts.fragment))
+
+def _dedup_links(c):
+    """Canonicalize every stored URL and merge duplicates before the unique index is built.
+
+    Each URL keeps its oldest row (and id) with the name and category of its newest,
+    as saving it again would have done.
+    """
+    c.execute("SELECT id, name, url, category FROM weblinks ORDER BY id")
+    kept = {}  # canonical url -> [id, name, category]
+    stale = []
+    for link_id, name, url, category in c.fetchall():
+        url = canonical_url(url or "")
+        if url in kept:
+            stale.append((link_id,))
+            kept[url][1:] = name, category
+        else:
+            kept[url] = [link_id, name, category]
+    c.executemany("DELETE FROM weblinks WHERE id = ?", stale)
+    c.executemany(
+        "UPDATE weblinks SET name = ?, url = ?, category = ? WHERE id = ?",
+        ((name, url, category, link_id) for url, (link_id, name, category) in kept.items()),
+    )
+
 init_db()
 
+# --- Favicon cache: pages only read it; missing and stale icons are fetched in the background ---
+FAVICON_DIR = Path("static") / "favicons"
+FAVICON_URL = "/favicons"
+PLACEHOLDER_ICON = "https://via.placeholder.com/16"
+FAVICON_TTL = 7 * 24 * 3600  # revalidate (with ETag / Last-Modified) after a week
+FAVICON_BACKOFF = 3600  # first retry after a failure; doubles per failure
+FAVICON_BACKOFF_MAX = 7 * 24 * 3600
+FAVICON_MAX_BYTES = 256 * 1024
+FAVICON_CONCURRENCY = 8
+FAVICON_PER_HOST = 2
+FAVICON_TIMEOUT = 5
+_fetching = set()  # origins with a fetch under way, so refreshes don't queue them twice
+
+os.makedirs(FAVICON_DIR, exist_ok=True)
+app.add_static_files(FAVICON_URL, str(FAVICON_DIR))
+
+async def run_per_host(urls, fn, concurrency, per_host):
+    """Await fn(url) for every url, at most `concurrency` at once and `per_host` per host."""
+    limit = asyncio.Semaphore(concurrency)
+    host_limits = {}
+
+    async def run(url):
+        host_limit = host_limits.setdefault(urlsplit(url).hostname or "", asyncio.Semaphore(per_host))
+        async with host_limit, limit:
+            return await fn(url)
+
+    return await asyncio.gather(*(run(url) for url in urls))
+
+def origin_of(url):
+    parts = urlsplit(url)
+    return f"{parts.scheme.lower()}://{parts.netloc.lower()}" if parts.scheme and parts.netloc else None
+
+def load_favicons():
+    """Return {origin: icon URL} for every cached icon."""
+    conn = db.connect("links.db")
+    c = conn.cursor()
+    c.execute("SELECT origin, file FROM favicons WHERE file != ''")
+    icons = {origin: f"{FAVICON_URL}/{file}" for origin, file in c.fetchall()}
+    conn.close()
+    return icons
+
+def favicons_due(origins, now=None):
+    """The origins among `origins` with no icon yet, a stale one, or a failure whose backoff ran out."""
+    now = now or time.time()
+    conn = db.connect("links.db")
+    c = conn.cursor()
+    c.execute("SELECT origin, file, fetched_at, retry_at FROM favicons")
+    known = {origin: (file, fetched_at, retry_at) for origin, file, fetched_at, retry_at in c.fetchall()}
+    conn.close()
+    due = []
+    for origin in dict.fromkeys(origins):
+        if origin not in known:
+            due.append(origin)
+            continue
+        file, fetched_at, retry_at = known[origin]
+        if (file and fetched_at + FAVICON_TTL <= now) or (not file and retry_at <= now):
+            due.append(origin)
+    return due
+
+def _looks_like_icon(response):
+    content_type = response.headers.get("Content-Type", "").split(";")[0].strip().lower()
+    body = response.content
+    # Some servers answer a missing favicon.ico with their HTML home page and a 200
+    return 0 < len(body) <= FAVICON_MAX_BYTES and not content_type.startswith("text/") and not body.lstrip()[:1] == b"<"
+
+def _store_icon(body):
+    """Write body under its SHA-256 (once per distinct icon) and return the file name."""
+    name = hashlib.sha256(body).hexdigest()[:32] + ".ico"
+    path = FAVICON_DIR / name
+    if not path.exists():
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_bytes(body)
+        os.replace(tmp_path, path)
+    return name
+
+async def fetch_favicon(origin, previous=None):
+    """Fetch or revalidate one origin's favicon and record the outcome; returns the file name or ''."""
+    file, etag, last_modified, failures = previous or ("", None, None, 0)
+    headers = {}
+    if file and etag:
+        headers["If-None-Match"] = etag
+    if file and last_modified:
+        headers["If-Modified-Since"] = last_modified
+    now = time.time()
+    try:
+        # No retries: a failure backs off in the favicons table instead of costing several timeouts now
+        response = await httpclient.arequest(
+            "weblinks", "GET", f"{origin}/favicon.ico",
+            cache=False, retries=0, headers=headers, timeout=FAVICON_TIMEOUT,
+        )
+        if response.status_code == 304 and file:
+            row = (file, etag, last_modified, now, 0, 0)
+        elif response.status_code == 200 and _looks_like_icon(response):
+            file = _store_icon(response.content)
+            row = (file, response.headers.get("ETag"), response.headers.get("Last-Modified"), now, 0, 0)
+        else:
+            raise ValueError(f"HTTP {response.status_code}")
+    except Exception:
+        failures += 1
+        retry_at = now + min(FAVICON_BACKOFF * 2 ** (failures - 1), FAVICON_BACKOFF_MAX)
+        # A known icon stays in use until it's replaced
+        row = (file, etag, last_modified, now, failures, retry_at)
+    conn = db.connect("links.db")
+    conn.execute(
+        "INSERT OR REPLACE INTO favicons (origin, file, etag, last_modified, fetched_at, failures, retry_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (origin, *row),
+    )
+    conn.commit()
+    conn.close()
+    return row[0]
+
+async def fetch_favicons(job, origins):
+    """Fetch many origins' icons concurrently: FAVICON_CONCURRENCY at once, FAVICON_PER_HOST per host.
+
+    Publishes a "favicons" event per origin whose icon changed, so open pages can swap it in.
+    """
+    conn = db.connect("links.db")
+    c = conn.cursor()
+    c.execute("SELECT origin, file, etag, last_modified, failures FROM favicons")
+    previous = {row[0]: row[1:] for row in c.fetchall()}
+    conn.close()
+    done = 0
+
+    async def fetch(origin):
+        nonlocal done
+        try:
+            file = await fetch_favicon(origin, previous.get(origin))
+        finally:
+            _fetching.discard(origin)
+        done += 1
+        job.set_progress(done / len(origins), f"{done} of {len(origins)} icons checked")
+        if file and file != (previous.get(origin) or ("",))[0]:
+            events.publish("favicons", "update", origin, url=f"{FAVICON_URL}/{file}")
+
+    await run_per_host(origins, fetch, FAVICON_CONCURRENCY, FAVICON_PER_HOST)
+    return done
+
+def refresh_favicons(urls):
+    """Start a background fetch for the icons of `urls` that are missing or stale."""
+    origins = [o for o in favicons_due(filter(None, (origin_of(url) for url in urls))) if o not in _fetching]
+    if origins:
+        _fetching.update(origins)
+        jobs.submit(f"weblinks.favicons:{origins[0]}", fetch_favicons, origins, report=True)
+
+# --- Link health: a background sweep checks due links; pages only read the results ---
+HEALTH_CONCURRENCY = 16
+HEALTH_PER_HOST = 2
+HEALTH_TIMEOUT = 10
+HEALTH_SWEEP = 600  # seconds between sweeps for due links
+HEALTH_BATCH = 1000  # links checked per sweep, most overdue first
+HEALTH_INTERVAL = 24 * 3600  # after a change; doubles while a link stays the same
+HEALTH_INTERVAL_MAX = 30 * 24 * 3600
+HEALTH_RETRY = 3600  # after a failure; doubles per failure up to HEALTH_INTERVAL
+HEALTH_QUERY = "SELECT url, status, final_url, latency_ms, error, checked_at FROM link_health"
+DUE_LINKS_QUERY = (
+    "SELECT w.url, h.status, h.final_url, h.error, h.etag, h.last_modified, h.check_interval, h.failures "
+    "FROM weblinks w LEFT JOIN link_health h ON h.url = w.url "
+    "WHERE h.url IS NULL OR h.next_check <= ? ORDER BY coalesce(h.next_check, 0) LIMIT ?"
+)
+
+def load_health():
+    """Return {url: (status, final_url, latency_ms, error, checked_at)} for every checked link."""
+    conn = db.connect("links.db")
+    c = conn.cursor()
+    c.execute(HEALTH_QUERY)
+    health = {row[0]: row[1:] for row in c.fetchall()}
+    conn.close()
+    return health
+
+def health_badge(health):
+    """Return (text, color, tooltip) for a load_health() value, or None for an unchecked link."""
+    if health is None:
+        return "unchecked", "grey", "Not checked yet"
+    status, final_url, latency_ms, error, checked_at = health
+    checked = time.strftime("%Y-%m-%d %H:%M", time.localtime(checked_at))
+    if error:
+        return "unreachable", "negative", f"{error} (checked {checked})"
+    if status >= 400:
+        return str(status), "negative", f"HTTP {status} (checked {checked})"
+    if final_url:
+        return "moved", "warning", f"Redirects to {final_url} (checked {checked})"
+    return "ok", "positive", f"HTTP {status} in {latency_ms:.0f} ms (checked {checked})"
+
+def _elapsed_ms(response):
+    """Time on the wire for a response and the redirects before it, without any queueing or throttling."""
+    return sum(r.elapsed.total_seconds() for r in (*response.history, response)) * 1000
+
+async def check_link(url, previous=None):
+    """HEAD url (GET if HEAD is refused), record the result and schedule the next check.
+
+    The interval doubles while the result stays the same and resets when it
+    changes; failures are retried sooner. Returns True if the result changed.
+    """
+    old_status, old_final, old_error, etag, last_modified, interval, failures = previous or (None,) * 5 + (0, 0)
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    status, final_url, error, latency_ms = None, "", None, None
+    try:
+        # No retries: a failing link is rechecked on the HEALTH_RETRY schedule instead
+        response = await httpclient.arequest(
+            "weblinks", "HEAD", url,
+            cache=False, retries=0, headers=headers, allow_redirects=True, timeout=HEALTH_TIMEOUT,
+        )
+        if response.status_code >= 400:
+            # Plenty of servers refuse or mishandle HEAD; only the body of a GET is skipped
+            response = await httpclient.arequest(
+                "weblinks", "GET", url,
+                cache=False, retries=0, headers=headers, stream=True, timeout=HEALTH_TIMEOUT,
+            )
+            await response.aclose()
+        status = response.status_code
+        latency_ms = _elapsed_ms(response)
+        final_url = str(response.url) if response.history else ""
+        etag, last_modified = response.headers.get("ETag", etag), response.headers.get("Last-Modified", last_modified)
+    except Exception as e:
+        error = str(e) or type(e).__name__
+    if status == 304:
+        status, final_url = old_status or 200, old_final or ""
+    if error is None and status < 400:
+        failures = 0
+        same = interval and not old_error and (status, final_url) == (old_status, old_final)
+        interval = min(interval * 2, HEALTH_INTERVAL_MAX) if same else HEALTH_INTERVAL
+    else:
+        failures += 1
+        interval = min(HEALTH_RETRY * 2 ** (failures - 1), HEALTH_INTERVAL)
+    now = time.time()
+    conn = db.connect("links.db")
+    conn.execute(
+        "INSERT OR REPLACE INTO link_health (url, status, final_url, latency_ms, error, etag, last_modified, "
+        "checked_at, next_check, check_interval, failures) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (url, status, final_url, latency_ms, error, etag, last_modified, now, now + interval, interval, failures),
+    )
+    conn.commit()
+    conn.close()
+    # Error texts vary between attempts, so only whether there was one counts as a change
+    changed = previous is None or (status, final_url, error is None) != (old_status, old_final, old_error is None)
+    if changed:
+        events.publish(
+            "link_health", "update", url,
+            status=status, final_url=final_url, latency_ms=latency_ms, error=error, checked_at=now,
+        )
+    return changed
+
+async def check_due_links(job=None):
+    """Check up to HEALTH_BATCH links whose next check is due (all unchecked links first)."""
+    conn = db.connect("links.db")
+    c = conn.cursor()
+    c.execute("DELETE FROM link_health WHERE url NOT IN (SELECT url FROM weblinks)")
+    conn.commit()
+    c.execute(DUE_LINKS_QUERY, (time.time(), HEALTH_BATCH))
+    due = {row[0]: row[1:] for row in c.fetchall()}
+    conn.close()
+    done = 0
+
+    async def check(url):
+        nonlocal done
+        changed = await check_link(url, due[url] if due[url][5] is not None else None)
+        done += 1
+        if job is not None:
+            job.set_progress(done / len(due), f"{done} of {len(due)} links checked")
+        return changed
+
+    changed = await run_per_host(list(due), check, HEALTH_CONCURRENCY, HEALTH_PER_HOST)
+    return {"checked": len(due), "changed": sum(changed)}
+
+jobs.schedule("weblinks.check_links", check_due_links, seconds=HEALTH_SWEEP)
+
+def export_weblinks(filename="weblinks.json"):
+    export.export_query("links.db", "SELECT name, url, category FROM weblinks", filename)
+    upload_file_stub(filename)
+
+
 def render():
     with ui.card().classes("p-6 bg-gray-700"):
         ui.label("Web Links").classes("text-2xl font-semibold text-gray-100 mb-4")
         weblinks_list = ui.list().classes("w-full")
 
         def load_weblinks():
-            conn = sqlite3.connect("links.db")
+            conn = db.connect("links.db")
             c = conn.cursor()
-            c.execute("SELECT name, url, category FROM weblinks")
+            c.execute("SELECT id, name, url, category FROM weblinks")
             return c.fetchall()
 
         def save_link(name, url, category):
-            conn = sqlite3.connect("links.db")
+            """Add a link, or rename and recategorize it if its canonical URL is already saved."""
+            url = canonical_url(url)
+            conn = db.connect("links.db")
             c = conn.cursor()
+            c.execute("SELECT id FROM weblinks WHERE url = ?", (url,))
+            existing = c.fetchone()
             c.execute(
-                "INSERT INTO weblinks (name, url, category) VALUES (?, ?, ?)",
+                "INSERT INTO weblinks (name, url, category) VALUES (?, ?, ?) "
+                "ON CONFLICT(url) DO UPDATE SET name = excluded.name, category = excluded.category",
                 (name, url, category),
             )
             conn.commit()
             conn.close()
+            if existing:
+                events.row_updated("weblinks", existing[0], name=name, url=url, category=category)
+            else:
+                events.row_inserted("weblinks", c.lastrowid, name=name, url=url, category=category)
+            return existing is None
 
-        def delete_link(url):
-            conn = sqlite3.connect("links.db")
+        def delete_link(link_id):
+            conn = db.connect("links.db")
             c = conn.cursor()
-            c.execute("DELETE FROM weblinks WHERE url = ?", (url,))
+            c.execute("DELETE FROM link_health WHERE url = (SELECT url FROM weblinks WHERE id = ?)", (link_id,))
+            c.execute("DELETE FROM weblinks WHERE id = ?", (link_id,))
             conn.commit()
             conn.close()
+            events.row_deleted("weblinks", link_id)
 
-        def fetch_favicon(url):
-            try:
-                response = requests.get(f"{url}/favicon.ico", timeout=5)
-                if response.status_code == 200:
-                    os.makedirs("static", exist_ok=True)
-                    favicon_path = (
-                        Path("static")
-                        / f"{url.replace('http://', '').replace('https://', '').replace('/', '_')}.ico"
+        link_rows = {}  # id -> rows
+        link_labels = {}  # id -> (link, category label) pairs
+        link_icons = {}  # origin -> images showing its icon
+        link_badges = {}  # url -> health badges
+        icons = {}  # origin -> cached icon URL
+        health = {}  # url -> load_health() value
+
+        def render_link(link_id, name, url, category):
+            with weblinks_list:
+                with ui.row().classes("items-center") as row:
+                    origin = origin_of(url)
+                    icon = ui.image(icons.get(origin, PLACEHOLDER_ICON)).classes("w-5 h-5 mr-2")
+                    link_icons.setdefault(origin, []).append(icon)
+                    link = ui.link(name, url).props("target=_blank").classes(
+                        "text-blue-400 hover:text-blue-300"
+                    )
+                    label = ui.label(category).classes("ml-2 text-gray-300 italic")
+                    link_labels.setdefault(link_id, []).append((link, label))
+                    text, color, tooltip = health_badge(health.get(url))
+                    badge = ui.badge(text, color=color).classes("ml-2")
+                    badge.props["title"] = tooltip
+                    link_badges.setdefault(url, []).append(badge)
+                    ui.button(
+                        "Delete", on_click=lambda i=link_id: delete_link(i)
+                    ).classes(
+                        "bg-red-600 hover:bg-red-500 text-white rounded px-2 py-1"
                     )
-                    with open(favicon_path, "wb") as f:
-                        f.write(response.content)
-                    return str(favicon_path)
-            except Exception:
-                return None
+            link_rows.setdefault(link_id, []).append(row)
 
+        @metrics.timed("weblinks.refresh_weblinks")
         def refresh_weblinks():
             weblinks_list.clear()
-            for name, url, category in load_weblinks():
-                with weblinks_list:
-                    with ui.row().classes("items-center"):
-                        favicon = fetch_favicon(url) or "https://via.placeholder.com/16"
-                        ui.image(favicon).classes("w-5 h-5 mr-2")
-                        ui.link(name, url).props("target=_blank").classes(
-                            "text-blue-400 hover:text-blue-300"
-                        )
-                        ui.label(category).classes("ml-2 text-gray-300 italic")
-                        ui.button(
-                            "Delete", on_click=lambda u=url: delete_link(u)
-                        ).classes(
-                            "bg-red-600 hover:bg-red-500 text-white rounded px-2 py-1"
-                        )
+            link_rows.clear()
+            link_labels.clear()
+            link_icons.clear()
+            link_badges.clear()
+            icons.clear()
+            icons.update(load_favicons())
+            health.clear()
+            health.update(load_health())
+            links = load_weblinks()
+            for link_id, name, url, category in links:
+                render_link(link_id, name, url, category)
+            refresh_favicons(url for _, _, url, _ in links)
+
+        def on_link_changed(e):
+            if e.action == "insert":
+                render_link(e.id, e.data["name"], e.data["url"], e.data["category"])
+                refresh_favicons([e.data["url"]])
+                jobs.submit(f"weblinks.check_link:{e.data['url']}", check_link, e.data["url"])
+            elif e.action == "update":
+                for link, label in link_labels.get(e.id, []):
+                    link.set_text(e.data["name"])
+                    label.set_text(e.data["category"])
+            elif e.action == "delete":
+                link_labels.pop(e.id, None)
+                for row in link_rows.pop(e.id, []):
+                    weblinks_list.remove(row)
+
+        def on_favicon_changed(e):
+            icons[e.id] = e.data["url"]
+            link_icons[e.id] = [icon for icon in link_icons.get(e.id, []) if not icon.is_deleted]
+            for icon in link_icons[e.id]:
+                icon.set_source(e.data["url"])
+
+        def on_health_changed(e):
+            health[e.id] = (e.data["status"], e.data["final_url"], e.data["latency_ms"], e.data["error"], e.data["checked_at"])
+            text, color, tooltip = health_badge(health[e.id])
+            link_badges[e.id] = [badge for badge in link_badges.get(e.id, []) if not badge.is_deleted]
+            for badge in link_badges[e.id]:
+                badge.set_text(text)
+                badge.set_background_color(color)
+                badge.props["title"] = tooltip
+
+        async def check_links():
+            try:
+                result = await jobs.run("weblinks.check_links", check_due_links, report=True)
+            except Exception as ex:
+                ui.notify(f"Link check failed: {str(ex)}", type="negative")
+                return
+            ui.notify(f"Checked {result['checked']} links, {result['changed']} changed", type="positive")
+
+        events.listen("weblinks", on_link_changed)
+        events.listen("favicons", on_favicon_changed)
+        events.listen("link_health", on_health_changed)
 
         def add_link():
             url = url_input.value.strip()
             name = name_input.value.strip() or url
             category = category_input.value.strip()
             if url and validators.url(url):
-                save_link(name, url, category)
-                refresh_weblinks()
+                if not save_link(name, url, category):
+                    ui.notify("Link already saved, updated its name and category", type="info")
                 url_input.value = ""
                 name_input.value = ""
                 category_input.value = ""
             else:
                 ui.notify("Invalid URL", type="negative")
 
-        def export_weblinks():
-            weblinks = load_weblinks()
-            with open("weblinks.json", "w") as f:
-                json.dump(
-                    [{"name": n, "url": u, "category": c} for n, u, c in weblinks], f
-                )
-            upload_file_stub("weblinks.json")
 
         name_input = (
             ui.input("Link Name")
@@ -124,4 +560,7 @@ def render():
         ui.button("Export to Drive", on_click=export_weblinks).classes(
             "bg-blue-600 hover:bg-blue-500 text-white rounded px-4 py-2 mt-4"
         )
+        ui.button("Check Links", on_click=check_links).classes(
+            "bg-gray-600 hover:bg-gray-500 text-white rounded px-4 py-2 mt-4"
+        )
         refresh_weblinks()
\ No newline at end of file
@@ -1,7 +1,8 @@
 from nicegui import ui
 import ollama
 import subprocess
-import sqlite3
+from core import db
+from core.settings import SettingsStore
 import re
 import os
 import importlib.util
@@ -15,7 +16,7 @@ CORE_MODULES_PATH = "core"  # Path to the core modules folder
 
 def init_db():
     """Initialize the database for storing prompt history and settings."""
-    with sqlite3.connect(DB_FILE) as conn:
+    with db.connect(DB_FILE) as conn:
         c = conn.cursor()
         c.execute(
             """
@@ -37,11 +38,12 @@ def init_db():
         """
         )
         conn.commit()
+    settings_store.init_db()
 
 
 def save_prompt_history(prompt, response, model):
     """Save a prompt and response to the database."""
-    with sqlite3.connect(DB_FILE) as conn:
+    with db.connect(DB_FILE) as conn:
         c = conn.cursor()
         c.execute(
             "INSERT INTO ai_prompts (prompt, response, model) VALUES (?, ?, ?)",
@@ -52,7 +54,7 @@ def save_prompt_history(prompt, response, model):
 
 def load_prompt_history(limit=5):
     """Load recent prompts from the database."""
-    with sqlite3.connect(DB_FILE) as conn:
+    with db.connect(DB_FILE) as conn:
         c = conn.cursor()
         c.execute(
             "SELECT prompt, response, model, timestamp FROM ai_prompts ORDER BY timestamp DESC LIMIT ?",
@@ -61,31 +63,17 @@ def load_prompt_history(limit=5):
         return c.fetchall()
 
 
+settings_store = SettingsStore(DB_FILE, "ai_settings")
+
+
 def save_setting(key, value):
     """Save a setting to the database."""
-    with sqlite3.connect(DB_FILE) as conn:
-        c = conn.cursor()
-        c.execute(
-            "INSERT OR REPLACE INTO ai_settings (key, value) VALUES (?, ?)",
-            (key, str(value)),
-        )
-        conn.commit()
+    settings_store.set(key, value)
 
 
 def load_setting(key, default):
-    """Load a setting from the database."""
-    with sqlite3.connect(DB_FILE) as conn:
-        c = conn.cursor()
-        c.execute("SELECT value FROM ai_settings WHERE key = ?", (key,))
-        result = c.fetchone()
-        if result:
-            try:
-                return eval(
-                    result[0], {}, {}
-                )  # Safely evaluate string to Python object
-            except Exception:
-                return default
-        return default
+    """Load a setting from the cache."""
+    return settings_store.get(key, default)
 
 
 def validate_filename(filename):
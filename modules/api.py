@@ -1,11 +1,12 @@
 from nicegui import ui
-import requests
-import sqlite3
+from core import httpclient
+from core import db
+from core import export
 import json
 import datetime
 
 def init_db():
-    conn=sqlite3.connect("links.db")
+    conn=db.connect("links.db")
     c=conn.cursor()
     c.execute("CREATE TABLE IF NOT EXISTS api_endpoints (id INTEGER PRIMARY KEY, name TEXT, url TEXT, method TEXT, headers TEXT, payload TEXT)")
     c.execute("""CREATE TABLE IF NOT EXISTS api_history (
@@ -33,7 +34,7 @@ def render():
         history_list=ui.list().classes("w-full h-40 overflow-auto bg-gray-600 text-gray-100 rounded p-2 mb-4")
 
         def load_endpoints():
-            conn=sqlite3.connect("links.db")
+            conn=db.connect("links.db")
             c=conn.cursor()
             c.execute("SELECT id,name,url,method,headers,payload FROM api_endpoints")
             return c.fetchall()
@@ -42,7 +43,7 @@ def render():
             try:
                 headers_json=json.loads(headers.value) if headers.value else {}
                 payload_json=json.loads(payload.value) if payload.value else {}
-                conn=sqlite3.connect("links.db")
+                conn=db.connect("links.db")
                 c=conn.cursor()
                 c.execute("INSERT INTO api_endpoints (name,url,method,headers,payload) VALUES (?,?,?,?,?)",(name.value or url.value,url.value,method.value,json.dumps(headers_json),json.dumps(payload_json)))
                 conn.commit()
@@ -52,7 +53,7 @@ def render():
                 ui.notify(f"Error saving endpoint: {str(e)}",type="negative")
 
         def delete_endpoint(endpoint_id):
-            conn=sqlite3.connect("links.db")
+            conn=db.connect("links.db")
             c=conn.cursor()
             c.execute("DELETE FROM api_endpoints WHERE id=?",(endpoint_id,))
             c.execute("DELETE FROM api_history WHERE endpoint_id=?",(endpoint_id,))
@@ -62,7 +63,7 @@ def render():
             history_list.clear()
 
         def save_response_history(endpoint_id,status,response_text):
-            conn=sqlite3.connect("links.db")
+            conn=db.connect("links.db")
             c=conn.cursor()
             timestamp=datetime.datetime.now().isoformat()
             c.execute("INSERT INTO api_history (endpoint_id,status,response,timestamp) VALUES (?,?,?,?)",(endpoint_id,status,response_text,timestamp))
@@ -70,7 +71,7 @@ def render():
             conn.close()
 
         def load_history(endpoint_id):
-            conn=sqlite3.connect("links.db")
+            conn=db.connect("links.db")
             c=conn.cursor()
             c.execute("SELECT status,response,timestamp FROM api_history WHERE endpoint_id=? ORDER BY timestamp DESC LIMIT 10",(endpoint_id,))
             return c.fetchall()
@@ -84,16 +85,16 @@ def render():
 
         ui.upload(on_upload=lambda e: handle_file_upload(e)).props("label=Upload File for POST").classes("bg-gray-600 text-white rounded mb-2")
 
-        def test_endpoint():
+        async def test_endpoint():
             try:
                 headers_json=json.loads(headers.value) if headers.value else {}
                 payload_json=json.loads(payload.value) if payload.value else {}
                 files=None
                 if method.value=="POST" and uploaded_file["name"] and uploaded_file["content"]:
                     files={"file":(uploaded_file["name"],uploaded_file["content"])}
-                response_data=requests.request(method.value,url.value,headers=headers_json,json=payload_json if not files else None,files=files,timeout=5)
+                response_data=await httpclient.arequest("api",method.value,url.value,cache=False,headers=headers_json,json=payload_json if not files else None,files=files,timeout=5)
                 response.value=f"Status: {response_data.status_code}\n\n{response_data.text}"
-                conn=sqlite3.connect("links.db")
+                conn=db.connect("links.db")
                 c=conn.cursor()
                 c.execute("SELECT id FROM api_endpoints WHERE url=? AND method=?",(url.value,method.value))
                 row=c.fetchone()
@@ -132,9 +133,7 @@ def render():
 
         def export_endpoints():
             from core.gdrive import upload_file_stub
-            endpoints=load_endpoints()
-            with open("endpoints.json","w") as f:
-                json.dump([{"id":e[0],"name":e[1],"url":e[2],"method":e[3],"headers":e[4],"payload":e[5]} for e in endpoints],f)
+            export.export_query("links.db","SELECT id,name,url,method,headers,payload FROM api_endpoints","endpoints.json")
             upload_file_stub("endpoints.json")
             ui.notify("Endpoints exported to Google Drive",type="positive")
 
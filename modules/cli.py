@@ -1,13 +1,13 @@
 from nicegui import ui
 import subprocess
-import sqlite3
+from core import db
 import datetime
 
 DB_FILE =  "db/cli.db"
 # from contextlib import redirect_stdout
 
 def init_db():
-    conn = sqlite3.connect("DB_FILE")
+    conn = db.connect("DB_FILE")
     c = conn.cursor()
     c.execute("""CREATE TABLE IF NOT EXISTS cli_history (
                     id INTEGER PRIMARY KEY,
@@ -27,13 +27,13 @@ def render():
         history_list = ui.list().classes("w-full h-40 overflow-auto bg-gray-600 text-gray-100 rounded p-2 mb-4")
 
         def load_history():
-            conn = sqlite3.connect("cli.db")
+            conn = db.connect("cli.db")
             c = conn.cursor()
             c.execute("SELECT id, command, timestamp FROM cli_history ORDER BY timestamp DESC LIMIT 10")
             return c.fetchall()
 
         def save_command(command):
-            conn = sqlite3.connect("cli.db")
+            conn = db.connect("cli.db")
             c = conn.cursor()
             timestamp = datetime.datetime.now().isoformat()
             c.execute("INSERT INTO cli_history (command, timestamp) VALUES (?, ?)", (command, timestamp))
@@ -2,7 +2,7 @@ from nicegui import ui
 import io
 from contextlib import redirect_stdout
 import ast
-import sqlite3
+from core import db
 from datetime import datetime
 import subprocess
 import platform
@@ -10,7 +10,7 @@ import platform
 DB_FILE = "db/code.db"
 
 def init_db():
-    conn = sqlite3.connect(DB_FILE)
+    conn = db.connect(DB_FILE)
     c = conn.cursor()
     c.execute("""
         CREATE TABLE IF NOT EXISTS snippets (
@@ -29,7 +29,7 @@ def init_db():
     conn.close()
 
 def save_snippet(title, code):
-    conn = sqlite3.connect(DB_FILE)
+    conn = db.connect(DB_FILE)
     c = conn.cursor()
     c.execute("INSERT INTO snippets (title, code, timestamp) VALUES (?, ?, ?)",
               (title, code, datetime.now().isoformat()))
@@ -37,7 +37,7 @@ def save_snippet(title, code):
     conn.close()
 
 def save_command(command):
-    conn = sqlite3.connect(DB_FILE)
+    conn = db.connect(DB_FILE)
     c = conn.cursor()
     timestamp = datetime.now().isoformat()
     c.execute("INSERT INTO cli_history (command, timestamp) VALUES (?, ?)", (command, timestamp))
@@ -45,7 +45,7 @@ def save_command(command):
     conn.close()
 
 def load_history():
-    conn = sqlite3.connect(DB_FILE)
+    conn = db.connect(DB_FILE)
     c = conn.cursor()
     c.execute("SELECT id, command, timestamp FROM cli_history ORDER BY timestamp DESC LIMIT 10")
     rows = c.fetchall()
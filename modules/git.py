@@ -3,7 +3,8 @@ import subprocess
 import os
 from pathlib import Path
 from core.credentials import get_credentials, get_credential_by_id
-import requests
+from core import jobs
+from core import httpclient
 
 
 def render():
@@ -19,9 +20,9 @@ def render():
                 options=cred_options,
                 label="Select Server/Credential (optional)",
             ).classes("bg-gray-600 text-white rounded w-full mb-2")
-            def on_cred_change():
+            async def on_cred_change():
                 selected_cred_id["id"] = cred_select.value
-                refresh_server_info()
+                await refresh_server_info()
             cred_select.on("change", on_cred_change)
         else:
             ui.label("No credentials found. Add in Credentials Manager.").classes("text-red-400 mb-2")
@@ -41,7 +42,7 @@ def render():
         server_info = ui.column().classes("mb-4")
         repo_list = ui.list().classes("w-full mb-4")
 
-        def refresh_server_info():
+        async def refresh_server_info():
             server_info.clear()
             repo_list.clear()
             if not selected_cred_id["id"]:
@@ -56,7 +57,7 @@ def render():
                 status = "Unknown"
                 if server_type == "gitea":
                     try:
-                        r = requests.get(f"{url}/api/v1/version", timeout=5, headers={"Authorization": f"token {token}"} if token else {})
+                        r = await httpclient.aget("git", f"{url}/api/v1/version", timeout=5, headers={"Authorization": f"token {token}"} if token else {})
                         if r.status_code == 200:
                             status = f"Online (Gitea v{r.json().get('version','?')})"
                         else:
@@ -65,7 +66,7 @@ def render():
                         status = f"Offline/Error: {e}"
                 elif server_type == "github":
                     try:
-                        r = requests.get("https://api.github.com/user", headers={"Authorization": f"token {token}"} if token else {}, timeout=5)
+                        r = await httpclient.aget("git", "https://api.github.com/user", headers={"Authorization": f"token {token}"} if token else {}, timeout=5)
                         if r.status_code == 200:
                             status = f"Online (GitHub user: {r.json().get('login','?')})"
                         else:
@@ -79,7 +80,7 @@ def render():
                 # List repositories (Gitea/GitHub)
                 if server_type == "gitea":
                     try:
-                        r = requests.get(f"{url}/api/v1/user/repos", headers={"Authorization": f"token {token}"} if token else {}, timeout=5)
+                        r = await httpclient.aget("git", f"{url}/api/v1/user/repos", headers={"Authorization": f"token {token}"} if token else {}, timeout=5)
                         if r.status_code == 200:
                             repos = r.json()
                             with repo_list:
@@ -94,7 +95,7 @@ def render():
                             ui.label(f"Error: {e}").classes("text-red-400")
                 elif server_type == "github":
                     try:
-                        r = requests.get("https://api.github.com/user/repos", headers={"Authorization": f"token {token}"} if token else {}, timeout=5)
+                        r = await httpclient.aget("git", "https://api.github.com/user/repos", headers={"Authorization": f"token {token}"} if token else {}, timeout=5)
                         if r.status_code == 200:
                             repos = r.json()
                             with repo_list:
@@ -109,7 +110,7 @@ def render():
                             ui.label(f"Error: {e}").classes("text-red-400")
 
         # --- Git Command Execution ---
-        def run_git_command(args):
+        async def run_git_command(args):
             try:
                 repo_input = repo_path.value.strip() or "."
                 repo_input = os.path.expanduser(repo_input)
@@ -132,7 +133,9 @@ def render():
                             env["GIT_ASKPASS"] = "echo"
                             env["GIT_USERNAME"] = username or ""
                             env["GIT_PASSWORD"] = token or password or ""
-                result = subprocess.run(
+                result = await jobs.run(
+                    f"git:{repo}:{' '.join(args)}",
+                    subprocess.run,
                     ["git", "-C", str(repo)] + args,
                     capture_output=True,
                     text=True,
@@ -147,15 +150,15 @@ def render():
         branch_input = ui.input("Branch Name").classes("bg-gray-600 text-white rounded w-full mb-2")
         branch_output = ui.textarea("Branch Output").props("readonly").classes("w-full h-20 bg-gray-600 text-gray-100 mb-4")
 
-        def clone_repo():
+        async def clone_repo():
             url = repo_url_input.value.strip()
             if url:
-                run_git_command(["clone", url])
+                await run_git_command(["clone", url])
             else:
                 command_output.value = "Error: Repository URL is empty."
 
-        def backup_repo():
-            from core.gdrive import upload_file_stub
+        async def backup_repo():
+            from core.gdrive import upload_file_async
             import shutil
             repo_input = repo_path.value.strip() or "."
             repo = Path(repo_input)
@@ -163,18 +166,18 @@ def render():
                 command_output.value = f"Error: Repository path '{repo_input}' does not exist or is not a directory."
                 return
             archive_name = "repo_backup"
-            shutil.make_archive(archive_name, "zip", repo)
-            upload_file_stub(f"{archive_name}.zip")
+            await jobs.run(f"git.backup:{repo}", shutil.make_archive, archive_name, "zip", repo)
+            await upload_file_async(f"{archive_name}.zip")
             command_output.value = f"Backup created and uploaded as {archive_name}.zip"
 
-        def checkout_branch():
+        async def checkout_branch():
             branch = branch_input.value.strip()
             if branch:
-                run_git_command(["checkout", branch])
+                await run_git_command(["checkout", branch])
             else:
                 branch_output.value = "Error: Branch name is empty."
 
-        def list_branches():
+        async def list_branches():
             try:
                 repo_input = repo_path.value.strip() or "."
                 repo_input = os.path.expanduser(repo_input)
@@ -182,7 +185,9 @@ def render():
                 if not repo.exists() or not repo.is_dir():
                     branch_output.value = f"Error: Repository path '{repo_input}' does not exist or is not a directory."
                     return
-                result = subprocess.run(
+                result = await jobs.run(
+                    f"git:{repo}:branch",
+                    subprocess.run,
                     ["git", "-C", str(repo), "branch"],
                     capture_output=True,
                     text=True,
@@ -217,13 +222,14 @@ def render():
                     .props("clearable")
                     .classes("bg-gray-600 text-white rounded w-full mb-2")
                 )
+                async def commit():
+                    dialog.close()
+                    await run_git_command(["commit", "-m", message.value])
+
                 with ui.row():
                     ui.button(
                         "Commit",
-                        on_click=lambda: [
-                            run_git_command(["commit", "-m", message.value]),
-                            dialog.close(),
-                        ],
+                        on_click=commit,
                     ).classes(
                         "bg-green-600 hover:bg-green-500 text-white rounded px-4 py-2"
                     )
@@ -233,7 +239,7 @@ def render():
             dialog.open()
 
         # Initial server info refresh
-        refresh_server_info()
+        ui.timer(0, refresh_server_info, once=True)
 # Marketplace metadata
 def marketplace_info():
     return {
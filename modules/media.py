@@ -1,14 +1,16 @@
 from nicegui import ui
-import sqlite3
+from core import db
+from core import metrics
 from pathlib import Path
 import os
 import yt_dlp
 import re
+from core import jobs
 from urllib.parse import urlparse, parse_qs  # noqa: F401
 
 
 def init_db():
-    conn = sqlite3.connect("db/media.db")
+    conn = db.connect("db/media.db")
     c = conn.cursor()
     c.execute(
         "CREATE TABLE IF NOT EXISTS playlists (id INTEGER PRIMARY KEY, name TEXT, type TEXT)"
@@ -23,6 +25,27 @@ def init_db():
 init_db()
 
 
+def load_playlists():
+    conn = db.connect("media.db")
+    c = conn.cursor()
+    c.execute("SELECT id, name, type FROM playlists")
+    playlists = c.fetchall()
+    conn.close()
+    return {f"{row[1]} ({row[2]})": row[0] for row in playlists}
+
+
+def load_playlist_items(playlist_id):
+    conn = db.connect("media.db")
+    c = conn.cursor()
+    c.execute(
+        "SELECT id, file_path, url, title FROM playlist_items WHERE playlist_id = ?",
+        (playlist_id,),
+    )
+    items = c.fetchall()
+    conn.close()
+    return items
+
+
 def render():
     with ui.card().classes("p-6 bg-gray-700"):
         ui.label("Media Player").classes("text-2xl font-semibold text-gray-100 mb-4")
@@ -59,28 +82,9 @@ def render():
             "bg-gray-600 text-white rounded mb-2"
         )
 
-        def load_playlists():
-            conn = sqlite3.connect("media.db")
-            c = conn.cursor()
-            c.execute("SELECT id, name, type FROM playlists")
-            playlists = c.fetchall()
-            conn.close()
-            return {f"{row[1]} ({row[2]})": row[0] for row in playlists}
-
-        def load_playlist_items(playlist_id):
-            conn = sqlite3.connect("media.db")
-            c = conn.cursor()
-            c.execute(
-                "SELECT id, file_path, url, title FROM playlist_items WHERE playlist_id = ?",
-                (playlist_id,),
-            )
-            items = c.fetchall()
-            conn.close()
-            return items
-
         def add_playlist(name, playlist_type="local"):
             if name:
-                conn = sqlite3.connect("media.db")
+                conn = db.connect("media.db")
                 c = conn.cursor()
                 c.execute(
                     "INSERT INTO playlists (name, type) VALUES (?, ?)",
@@ -100,7 +104,7 @@ def render():
             os.makedirs("media", exist_ok=True)
             with open(file_path, "wb") as f:
                 f.write(e.content.read())
-            conn = sqlite3.connect("media.db")
+            conn = db.connect("media.db")
             c = conn.cursor()
             c.execute(
                 "INSERT INTO playlist_items (playlist_id, file_path, title) VALUES (?, ?, ?)",
@@ -111,7 +115,7 @@ def render():
             refresh_playlist_items()
 
         def delete_playlist_item(item_id):
-            conn = sqlite3.connect("media.db")
+            conn = db.connect("media.db")
             c = conn.cursor()
             c.execute("SELECT file_path FROM playlist_items WHERE id = ?", (item_id,))
             file_path = c.fetchone()[0]
@@ -122,7 +126,7 @@ def render():
                 Path(file_path).unlink()
             refresh_playlist_items()
 
-        def download_youtube():
+        async def download_youtube():
             url = youtube_url.value.strip()
             if not url:
                 ui.notify("Enter a YouTube URL", type="warning")
@@ -131,44 +135,12 @@ def render():
             if not playlist_id:
                 ui.notify("Select a playlist first", type="warning")
                 return
-            os.makedirs("media", exist_ok=True)
-            ydl_opts = {
-                "outtmpl": "media/%(title)s.%(ext)s",
-                "format": "bestvideo+bestaudio/best",
-                "merge_output_format": "mp4",
-                "quiet": True,
-            }
             try:
-                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                    info = ydl.extract_info(url, download=True)
-                    if "entries" in info:  # Playlist
-                        for entry in info["entries"]:
-                            file_path = ydl.prepare_filename(entry)
-                            conn = sqlite3.connect("media.db")
-                            c = conn.cursor()
-                            c.execute(
-                                "INSERT INTO playlist_items (playlist_id, file_path, url, title) VALUES (?, ?, ?, ?)",
-                                (
-                                    playlist_id,
-                                    file_path,
-                                    entry["webpage_url"],
-                                    entry["title"],
-                                ),
-                            )
-                            conn.commit()
-                            conn.close()
-                    else:  # Single video
-                        file_path = ydl.prepare_filename(info)
-                        conn = sqlite3.connect("media.db")
-                        c = conn.cursor()
-                        c.execute(
-                            "INSERT INTO playlist_items (playlist_id, file_path, url, title) VALUES (?, ?, ?, ?)",
-                            (playlist_id, file_path, url, info["title"]),
-                        )
-                        conn.commit()
-                        conn.close()
+                await jobs.run(f"media.download:{playlist_id}:{url}", download_to_playlist, url, playlist_id, report=True)
                 ui.notify("Download complete", type="positive")
                 refresh_playlist_items()
+            except jobs.JobCancelled:
+                ui.notify("Download cancelled", type="warning")
             except Exception as e:
                 ui.notify(f"Download failed: {str(e)}", type="negative")
 
@@ -180,7 +152,7 @@ def render():
             for line in content.splitlines():
                 if line.strip() and not line.startswith("#"):
                     if re.match(r"^(https?://|file://|rtsp://|mms://)", line.strip()):
-                        conn = sqlite3.connect("media.db")
+                        conn = db.connect("media.db")
                         c = conn.cursor()
                         c.execute(
                             "INSERT INTO playlist_items (playlist_id, url, title) VALUES (?, ?, ?)",
@@ -228,6 +200,7 @@ def render():
                 playlist_select.value = list(playlists.keys())[0]
                 refresh_playlist_items()
 
+        @metrics.timed("media.refresh_playlist_items")
         def refresh_playlist_items():
             playlist_items.clear()
             playlist_id = load_playlists().get(playlist_select.value)
@@ -297,12 +270,12 @@ def render():
         ).classes("bg-blue-600 hover:bg-blue-500 text-white rounded px-4 py-2 mb-4")
 
         # Add Convert button
-        def convert_item(item):
+        async def convert_item(item):
             from modules.mediaconverter import convert_file
             from pathlib import Path
             if item and item.get("file_path"):
                 with open(item["file_path"], "rb") as f:
-                    convert_file(type("Event", (), {"name": Path(item["file_path"]).name, "content": f}))
+                    await convert_file(type("Event", (), {"name": Path(item["file_path"]).name, "content": f}))
 
         ui.button(
             "Convert",
@@ -315,8 +288,8 @@ def render():
             playlist_name = new_playlist_name.value.strip() or "Radio Stations"
             add_playlist(playlist_name, "m3u")
             playlist_id = max(load_playlists().values())
-            for _, name, url, _ in load_stations():
-                conn = sqlite3.connect("media.db")
+            for _, name, url, _, _ in load_stations():
+                conn = db.connect("media.db")
                 c = conn.cursor()
                 c.execute(
                     "INSERT INTO playlist_items (playlist_id, url, title) VALUES (?, ?, ?)",
@@ -357,7 +330,7 @@ def render():
 
             items = load_playlist_items(playlist_select.value)
             random.shuffle(items)
-            conn = sqlite3.connect("media.db")
+            conn = db.connect("media.db")
             c = conn.cursor()
             c.execute("DELETE FROM playlist_items WHERE playlist_id = ?", (playlist_select.value,))
             for item in items:
@@ -369,12 +342,12 @@ def render():
             conn.close()
             refresh_playlist_items()
 
-        def sync_to_drive():
-            from core.gdrive import upload_file_stub
+        async def sync_to_drive():
+            from core.gdrive import upload_file_async
             from pathlib import Path
 
             for item in Path("media").iterdir():
-                upload_file_stub(str(item))
+                await upload_file_async(str(item))
             ui.notify("Media synced to Drive", type="positive")
 
         # Support YouTube streaming without downloading
@@ -404,8 +377,44 @@ def render():
 
         refresh_playlists()
 
+def download_to_playlist(job, url, playlist_id):
+    """Download a YouTube video or playlist and add it to a playlist (runs as a job)."""
+    os.makedirs("media", exist_ok=True)
+
+    def progress_hook(d):
+        job.check_cancelled()
+        total = d.get("total_bytes") or d.get("total_bytes_estimate")
+        if d.get("status") == "downloading" and total:
+            job.set_progress(d.get("downloaded_bytes", 0) / total, d.get("filename", ""))
+
+    ydl_opts = {
+        "outtmpl": "media/%(title)s.%(ext)s",
+        "format": "bestvideo+bestaudio/best",
+        "merge_output_format": "mp4",
+        "quiet": True,
+        "progress_hooks": [progress_hook],
+    }
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        info = ydl.extract_info(url, download=True)
+        if "entries" in info:  # Playlist
+            rows = [
+                (playlist_id, ydl.prepare_filename(entry), entry["webpage_url"], entry["title"])
+                for entry in info["entries"]
+            ]
+        else:  # Single video
+            rows = [(playlist_id, ydl.prepare_filename(info), url, info["title"])]
+    conn = db.connect("media.db")
+    c = conn.cursor()
+    c.executemany(
+        "INSERT INTO playlist_items (playlist_id, file_path, url, title) VALUES (?, ?, ?, ?)",
+        rows,
+    )
+    conn.commit()
+    conn.close()
+    return len(rows)
+
 def add_to_playlist(playlist_id, file_path, title):
-    conn = sqlite3.connect("media.db")
+    conn = db.connect("media.db")
     c = conn.cursor()
     c.execute(
         "INSERT INTO playlist_items (playlist_id, file_path, title) VALUES (?, ?, ?)",
@@ -2,6 +2,7 @@ from nicegui import ui
 import ffmpeg
 from pathlib import Path
 import os
+from core import jobs
 
 from modules.media import add_to_playlist  # Import add_to_playlist for playlist integration
 
@@ -20,7 +21,7 @@ def render():
         resolution = ui.input("Resolution (e.g., 1280x720)").classes("bg-gray-600 text-white rounded w-full mb-4")
         output_label = ui.label().classes("text-gray-100")
 
-        def convert_file(e):
+        async def convert_file(e):
             input_path = Path("media") / e.name
             os.makedirs("media", exist_ok=True)
             with open(input_path, "wb") as f:
@@ -59,7 +60,8 @@ def render():
                         output_kwargs["acodec"] = "copy"
 
                 stream = ffmpeg.output(stream, str(output_path), **output_kwargs)
-                ffmpeg.run(stream)
+                # ffmpeg runs as a subprocess, so a pool thread is enough to keep the UI responsive
+                await jobs.run(f"mediaconverter.convert:{output_path}", ffmpeg.run, stream)
                 ui.notify(f"Converted to {output_path.name}", type="positive")
                 output_label.set_text(f"Download: {output_path.name}")
                 ui.download(str(output_path))
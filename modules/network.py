@@ -2,11 +2,12 @@ from nicegui import ui
 import psutil
 import time
 import socket
-import sqlite3
+from core import db
+from core import metrics
 from datetime import datetime
 
 def init_db():
-    conn = sqlite3.connect("network_stats.db")
+    conn = db.connect("network_stats.db")
     c = conn.cursor()
     c.execute(
         """
@@ -21,6 +22,16 @@ def init_db():
     conn.commit()
     conn.close()
 
+def record_stats(sent_mb, recv_mb):
+    conn = db.connect("network_stats.db")
+    c = conn.cursor()
+    c.execute(
+        "INSERT INTO network_stats (sent, recv, timestamp) VALUES (?, ?, ?)",
+        (sent_mb, recv_mb, datetime.now().isoformat()),
+    )
+    conn.commit()
+    conn.close()
+
 def render():
     init_db()
 
@@ -96,6 +107,7 @@ def render():
         sent_data = []
         recv_data = []
 
+        @metrics.timed("network.update_stats")
         def update_stats():
             nonlocal last_bytes_sent, last_bytes_recv
             io = psutil.net_io_counters()
@@ -115,14 +127,7 @@ def render():
                 recv_data.pop(0)
 
             # Insert bandwidth usage into SQLite
-            conn = sqlite3.connect("network_stats.db")
-            c = conn.cursor()
-            c.execute(
-                "INSERT INTO network_stats (sent, recv, timestamp) VALUES (?, ?, ?)",
-                (sent_mb, recv_mb, datetime.now().isoformat()),
-            )
-            conn.commit()
-            conn.close()
+            record_stats(sent_mb, recv_mb)
 
             rows = []
             for conn_info in psutil.net_connections():
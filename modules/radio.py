@@ -1,11 +1,14 @@
 from nicegui import ui
 import sqlite3
+from core import db
 import validators
 import os
 import time
 import requests
+from core import metrics
+from core import httpclient
 from scripts.radioscraper import scrape_radio_stations
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from core import jobs
 
 # Ensure db and exports folders exist
 os.makedirs("db", exist_ok=True)
@@ -13,16 +16,16 @@ os.makedirs("exports", exist_ok=True)
 
 def init_db():
     try:
-        conn = sqlite3.connect("db/radio.db")
+        conn = db.connect("db/radio.db")
         c = conn.cursor()
+        c.execute(
+            "CREATE TABLE IF NOT EXISTS radio_stations (id INTEGER PRIMARY KEY, name TEXT, url TEXT, country TEXT, favorite BOOLEAN DEFAULT 0)"
+        )
         # Add favorite column if it doesn't exist
         c.execute("PRAGMA table_info(radio_stations)")
         columns = [info[1] for info in c.fetchall()]
         if "favorite" not in columns:
             c.execute("ALTER TABLE radio_stations ADD COLUMN favorite BOOLEAN DEFAULT 0")
-        c.execute(
-            "CREATE TABLE IF NOT EXISTS radio_stations (id INTEGER PRIMARY KEY, name TEXT, url TEXT, country TEXT, favorite BOOLEAN DEFAULT 0)"
-        )
         c.execute(
             "CREATE TABLE IF NOT EXISTS exports (id INTEGER PRIMARY KEY, timestamp TEXT, file_path TEXT)"
         )
@@ -39,11 +42,11 @@ def import_to_media():
     import sqlite3
     add_playlist("Radio Stations", "m3u")
     playlist_id = max(load_playlists().values())
-    conn = sqlite3.connect("db/radio.db")
+    conn = db.connect("db/radio.db")
     c = conn.cursor()
     c.execute("SELECT name, url FROM radio_stations")
     for name, url in c.fetchall():
-        conn2 = sqlite3.connect("links.db")
+        conn2 = db.connect("links.db")
         c2 = conn2.cursor()
         c2.execute(
             "INSERT INTO playlist_items (playlist_id, url, title) VALUES (?, ?, ?)",
@@ -53,21 +56,88 @@ def import_to_media():
         conn2.close()
     conn.close()
 
+def load_stations(search_query="", country_filter="All"):
+    try:
+        conn = db.connect("db/radio.db")
+        c = conn.cursor()
+        query = "SELECT id, name, url, country, favorite FROM radio_stations"
+        params = []
+        if search_query or country_filter != "All":
+            query += " WHERE "
+            conditions = []
+            if search_query:
+                conditions.append("name LIKE ?")
+                params.append(f"%{search_query}%")
+            if country_filter != "All":
+                conditions.append("country = ?")
+                params.append(country_filter)
+            query += " AND ".join(conditions)
+        c.execute(query, params)
+        return c.fetchall()
+    except sqlite3.Error as e:
+        ui.notify(f"Database error: {e}", type="negative")
+        return []
+    finally:
+        conn.close()
+
+# Fetch countries from Radio Garden API
+def get_countries():
+    try:
+        response = httpclient.get("radio", "http://radio.garden/api/ara/content/places", timeout=10)
+        response.raise_for_status()
+        data = response.json()
+        countries = sorted(set(place.get("country", "Unknown").title() for place in data.get("data", {}).get("list", [])))
+        return ["All"] + countries
+    except requests.RequestException:
+        return ["All", "United States", "United Kingdom", "Canada", "Australia", "Germany", "France", "India", "Brazil", "South Africa", "Japan", "Other"]
+
+def write_m3u():
+    """Write all stations to a timestamped M3U file and log it in the exports table."""
+    conn = db.connect("db/radio.db")
+    c = conn.cursor()
+    c.execute("SELECT name, url FROM radio_stations")
+    timestamp = time.strftime("%Y%m%d_%H%M%S")
+    file_path = f"exports/radio_stations_{timestamp}.m3u"
+    with open(file_path, "w", encoding="utf-8") as f:
+        f.write("#EXTM3U\n")
+        for name, url in c:
+            f.write(f"#EXTINF:-1,{name}\n{url}\n")
+    c.execute(
+        "INSERT INTO exports (timestamp, file_path) VALUES (?, ?)",
+        (timestamp, file_path)
+    )
+    conn.commit()
+    conn.close()
+    return file_path
+
+async def update_all_stations():
+    """Re-scrape every country, replace its stations and export a fresh M3U."""
+    countries = (await jobs.run("radio.countries", get_countries))[1:]  # Skip "All"
+    for country in countries:
+        stations = await scrape_radio_stations(country)
+        if stations:
+            conn = db.connect("db/radio.db")
+            c = conn.cursor()
+            # Clear old stations for this country
+            c.execute("DELETE FROM radio_stations WHERE country = ?", (country,))
+            for station_name, station_url, station_country in stations:
+                if validators.url(station_url):
+                    c.execute(
+                        "INSERT INTO radio_stations (name, url, country) VALUES (?, ?, ?)",
+                        (station_name, station_url, station_country)
+                    )
+            conn.commit()
+            conn.close()
+            print(f"Updated {len(stations)} stations for {country}")
+    return await jobs.run("radio.write_m3u", write_m3u)
+
+# Weekly refresh; keyed, so re-importing the module never adds a second job
+jobs.schedule("radio.update_all_stations", update_all_stations, seconds=7 * 24 * 3600)
+
 def render():
     with ui.card().classes("p-6 bg-gray-800 w-full max-w-3xl mx-auto"):
         ui.label("Streaming Radio").classes("text-3xl font-bold text-gray-100 mb-6")
 
-        # Fetch countries from Radio Garden API
-        def get_countries():
-            try:
-                response = requests.get("http://radio.garden/api/ara/content/places", timeout=10)
-                response.raise_for_status()
-                data = response.json()
-                countries = sorted(set(place.get("country", "Unknown").title() for place in data.get("data", {}).get("list", [])))
-                return ["All"] + countries
-            except requests.RequestException:
-                return ["All", "United States", "United Kingdom", "Canada", "Australia", "Germany", "France", "India", "Brazil", "South Africa", "Japan", "Other"]
-
         # Search and Filter
         with ui.row().classes("w-full mb-4"):
             search = ui.input("Search Stations").props("clearable").classes("bg-gray-700 text-white rounded w-1/2")
@@ -137,7 +207,7 @@ def render():
                 if not stations:
                     ui.notify(f"No stations found for {country}.", type="warning")
                     return
-                conn = sqlite3.connect("db/radio.db")
+                conn = db.connect("db/radio.db")
                 c = conn.cursor()
                 for station_name, station_url, station_country in stations:
                     if validators.url(station_url):
@@ -155,36 +225,12 @@ def render():
             finally:
                 dialog.close()
 
-        def load_stations(search_query="", country_filter="All"):
-            try:
-                conn = sqlite3.connect("db/radio.db")
-                c = conn.cursor()
-                query = "SELECT id, name, url, country, favorite FROM radio_stations"
-                params = []
-                if search_query or country_filter != "All":
-                    query += " WHERE "
-                    conditions = []
-                    if search_query:
-                        conditions.append("name LIKE ?")
-                        params.append(f"%{search_query}%")
-                    if country_filter != "All":
-                        conditions.append("country = ?")
-                        params.append(country_filter)
-                    query += " AND ".join(conditions)
-                c.execute(query, params)
-                return c.fetchall()
-            except sqlite3.Error as e:
-                ui.notify(f"Database error: {e}", type="negative")
-                return []
-            finally:
-                conn.close()
-
         def save_station(station_data):
             if not station_data:
                 ui.notify("Please select a station.", type="warning")
                 return
             try:
-                conn = sqlite3.connect("db/radio.db")
+                conn = db.connect("db/radio.db")
                 c = conn.cursor()
                 c.execute(
                     "INSERT OR IGNORE INTO radio_stations (name, url, country) VALUES (?, ?, ?)",
@@ -201,7 +247,7 @@ def render():
 
         def delete_station(station_id):
             try:
-                conn = sqlite3.connect("db/radio.db")
+                conn = db.connect("db/radio.db")
                 c = conn.cursor()
                 c.execute("DELETE FROM radio_stations WHERE id = ?", (station_id,))
                 conn.commit()
@@ -219,61 +265,23 @@ def render():
             except Exception as e:
                 ui.notify(f"Error playing station: {e}", type="negative")
 
-        def export_m3u():
+        async def export_m3u():
             try:
-                conn = sqlite3.connect("db/radio.db")
-                c = conn.cursor()
-                c.execute("SELECT name, url FROM radio_stations")
-                stations = c.fetchall()
-
-                timestamp = time.strftime("%Y%m%d_%H%M%S")
-                file_path = f"exports/radio_stations_{timestamp}.m3u"
-                m3u_content = "#EXTM3U\n"
-                for name, url in stations:
-                    m3u_content += f"#EXTINF:-1,{name}\n{url}\n"
-                
-                with open(file_path, "w", encoding="utf-8") as f:
-                    f.write(m3u_content)
-                
-                # Log export in database
-                c.execute(
-                    "INSERT INTO exports (timestamp, file_path) VALUES (?, ?)",
-                    (timestamp, file_path)
-                )
-                conn.commit()
-                conn.close()
-                
+                file_path = await jobs.run("radio.write_m3u", write_m3u)
                 ui.notify(f"Exported to {file_path}", type="positive")
-                ui.download(file_path, f"radio_stations_{timestamp}.m3u")
+                ui.download(file_path, os.path.basename(file_path))
             except Exception as e:
                 ui.notify(f"Error exporting M3U: {e}", type="negative")
 
-        async def update_all_stations():
+        async def update_now():
             try:
-                countries = get_countries()[1:]  # Skip "All"
-                for country in countries:
-                    stations = await scrape_radio_stations(country)
-                    if stations:
-                        conn = sqlite3.connect("db/radio.db")
-                        c = conn.cursor()
-                        # Clear old stations for this country
-                        c.execute("DELETE FROM radio_stations WHERE country = ?", (country,))
-                        for station_name, station_url, station_country in stations:
-                            if validators.url(station_url):
-                                c.execute(
-                                    "INSERT INTO radio_stations (name, url, country) VALUES (?, ?, ?)",
-                                    (station_name, station_url, station_country)
-                                )
-                        conn.commit()
-                        conn.close()
-                        print(f"Updated {len(stations)} stations for {country}")
+                file_path = await jobs.run("radio.update_all_stations", update_all_stations)
                 refresh_stations()
-                export_m3u()  # Generate new M3U after update
-                ui.notify("Scheduled update completed and M3U exported.", type="positive")
+                ui.notify(f"Update completed and exported to {file_path}.", type="positive")
             except Exception as e:
-                print(f"Scheduled update error: {e}")
-                ui.notify(f"Scheduled update failed: {e}", type="negative")
+                ui.notify(f"Update failed: {e}", type="negative")
 
+        @metrics.timed("radio.refresh_stations")
         def refresh_stations():
             stations_list.clear()
             for station_id, station_name, station_url, station_country, favorite in load_stations(search.value, country.value):
@@ -292,7 +300,7 @@ def render():
                         
                         def on_favorite_change(value, station_id=station_id):
                             try:
-                                conn = sqlite3.connect("db/radio.db")
+                                conn = db.connect("db/radio.db")
                                 c = conn.cursor()
                                 c.execute("UPDATE radio_stations SET favorite = ? WHERE id = ?", (value, station_id))
                                 conn.commit()
@@ -307,28 +315,23 @@ def render():
         search.on("update:model-value", refresh_stations)
         country.on("update:model-value", lambda: update_stations_dropdown(country.value))
         ui.button("Export M3U", on_click=export_m3u).classes("bg-purple-600 hover:bg-purple-500 text-white rounded px-4 py-2 mb-4")
-        ui.button("Update Now", on_click=update_all_stations).classes("bg-orange-600 hover:bg-orange-500 text-white rounded px-4 py-2 mb-4")
+        ui.button("Update Now", on_click=update_now).classes("bg-orange-600 hover:bg-orange-500 text-white rounded px-4 py-2 mb-4")
         ui.button("Import to Media Player", on_click=import_to_media).classes("bg-blue-600 hover:bg-blue-500 text-white rounded px-4 py-2 mb-4")
         ui.button("Sync M3U to Drive", on_click=lambda: upload_m3u_to_drive()).classes("bg-blue-600 hover:bg-blue-500 text-white rounded px-4 py-2")
         ui.button("Sync Exports to Drive", on_click=lambda: sync_exports()).classes("bg-blue-600 hover:bg-blue-500 text-white rounded px-4 py-2 mb-4")
-        
-        # Schedule weekly updates
-        scheduler = AsyncIOScheduler()
-        scheduler.add_job(update_all_stations, "interval", weeks=1)
-        scheduler.start()
-        
+
         refresh_stations()
 
-    def sync_exports():
-        from core.gdrive import upload_file_stub
+    async def sync_exports():
+        from core.gdrive import upload_file_async
         from pathlib import Path
         for file in Path("exports").iterdir():
             if file.is_file():
-                upload_file_stub(str(file))
+                await upload_file_async(str(file))
         ui.notify("Synced all exports to Google Drive.", type="positive")
 
-    def upload_m3u_to_drive():
-        from core.gdrive import upload_file_stub
+    async def upload_m3u_to_drive():
+        from core.gdrive import upload_file_async
         import glob
         import os
         # Find latest M3U export file
@@ -337,7 +340,7 @@ def render():
             ui.notify("No M3U export files found to upload.", type="warning")
             return
         latest_file = max(files, key=os.path.getctime)
-        upload_file_stub(latest_file)
+        await upload_file_async(latest_file)
         ui.notify(f"Uploaded {os.path.basename(latest_file)} to Google Drive.", type="positive")
 
 # Marketplace metadata
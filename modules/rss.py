@@ -1,19 +1,24 @@
 from nicegui import ui
-import sqlite3
+from core import db
+from core import metrics
+import asyncio
 import feedparser
+from core import jobs
+from core import export
+from core import events
 
 
 def init_db():
-    conn = sqlite3.connect("links.db")
+    conn = db.connect("links.db")
     c = conn.cursor()
+    c.execute(
+        "CREATE TABLE IF NOT EXISTS rss_feeds (id INTEGER PRIMARY KEY, name TEXT, url TEXT, category TEXT)"
+    )
     # Add category column if it doesn't exist
     c.execute("PRAGMA table_info(rss_feeds)")
     columns = [col[1] for col in c.fetchall()]
     if "category" not in columns:
         c.execute("ALTER TABLE rss_feeds ADD COLUMN category TEXT")
-    c.execute(
-        "CREATE TABLE IF NOT EXISTS rss_feeds (id INTEGER PRIMARY KEY, name TEXT, url TEXT, category TEXT)"
-    )
     c.execute(
         "CREATE TABLE IF NOT EXISTS rss_items (id INTEGER PRIMARY KEY, feed_id INTEGER, title TEXT, link TEXT, published TEXT, read BOOLEAN)"
     )
@@ -24,36 +29,105 @@ def init_db():
 init_db()
 
 
+def load_feeds():
+    conn = db.connect("links.db")
+    c = conn.cursor()
+    c.execute("SELECT id, name, url, category FROM rss_feeds")
+    feeds = c.fetchall()
+    conn.close()
+    return feeds
+
+
+def load_items(feed_id, limit=5):
+    conn = db.connect("links.db")
+    c = conn.cursor()
+    c.execute(
+        "SELECT id, title, link, read FROM rss_items WHERE feed_id = ? ORDER BY id DESC LIMIT ?",
+        (feed_id, limit),
+    )
+    items = c.fetchall()
+    conn.close()
+    return items
+
+
+def fetch_feed(feed_id, url, limit=5):
+    """Parse a feed, store unseen entries and return (id, title, link, read) for the newest ones."""
+    feed = feedparser.parse(url)
+    conn = db.connect("links.db")
+    c = conn.cursor()
+    items = []
+    inserted = []
+    for entry in feed.entries[:limit]:
+        c.execute(
+            "SELECT id, read FROM rss_items WHERE link = ?",
+            (entry.link,),
+        )
+        item = c.fetchone()
+        if not item:
+            c.execute(
+                "INSERT INTO rss_items (feed_id, title, link, published, read) VALUES (?, ?, ?, ?, ?)",
+                (
+                    feed_id,
+                    entry.title,
+                    entry.link,
+                    entry.get("published", ""),
+                    False,
+                ),
+            )
+            item_id, read = c.lastrowid, False
+            inserted.append(item_id)
+        else:
+            item_id, read = item
+        items.append((item_id, entry.title, entry.link, read))
+    conn.commit()
+    conn.close()
+    if inserted:
+        events.row_inserted("rss_items", inserted, feed_id=feed_id)
+    return items
+
+
+@metrics.timed("rss.refresh_all_feeds")
+async def refresh_all_feeds():
+    """Fetch every feed concurrently on the IO pool; open pages update from the events."""
+    await asyncio.gather(
+        *(jobs.run(f"rss.fetch:{feed_id}", fetch_feed, feed_id, url) for feed_id, _, url, _ in load_feeds()),
+        return_exceptions=True,
+    )
+
+
+# One hourly fetch for the whole app instead of a timer in every open tab
+jobs.schedule("rss.refresh_all_feeds", refresh_all_feeds, seconds=3600)
+
+
 def render():
-    def add_feed():
+    async def add_feed():
         name = name_input.value.strip() or url_input.value.strip()
         url = url_input.value.strip()
         category = category_input.value.strip()
         if url:
-            conn = sqlite3.connect("links.db")
+            conn = db.connect("links.db")
             c = conn.cursor()
             c.execute(
                 "INSERT INTO rss_feeds (name, url, category) VALUES (?, ?, ?)", (name, url, category)
             )
             conn.commit()
+            feed_id = c.lastrowid
             conn.close()
             name_input.value = ""
             url_input.value = ""
             category_input.value = ""
-            refresh_feeds()
+            events.row_inserted("rss_feeds", feed_id)
+            try:
+                await jobs.run(f"rss.fetch:{feed_id}", fetch_feed, feed_id, url)
+            except Exception:
+                ui.notify("Error fetching feed", type="negative")
 
     def export_rss():
         from core.gdrive import upload_file_stub
-        conn = sqlite3.connect("links.db")
-        c = conn.cursor()
-        c.execute("SELECT id, name, url, category FROM rss_feeds")
-        feeds = c.fetchall()
-        c.execute("SELECT feed_id, title, link, published, read FROM rss_items")
-        items = c.fetchall()
-        with open("rss.json", "w") as f:
-            import json
-
-            json.dump({"feeds": feeds, "items": items}, f)
+        conn = db.connect("links.db")
+        feeds = conn.cursor().execute("SELECT id, name, url, category FROM rss_feeds")
+        items = conn.cursor().execute("SELECT feed_id, title, link, published, read FROM rss_items")
+        export.export_json_sections("rss.json", {"feeds": feeds, "items": items})
         conn.close()
         upload_file_stub("rss.json")
 
@@ -80,86 +154,94 @@ def render():
         ui.button("Export to Drive", on_click=export_rss).classes(
             "bg-blue-600 hover:bg-blue-500 text-white rounded px-4 py-2 mb-4"
         )
+        ui.button("Refresh Feeds", on_click=refresh_all_feeds).classes(
+            "bg-gray-600 hover:bg-gray-500 text-white rounded px-4 py-2 mb-4"
+        )
         feeds_list = ui.list().classes("w-full")
-
-        def load_feeds():
-            conn = sqlite3.connect("links.db")
-            c = conn.cursor()
-            c.execute("SELECT id, name, url, category FROM rss_feeds")
-            return c.fetchall()
+        feed_cards = {}  # feed_id -> (card, items column)
+        item_links = {}  # item_id -> (checkbox, link)
+        item_read = {}  # item_id -> read state shown on this page
 
         def delete_feed(feed_id):
-            conn = sqlite3.connect("links.db")
+            conn = db.connect("links.db")
             c = conn.cursor()
             c.execute("DELETE FROM rss_feeds WHERE id = ?", (feed_id,))
             c.execute("DELETE FROM rss_items WHERE feed_id = ?", (feed_id,))
             conn.commit()
             conn.close()
-            refresh_feeds()
+            events.row_deleted("rss_feeds", feed_id)
 
         def toggle_read(item_id, read):
-            conn = sqlite3.connect("links.db")
+            if item_read.get(item_id) == read:
+                return  # the checkbox is echoing an event from another tab
+            item_read[item_id] = read
+            conn = db.connect("links.db")
             c = conn.cursor()
-            c.execute("UPDATE rss_items SET read = ? WHERE id = ?", (not read, item_id))
+            c.execute("UPDATE rss_items SET read = ? WHERE id = ?", (read, item_id))
             conn.commit()
             conn.close()
-            refresh_feeds()
+            events.row_updated("rss_items", item_id, read=read)
+
+        def render_items(feed_id):
+            items_column = feed_cards[feed_id][1]
+            items_column.clear()
+            with items_column:
+                for item_id, title, link, read in load_items(feed_id):
+                    with ui.row().classes("items-center"):
+                        checkbox = ui.checkbox(
+                            value=bool(read),
+                            on_change=lambda e, i=item_id: toggle_read(i, e.value),
+                        ).classes("mr-2")
+                        link_element = ui.link(title, link).props("target=_blank").classes(
+                            "text-blue-400 hover:text-blue-300" if not read else "text-gray-400"
+                        )
+                    item_links[item_id] = (checkbox, link_element)
+                    item_read[item_id] = bool(read)
 
-    def refresh_feeds():
-        feeds_list.clear()
-        for feed_id, name, url, category in load_feeds():
+        def render_feed(feed_id, name, url, category):
             with feeds_list:
-                with ui.card().classes("p-4 bg-gray-600 mb-2"):
+                with ui.card().classes("p-4 bg-gray-600 mb-2") as card:
                     ui.label(f"{name} ({category})").classes("text-lg font-semibold text-gray-100")
                     ui.button(
                         "Delete", on_click=lambda f=feed_id: delete_feed(f)
                     ).classes(
                         "bg-red-600 hover:bg-red-500 text-white rounded px-2 py-1 mb-2"
                     )
-                    try:
-                        feed = feedparser.parse(url)
-                        conn = sqlite3.connect("links.db")
-                        c = conn.cursor()
-                        for entry in feed.entries[:5]:  # Limit to 5 items
-                            c.execute(
-                                "SELECT id, read FROM rss_items WHERE link = ?",
-                                (entry.link,),
-                            )
-                            item = c.fetchone()
-                            if not item:
-                                c.execute(
-                                    "INSERT INTO rss_items (feed_id, title, link, published, read) VALUES (?, ?, ?, ?, ?)",
-                                    (
-                                        feed_id,
-                                        entry.title,
-                                        entry.link,
-                                        entry.get("published", ""),
-                                        False,
-                                    ),
-                                )
-                                conn.commit()
-                                item_id, read = c.lastrowid, False
-                            else:
-                                item_id, read = item
-                            with ui.row().classes("items-center"):
-                                ui.checkbox(
-                                    value=read,
-                                    on_change=lambda e, i=item_id, r=read: toggle_read(
-                                        i, r
-                                    ),
-                                ).classes("mr-2")
-                                ui.link(entry.title, entry.link).props(
-                                    "target=_blank"
-                                ).classes(
-                                    "text-blue-400 hover:text-blue-300"
-                                    if not read
-                                    else "text-gray-400"
-                                )
-                        conn.close()
-                    except Exception:
-                        ui.label("Error fetching feed").classes("text-red-500")
-
-    ui.timer(3600, refresh_feeds)  # Refresh every hour
+                    items_column = ui.column()
+            feed_cards[feed_id] = (card, items_column)
+            render_items(feed_id)
+
+        @metrics.timed("rss.refresh_feeds")
+        def refresh_feeds():
+            feeds_list.clear()
+            feed_cards.clear()
+            item_links.clear()
+            item_read.clear()
+            for feed in load_feeds():
+                render_feed(*feed)
+
+        def on_feed_changed(e):
+            if e.action == "delete" and e.id in feed_cards:
+                feeds_list.remove(feed_cards.pop(e.id)[0])
+            elif e.action == "insert":
+                feed = next((f for f in load_feeds() if f[0] == e.id), None)
+                if feed:
+                    render_feed(*feed)
+
+        def on_item_changed(e):
+            if e.action == "insert" and e.data.get("feed_id") in feed_cards:
+                render_items(e.data["feed_id"])
+            elif e.action == "update" and e.id in item_links:
+                checkbox, link_element = item_links[e.id]
+                item_read[e.id] = bool(e.data["read"])
+                checkbox.set_value(bool(e.data["read"]))
+                link_element.classes(
+                    replace="text-gray-400" if e.data["read"] else "text-blue-400 hover:text-blue-300"
+                )
+
+        events.listen("rss_feeds", on_feed_changed)
+        events.listen("rss_items", on_item_changed)
+        refresh_feeds()
 
 # Marketplace metadata
 def marketplace_info():
@@ -1,13 +1,14 @@
 from nicegui import ui
 import psutil
-import time
-import sqlite3
+from core import db
+from core import metrics
 from datetime import datetime
-import csv
+from core import export
 from core import gdrive
+from core import events
 
 def init_db():
-    conn = sqlite3.connect("links.db")
+    conn = db.connect("links.db")
     c = conn.cursor()
     c.execute("CREATE TABLE IF NOT EXISTS process_logs (id INTEGER PRIMARY KEY, pid INTEGER, name TEXT, action TEXT, timestamp TEXT)")
     conn.commit()
@@ -22,15 +23,26 @@ def set_priority(pid, value):
     except Exception as e:
         ui.notify(f"Failed to set priority: {str(e)}", type="negative")
 
-def export_logs():
-    conn = sqlite3.connect("links.db")
+def log_action(pid, name, action):
+    timestamp = datetime.now().isoformat()
+    conn = db.connect("links.db")
     c = conn.cursor()
-    c.execute("SELECT pid, name, action, timestamp FROM process_logs")
-    with open("process_logs.csv", "w", newline="") as f:
-        writer = csv.writer(f)
-        writer.writerow(["PID", "Name", "Action", "Timestamp"])
-        writer.writerows(c.fetchall())
+    c.execute(
+        "INSERT INTO process_logs (pid, name, action, timestamp) VALUES (?, ?, ?, ?)",
+        (pid, name, action, timestamp)
+    )
+    conn.commit()
+    row_id = c.lastrowid
     conn.close()
+    events.row_inserted("process_logs", row_id, pid=pid, name=name, action=action, timestamp=timestamp)
+
+def export_logs():
+    export.export_query(
+        "links.db",
+        "SELECT pid, name, action, timestamp FROM process_logs",
+        "process_logs.csv",
+        columns=["PID", "Name", "Action", "Timestamp"],
+    )
     gdrive.upload_file_stub("process_logs.csv")
 
 def render():
@@ -59,19 +71,17 @@ def render():
                     rows=[]
                 ).classes("w-full bg-gray-600 text-gray-100")
 
+                @metrics.timed("stats.update_stats")
                 def update_stats():
-                    start_time = time.perf_counter()
                     cpu = psutil.cpu_percent()
                     mem = psutil.virtual_memory()
                     disk = psutil.disk_usage('/')
                     cpu_label.set_text(f"CPU Usage: {cpu}%")
                     mem_label.set_text(f"Memory Usage: {mem.used / mem.total * 100:.1f}%")
                     disk_label.set_text(f"Disk Usage: {disk.used / disk.total * 100:.1f}%")
-                    elapsed = time.perf_counter() - start_time
-                    print(f"update_stats took {elapsed:.4f} seconds")
 
+                @metrics.timed("stats.refresh_processes")
                 def refresh_processes():
-                    start_time = time.perf_counter()
                     filter_text = filter_input.value.lower() if filter_input.value else ""
                     rows = []
                     for proc in psutil.process_iter(["pid", "name", "cpu_percent", "memory_percent", "nice"]):
@@ -97,8 +107,6 @@ def render():
                             continue
                     process_table.rows = rows
                     process_table.update()
-                    elapsed = time.perf_counter() - start_time
-                    print(f"refresh_processes took {elapsed:.4f} seconds")
 
                 def terminate_process(pid, name):
                     # Restrict termination of critical system processes
@@ -111,14 +119,7 @@ def render():
                         pass
                     try:
                         proc.terminate()
-                        conn = sqlite3.connect("links.db")
-                        c = conn.cursor()
-                        c.execute(
-                            "INSERT INTO process_logs (pid, name, action, timestamp) VALUES (?, ?, ?, ?)",
-                            (pid, name, "terminated", datetime.now().isoformat())
-                        )
-                        conn.commit()
-                        conn.close()
+                        log_action(pid, name, "terminated")
                         ui.notify(f"Terminated process {name} (PID: {pid})", type="positive")
                         refresh_processes()
                     except Exception as e:
@@ -174,8 +175,9 @@ def render():
                     rows=[]
                 ) as logs_table:
 
+                    @metrics.timed("stats.refresh_logs")
                     def refresh_logs():
-                        conn = sqlite3.connect("links.db")
+                        conn = db.connect("links.db")
                         c = conn.cursor()
                         c.execute("SELECT pid, name, action, timestamp FROM process_logs ORDER BY timestamp DESC")
                         logs = c.fetchall()
@@ -183,7 +185,11 @@ def render():
                         logs_table.rows = [{"pid": row[0], "name": row[1], "action": row[2], "timestamp": row[3]} for row in logs]
                         logs_table.update()
 
-                    ui.timer(5.0, refresh_logs)
+                    def on_log_inserted(e):
+                        logs_table.rows.insert(0, {"pid": e.data["pid"], "name": e.data["name"], "action": e.data["action"], "timestamp": e.data["timestamp"]})
+                        logs_table.update()
+
+                    events.listen("process_logs", on_log_inserted)
                     refresh_logs()
 
 # Marketplace metadata
@@ -0,0 +1,392 @@
+"""
+Seed large synthetic datasets and time the data-access paths of each module.
+
+Runs in a throwaway working directory so the real databases are never touched.
+Results are written to exports/benchmarks/ as JSON and compared with the
+previous run so regressions show up run-to-run.
+
+Usage:
+    python scripts/benchmark.py [--scale 0.1] [--repeat 5] [--only notes,todo] [--keep]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+RESULTS_DIR = os.path.join(ROOT, "exports", "benchmarks")
+
+# Row counts at --scale 1
+SIZES = {
+    "notes": 100_000,
+    "todos": 50_000,
+    "events": 20_000,
+    "rss_feeds": 200,
+    "rss_items": 200_000,
+    "radio_stations": 30_000,
+    "playlists": 50,
+    "playlist_items": 10_000,
+    "network_stats": 365 * 24 * 60,  # one year at one sample per minute
+}
+
+WORDS = (
+    "python sqlite nicegui async query index cache page scroll note todo calendar radio "
+    "media stream feed export drive backup sync search tag filter sort event network "
+    "latency memory thread process worker schedule job metric trace profile benchmark "
+    "happy apple river mountain coffee window garden music travel recipe meeting budget"
+).split()
+TAGS = [f"tag{i}" for i in range(200)] + ["python", "py", "work", "home", "ideas", "happy"]
+CATEGORIES = ["work", "personal", "ideas", "journal", "reference", "projects", "misc", "travel", "health", "finance"]
+COUNTRIES = [f"Country {i}" for i in range(100)]
+
+
+def sentence(rng, n):
+    return " ".join(rng.choice(WORDS) for _ in range(n))
+
+
+def timestamp(rng, days=3 * 365):
+    return (datetime(2026, 10, 1) - timedelta(seconds=rng.randrange(days * 86400))).isoformat()
+
+
+def insert_chunked(conn, sql, rows, chunk=10_000):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= chunk:
+            conn.executemany(sql, batch)
+            batch.clear()
+    if batch:
+        conn.executemany(sql, batch)
+    conn.commit()
+
+
+# --- Seeders: each writes through the module's own schema (created by init_db on import) ---
+def seed_notes(rng, n):
+    conn = sqlite3.connect("links.db")
+    insert_chunked(
+        conn,
+        "INSERT INTO notes (title, content, tags, category, created_at) VALUES (?, ?, ?, ?, ?)",
+        (
+            (
+                sentence(rng, 5).title(),
+                "\n\n".join(f"## {sentence(rng, 3)}\n\n{sentence(rng, 40)}" for _ in range(3)),
+                ",".join(rng.sample(TAGS, rng.randint(1, 4))),
+                rng.choice(CATEGORIES),
+                timestamp(rng),
+            )
+            for _ in range(n)
+        ),
+    )
+    conn.close()
+
+
+def seed_todos(rng, n):
+    conn = sqlite3.connect("links.db")
+    insert_chunked(
+        conn,
+        "INSERT INTO todos (task, done, created_at, due_date, priority) VALUES (?, ?, ?, ?, ?)",
+        (
+            (
+                sentence(rng, 6),
+                rng.random() < 0.4,
+                timestamp(rng),
+                (datetime(2026, 10, 1) + timedelta(days=rng.randint(-200, 200))).strftime("%Y-%m-%d")
+                if rng.random() < 0.7
+                else "",
+                rng.randint(1, 3),
+            )
+            for _ in range(n)
+        ),
+    )
+    conn.close()
+
+
+def seed_events(rng, n):
+    conn = sqlite3.connect("links.db")
+    insert_chunked(
+        conn,
+        "INSERT INTO events (title, date, description, recurrence) VALUES (?, ?, ?, ?)",
+        (
+            (
+                sentence(rng, 4),
+                (datetime(2024, 1, 1) + timedelta(days=rng.randrange(3 * 365))).strftime("%Y-%m-%d"),
+                sentence(rng, 15),
+                rng.choice(["weekly", "monthly"]) if rng.random() < 0.02 else "",
+            )
+            for _ in range(n)
+        ),
+    )
+    conn.close()
+
+
+def seed_rss(rng, n_feeds, n_items):
+    conn = sqlite3.connect("links.db")
+    insert_chunked(
+        conn,
+        "INSERT INTO rss_feeds (name, url, category) VALUES (?, ?, ?)",
+        ((f"Feed {i}", f"https://feed{i}.example.com/rss", rng.choice(CATEGORIES)) for i in range(n_feeds)),
+    )
+    insert_chunked(
+        conn,
+        "INSERT INTO rss_items (feed_id, title, link, published, read) VALUES (?, ?, ?, ?, ?)",
+        (
+            (
+                rng.randint(1, n_feeds),
+                sentence(rng, 8),
+                f"https://feed{i % n_feeds}.example.com/item/{i}",
+                timestamp(rng),
+                rng.random() < 0.5,
+            )
+            for i in range(n_items)
+        ),
+    )
+    conn.close()
+
+
+def seed_radio(rng, n):
+    conn = sqlite3.connect("db/radio.db")
+    insert_chunked(
+        conn,
+        "INSERT INTO radio_stations (name, url, country, favorite) VALUES (?, ?, ?, ?)",
+        (
+            (f"{sentence(rng, 2).title()} FM {i}", f"http://radio.example.com/{i}/channel.m3u", rng.choice(COUNTRIES), rng.random() < 0.05)
+            for i in range(n)
+        ),
+    )
+    conn.close()
+
+
+def seed_media(rng, n_playlists, n_items):
+    conn = sqlite3.connect("media.db")
+    conn.execute("CREATE TABLE IF NOT EXISTS playlists (id INTEGER PRIMARY KEY, name TEXT, type TEXT)")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS playlist_items (id INTEGER PRIMARY KEY, playlist_id INTEGER, file_path TEXT, url TEXT, title TEXT)"
+    )
+    insert_chunked(
+        conn,
+        "INSERT INTO playlists (name, type) VALUES (?, ?)",
+        ((f"Playlist {i}", rng.choice(["local", "m3u", "youtube"])) for i in range(n_playlists)),
+    )
+    insert_chunked(
+        conn,
+        "INSERT INTO playlist_items (playlist_id, file_path, url, title) VALUES (?, ?, ?, ?)",
+        (
+            (rng.randint(1, n_playlists), f"media/{i}.mp3", None, sentence(rng, 3))
+            for i in range(n_items)
+        ),
+    )
+    conn.close()
+
+
+def seed_network(rng, n):
+    conn = sqlite3.connect("network_stats.db")
+    start = datetime(2025, 10, 1)
+    insert_chunked(
+        conn,
+        "INSERT INTO network_stats (sent, recv, timestamp) VALUES (?, ?, ?)",
+        ((rng.random(), rng.random() * 5, (start + timedelta(minutes=i)).isoformat()) for i in range(n)),
+    )
+    conn.close()
+
+
+# --- Timing ---
+def measure(fn, repeat):
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        runs.append((time.perf_counter() - start) * 1000)
+    return {
+        "min_ms": round(min(runs), 3),
+        "median_ms": round(statistics.median(runs), 3),
+        "mean_ms": round(statistics.mean(runs), 3),
+        "runs": repeat,
+    }
+
+
+def peak_memory_kb(fn):
+    """Peak Python allocation during one call, to check that streaming stays flat."""
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] // 1024
+    finally:
+        tracemalloc.stop()
+
+
+def write_feed_xml(path, links):
+    items = "".join(
+        f"<item><title>Item {i}</title><link>{link}</link><pubDate>Mon, 01 Jan 2026 00:00:00 GMT</pubDate></item>"
+        for i, link in enumerate(links)
+    )
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f'<?xml version="1.0"?><rss version="2.0"><channel><title>Bench</title>{items}</channel></rss>')
+
+
+def build_cases(sizes):
+    """Import the modules (inside the seeded workdir) and return name -> callable."""
+    from core import notes, todo, calendar as cal, settings, export
+    from modules import rss, radio, media, network
+
+    cases = {
+        "settings.load_setting[x1000]": (
+            "settings",
+            lambda: [settings.load_setting("api_keys", {}) for _ in range(1000)],
+        ),
+        "notes.load_notes[all]": ("notes", lambda: notes.load_notes()),
+        "notes.load_notes[search]": ("notes", lambda: notes.load_notes("python")),
+        "notes.load_notes[prefix]": ("notes", lambda: notes.load_notes("gar")),
+        "notes.load_notes[tag]": ("notes", lambda: notes.load_notes(tags=["py"])),
+        "notes.load_notes[tags_all]": ("notes", lambda: notes.load_notes(tags=["python", "work"])),
+        "notes.tag_counts": ("notes", lambda: notes.tag_counts()),
+        "todo.load_todos[all]": ("todo", lambda: todo.load_todos("All")),
+        "todo.load_todos[pending]": ("todo", lambda: todo.load_todos("Pending")),
+        "todo.load_todos[due]": ("todo", lambda: todo.load_todos("Pending", "Due date")),
+        "todo.load_todos[priority]": ("todo", lambda: todo.load_todos("All", "Priority")),
+        "calendar.load_events[month]": ("calendar", lambda: cal.load_events("2025-06")),
+        "calendar.load_events[month_grid]": (
+            "calendar",
+            lambda: [cal.load_events(f"2025-06-{day:02d}") for day in range(1, 31)],
+        ),
+        "calendar.load_month": ("calendar", lambda: cal.load_month(2025, 6)),
+        "rss.load_feeds": ("rss", rss.load_feeds),
+        "radio.load_stations[all]": ("radio", lambda: radio.load_stations()),
+        "radio.load_stations[search]": ("radio", lambda: radio.load_stations("fm 1")),
+        "radio.load_stations[country]": ("radio", lambda: radio.load_stations("", "Country 7")),
+        "media.load_playlists": ("media", media.load_playlists),
+        "media.load_playlist_items": ("media", lambda: media.load_playlist_items(1)),
+        "network.record_stats[x100]": ("network", lambda: [network.record_stats(0.1, 0.2) for _ in range(100)]),
+    }
+
+    # Re-fetching a feed looks every entry up by link among all stored items
+    feed_path = os.path.abspath("bench_feed.xml")
+    n_items = sizes["rss_items"]
+    write_feed_xml(feed_path, [f"https://feed0.example.com/item/{i}" for i in range(0, min(n_items, 5 * 997), 997)])
+    cases["rss.fetch_feed[known_items]"] = ("rss", lambda: rss.fetch_feed(1, feed_path))
+
+    os.makedirs("exports", exist_ok=True)
+    notes_sql = "SELECT id, title, content, tags, category, created_at FROM notes"
+    for filename in ("notes.json", "notes.jsonl", "notes.csv", "notes.columnar", "notes.jsonl.gz"):
+        cases[f"export.query[{filename}]"] = (
+            "export",
+            lambda filename=filename: export.export_query("links.db", notes_sql, os.path.join("exports", filename)),
+        )
+    cases["export.query[rss_items.csv]"] = (
+        "export",
+        lambda: export.export_query("links.db", "SELECT * FROM rss_items", os.path.join("exports", "rss_items.csv")),
+    )
+    return cases
+
+
+def seed_all(sizes, rng):
+    from core import notes, todo, calendar  # noqa: F401  (init_db on import)
+    from modules import rss, radio, media, network  # noqa: F401
+
+    network.init_db()
+    seeders = [
+        ("notes", lambda: seed_notes(rng, sizes["notes"])),
+        ("todos", lambda: seed_todos(rng, sizes["todos"])),
+        ("events", lambda: seed_events(rng, sizes["events"])),
+        ("rss", lambda: seed_rss(rng, sizes["rss_feeds"], sizes["rss_items"])),
+        ("radio", lambda: seed_radio(rng, sizes["radio_stations"])),
+        ("media", lambda: seed_media(rng, sizes["playlists"], sizes["playlist_items"])),
+        ("network", lambda: seed_network(rng, sizes["network_stats"])),
+    ]
+    timings = {}
+    for name, seeder in seeders:
+        start = time.perf_counter()
+        seeder()
+        timings[name] = round(time.perf_counter() - start, 2)
+        print(f"seeded {name} in {timings[name]}s")
+    return timings
+
+
+def compare(results, previous):
+    if not previous:
+        return
+    print(f"\nChange vs. {previous.get('timestamp')}:")
+    for name, result in results.items():
+        before = previous.get("results", {}).get(name)
+        if not before or not before.get("median_ms") or "median_ms" not in result:
+            continue
+        change = (result["median_ms"] - before["median_ms"]) / before["median_ms"] * 100
+        flag = "  <-- slower" if change > 20 else ""
+        print(f"  {name:40s} {before['median_ms']:10.2f} -> {result['median_ms']:10.2f} ms ({change:+.0f}%){flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every dataset size")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", default="", help="comma-separated module prefixes to time")
+    parser.add_argument("--keep", action="store_true", help="keep the seeded working directory")
+    parser.add_argument("--output", default=RESULTS_DIR)
+    args = parser.parse_args()
+
+    sizes = {name: max(1, int(count * args.scale)) for name, count in SIZES.items()}
+    output_dir = os.path.abspath(args.output)
+    workdir = tempfile.mkdtemp(prefix="dashboard-bench-")
+    sys.path.insert(0, ROOT)
+    os.environ.setdefault("CREDENTIALS_MASTER_PASSWORD", "benchmark")
+    os.chdir(workdir)
+    os.makedirs("db", exist_ok=True)
+    print(f"Working directory: {workdir}")
+
+    try:
+        seed_timings = seed_all(sizes, random.Random(42))
+        only = [prefix for prefix in args.only.split(",") if prefix]
+        results = {}
+        for name, (module, fn) in build_cases(sizes).items():
+            if only and module not in only:
+                continue
+            try:
+                fn()  # warm the page cache
+                results[name] = measure(fn, args.repeat)
+                if module == "export":
+                    results[name]["peak_kb"] = peak_memory_kb(fn)
+            except Exception as e:
+                results[name] = {"error": f"{type(e).__name__}: {e}"}
+                print(f"{name:40s} FAILED {results[name]['error']}")
+                continue
+            peak = f"  peak {results[name]['peak_kb']} KB" if "peak_kb" in results[name] else ""
+            print(f"{name:40s} median {results[name]['median_ms']:10.2f} ms{peak}")
+    finally:
+        os.chdir(ROOT)
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    os.makedirs(output_dir, exist_ok=True)
+    latest_path = os.path.join(output_dir, "latest.json")
+    previous = None
+    if os.path.exists(latest_path):
+        with open(latest_path, encoding="utf-8") as f:
+            previous = json.load(f)
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "scale": args.scale,
+        "sizes": sizes,
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "seed_seconds": seed_timings,
+        "results": results,
+    }
+    run_path = os.path.join(output_dir, f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    for path in (run_path, latest_path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    print(f"\nResults saved to {run_path}")
+    if previous and previous.get("scale") == args.scale:
+        compare(results, previous)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""
+A small in-memory stand-in for the Google Calendar v3 events API, for trying the
+calendar sync (core/gcal.py) without a Google account.
+
+Implements events.list (paging, syncToken with deletions, 410 for expired tokens),
+insert, get, patch, update and delete (with If-Match), and the multipart batch
+endpoint. The calendar id in the path is ignored. Extra endpoints:
+
+    GET  /_fake/stats    request counts by kind and the number of live events
+    POST /_fake/expire   invalidate every sync token handed out so far
+
+Usage:
+    python scripts/fake_gcal.py [--port 8790] [--seed 0]
+
+then start the app with GOOGLE_CALENDAR_API_URL=http://127.0.0.1:8790.
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import uuid
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+EVENT_PATH = re.compile(r"^/calendar/v3/calendars/[^/]+/events(?:/([^/?]+))?$")
+DEFAULT_PAGE = 250
+
+lock = threading.Lock()
+store = {}  # id -> event, cancelled ones included
+seq = 0  # bumped on every change; sync tokens are the seq at the time of listing
+oldest_token = 0
+stats = Counter()
+
+
+def _now():
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+
+
+def _touch(event):
+    global seq
+    seq += 1
+    event["etag"] = f'"{seq}"'
+    event["updated"] = _now()
+    event["_seq"] = seq
+    return event
+
+
+def _public(event):
+    return {key: value for key, value in event.items() if not key.startswith("_")}
+
+
+def _error(status, message):
+    return status, {"error": {"code": status, "message": message}}
+
+
+def list_events(query):
+    max_results = min(int(query.get("maxResults", DEFAULT_PAGE)), 2500)
+    if "pageToken" in query:
+        since, upto, offset = (int(part) for part in query["pageToken"].split(":"))
+    elif "syncToken" in query:
+        try:
+            since = int(query["syncToken"])
+        except ValueError:
+            return _error(400, "Invalid sync token")
+        if since < oldest_token:
+            return _error(410, "Sync token is no longer valid, a full sync is required.")
+        upto, offset = seq, 0
+    else:
+        since, upto, offset = 0, seq, 0
+    changes = sorted((e for e in store.values() if since < e["_seq"] <= upto), key=lambda e: e["_seq"])
+    if since == 0 and query.get("showDeleted") != "true":
+        changes = [e for e in changes if e["status"] != "cancelled"]
+    page = changes[offset : offset + max_results]
+    response = {"kind": "calendar#events", "items": [_public(e) for e in page]}
+    if offset + max_results < len(changes):
+        response["nextPageToken"] = f"{since}:{upto}:{offset + max_results}"
+    else:
+        response["nextSyncToken"] = str(upto)
+    return 200, response
+
+
+def handle(method, path, query, headers, body):
+    """Route one API call; returns (status, JSON-able body or None)."""
+    match = EVENT_PATH.match(path)
+    if not match:
+        return _error(404, "Not Found")
+    event_id = match.group(1)
+    stats[method if event_id or method != "GET" else "LIST"] += 1
+    if event_id is None:
+        if method == "GET":
+            return list_events(query)
+        if method == "POST":
+            event = dict(body or {}, id=uuid.uuid4().hex, status="confirmed", kind="calendar#event")
+            store[event["id"]] = _touch(event)
+            return 200, _public(event)
+        return _error(405, "Method Not Allowed")
+    event = store.get(event_id)
+    if event is None:
+        return _error(404, "Not Found")
+    if event["status"] == "cancelled":
+        return _error(410, "Resource has been deleted")
+    if method == "GET":
+        return 200, _public(event)
+    if headers.get("if-match") not in (None, "*", event["etag"]):
+        return _error(412, "Precondition Failed")
+    if method == "DELETE":
+        event["status"] = "cancelled"
+        _touch(event)
+        return 204, None
+    if method == "PATCH":
+        event.update(body or {})
+    elif method == "PUT":
+        kept = {key: event[key] for key in ("id", "status", "kind")}
+        event.clear()
+        event.update(body or {}, **kept)
+    else:
+        return _error(405, "Method Not Allowed")
+    return 200, _public(_touch(event))
+
+
+def handle_batch(content_type, data):
+    """Run each part of a multipart/mixed batch in order and return (content type, body)."""
+    boundary = re.search(r'boundary="?([^";]+)"?', content_type).group(1)
+    out_boundary = "batch_" + uuid.uuid4().hex
+    parts = []
+    for raw in data.decode().replace("\r\n", "\n").split("--" + boundary)[1:]:
+        if raw.startswith("--"):
+            break
+        part_headers, _, request = raw.lstrip("\n").partition("\n\n")
+        content_id = re.search(r"(?im)^content-id:\s*<?([^>\n]+)>?", part_headers).group(1)
+        head, _, body = request.lstrip("\n").partition("\n\n")
+        request_line, *header_lines = head.split("\n")
+        method, url, _ = request_line.split(" ", 2)
+        headers = {k.strip().lower(): v.strip() for k, _, v in (line.partition(":") for line in header_lines)}
+        split = urlsplit(url)
+        query = {k: v[0] for k, v in parse_qs(split.query).items()}
+        body = body.strip()
+        status, result = handle(method, split.path, query, headers, json.loads(body) if body else None)
+        payload = json.dumps(result) if result is not None else ""
+        parts.append(
+            f"--{out_boundary}\r\nContent-Type: application/http\r\nContent-ID: <response-{content_id}>\r\n\r\n"
+            f"HTTP/1.1 {status} {'OK' if status < 300 else 'Error'}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(payload)}\r\n\r\n{payload}\r\n"
+        )
+    stats["BATCH"] += 1
+    stats["BATCH_PARTS"] += len(parts)
+    return f"multipart/mixed; boundary={out_boundary}", ("".join(parts) + f"--{out_boundary}--\r\n").encode()
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, content_type="application/json"):
+        data = body if isinstance(body, bytes) else (json.dumps(body).encode() if body is not None else b"")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _dispatch(self):
+        global oldest_token, seq
+        split = urlsplit(self.path)
+        data = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        with lock:
+            if split.path == "/_fake/stats":
+                live = sum(1 for e in store.values() if e["status"] != "cancelled")
+                return self._send(200, dict(stats, events=live))
+            if split.path == "/_fake/expire":
+                seq += 1
+                oldest_token = seq
+                return self._send(200, {"oldest_token": oldest_token})
+            if split.path == "/batch/calendar/v3":
+                content_type, body = handle_batch(self.headers["Content-Type"], data)
+                return self._send(200, body, content_type)
+            query = {k: v[0] for k, v in parse_qs(split.query).items()}
+            headers = {k.lower(): v for k, v in self.headers.items()}
+            status, body = handle(self.command, split.path, query, headers, json.loads(data) if data else None)
+        self._send(status, body)
+
+    do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _dispatch
+
+
+def seed(n):
+    """Create n all-day events, about 2% of them weekly or monthly series."""
+    rng = random.Random(0)
+    for i in range(n):
+        day = date(2024, 1, 1) + timedelta(days=rng.randrange(3 * 365))
+        event = {
+            "id": uuid.uuid4().hex,
+            "status": "confirmed",
+            "kind": "calendar#event",
+            "summary": f"Remote event {i}",
+            "description": "",
+            "start": {"date": day.isoformat()},
+            "end": {"date": (day + timedelta(days=1)).isoformat()},
+        }
+        if rng.random() < 0.02:
+            event["recurrence"] = [f"RRULE:FREQ={rng.choice(['WEEKLY', 'MONTHLY'])}"]
+        store[event["id"]] = _touch(event)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8790)
+    parser.add_argument("--seed", type=int, default=0, help="number of remote events to start with")
+    args = parser.parse_args()
+    seed(args.seed)
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), Handler)
+    print(f"Fake Calendar API on http://127.0.0.1:{args.port}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
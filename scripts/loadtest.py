@@ -0,0 +1,276 @@
+"""
+Open many simulated browser sessions against the dashboard and measure the server.
+
+Seeds a throwaway working directory (same generators as benchmark.py), starts
+the module pages in a NiceGUI server subprocess, then for each module page and
+each client count N connects N socket.io clients the way a browser does and
+records server CPU, RSS, event-loop lag and time spent in instrumented handlers
+(ui.timer ticks decorated with metrics.timed) while the clients stay connected.
+Results are written to exports/loadtest/.
+
+Usage:
+    python scripts/loadtest.py [--clients 1,10,25,50] [--pages stats,notes] [--duration 10] [--scale 0.05]
+"""
+import argparse
+import ast
+import asyncio
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+RESULTS_DIR = os.path.join(ROOT, "exports", "loadtest")
+PAGES = {
+    "stats": "modules.stats",
+    "network": "modules.network",
+    "rss": "modules.rss",
+    "radio": "modules.radio",
+    "media": "modules.media",
+    "notes": "core.notes",
+    "todo": "core.todo",
+    "calendar": "core.calendar",
+    "weblinks": "core.weblinks",
+    "jobs": "core.jobs",
+    "metrics": "core.metrics",
+}
+LAG_INTERVAL = 0.05  # seconds between event-loop lag probes
+
+
+# --- Server side (runs in the subprocess, inside the seeded workdir) ---
+def serve(port, pages):
+    import importlib
+    import psutil
+    from collections import deque
+    from nicegui import app, ui
+    from core import metrics
+
+    process = psutil.Process()
+    process.cpu_percent(None)
+    lag_samples = deque(maxlen=100_000)
+
+    async def probe_lag():
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(LAG_INTERVAL)
+            lag_samples.append(loop.time() - start - LAG_INTERVAL)
+
+    app.on_startup(lambda: asyncio.create_task(probe_lag()))
+
+    def make_page(module):
+        def page():
+            module.render()
+
+        return page
+
+    loaded = []
+    for name in pages:
+        try:
+            module = importlib.import_module(PAGES[name])
+        except Exception as e:
+            print(f"skipping {name}: {type(e).__name__}: {e}", flush=True)
+            continue
+        ui.page(f"/{name}")(make_page(module))
+        loaded.append(name)
+
+    @app.get("/_loadtest/pages")
+    def loaded_pages():
+        return loaded
+
+    @app.get("/_loadtest/stats")
+    def server_stats():
+        """CPU since the previous call, current RSS, and lag samples since the previous call."""
+        samples = sorted(lag_samples)
+        lag_samples.clear()
+        timings, _, _ = metrics.snapshot()
+        return {
+            "cpu_percent": process.cpu_percent(None),
+            "rss_mb": round(process.memory_info().rss / 2**20, 1),
+            "threads": process.num_threads(),
+            "lag_ms": {
+                "mean": round(sum(samples) / len(samples) * 1000, 2) if samples else 0,
+                "p95": round(samples[int(len(samples) * 0.95)] * 1000, 2) if samples else 0,
+                "max": round(samples[-1] * 1000, 2) if samples else 0,
+            },
+            "timings": timings,
+        }
+
+    ui.run(port=port, reload=False, show=False, reconnect_timeout=1.0)
+
+
+# --- Client side ---
+QUERY_RE = re.compile(r"query:\s*(\{.*?\}),\s*\n")
+
+
+async def open_client(session, base_url, page):
+    """Load the page like a browser would and keep its websocket open."""
+    import socketio
+
+    start = time.perf_counter()
+    async with session.get(f"{base_url}/{page}") as response:
+        html = await response.text()
+    load_ms = (time.perf_counter() - start) * 1000
+    match = QUERY_RE.search(html)
+    if response.status != 200 or not match:
+        raise RuntimeError(f"/{page} returned {response.status}")
+    query = ast.literal_eval(match.group(1))  # rendered as a Python dict literal
+    query.update({"document_id": str(uuid.uuid4()), "tab_id": str(uuid.uuid4()), "old_tab_id": ""})
+    query = {key: str(value).lower() if isinstance(value, bool) else str(value) for key, value in query.items()}
+    sio = socketio.AsyncClient(reconnection=False)
+    await sio.connect(
+        f"{base_url}?{'&'.join(f'{k}={v}' for k, v in query.items())}",
+        socketio_path="/_nicegui_ws/socket.io",
+        transports=["websocket"],
+    )
+    return sio, load_ms
+
+
+def handler_delta(before, after):
+    """Per-handler calls and mean ms observed between two metrics snapshots."""
+    result = {}
+    for name, (count, total, maximum) in after.items():
+        prev_count, prev_total, _ = before.get(name, (0, 0.0, 0.0))
+        calls = count - prev_count
+        if calls:
+            result[name] = {"calls": calls, "mean_ms": round((total - prev_total) / calls * 1000, 3)}
+    return result
+
+
+async def run_step(base_url, page, clients, duration):
+    import aiohttp
+
+    async with aiohttp.ClientSession() as session:
+        async with session.get(f"{base_url}/_loadtest/stats") as r:
+            baseline = await r.json()
+        opened = await asyncio.gather(*(open_client(session, base_url, page) for _ in range(clients)), return_exceptions=True)
+        sockets = [o[0] for o in opened if not isinstance(o, Exception)]
+        load_times = sorted(o[1] for o in opened if not isinstance(o, Exception))
+        errors = [str(o) for o in opened if isinstance(o, Exception)]
+        async with session.get(f"{base_url}/_loadtest/stats") as r:
+            burst = await r.json()  # also resets the CPU and lag windows for the steady phase
+        await asyncio.sleep(duration)
+        async with session.get(f"{base_url}/_loadtest/stats") as r:
+            steady = await r.json()
+        await asyncio.gather(*(s.disconnect() for s in sockets), return_exceptions=True)
+    return {
+        "page": page,
+        "clients": clients,
+        "connected": len(sockets),
+        "errors": errors[:5],
+        "page_load_ms": {
+            "median": round(load_times[len(load_times) // 2], 1) if load_times else None,
+            "max": round(load_times[-1], 1) if load_times else None,
+        },
+        "connect_cpu_percent": burst["cpu_percent"],
+        "connect_lag_ms": burst["lag_ms"],
+        "cpu_percent": steady["cpu_percent"],
+        "rss_mb": steady["rss_mb"],
+        "threads": steady["threads"],
+        "lag_ms": steady["lag_ms"],
+        "handlers": handler_delta(baseline["timings"], steady["timings"]),
+    }
+
+
+async def wait_for_server(base_url, timeout=60):
+    import aiohttp
+
+    deadline = time.time() + timeout
+    async with aiohttp.ClientSession() as session:
+        while time.time() < deadline:
+            try:
+                async with session.get(f"{base_url}/_loadtest/pages") as r:
+                    return await r.json()
+            except aiohttp.ClientError:
+                await asyncio.sleep(0.5)
+    raise RuntimeError("server did not start")
+
+
+def drive(args):
+    sys.path.insert(0, os.path.dirname(__file__))
+    sys.path.insert(0, ROOT)
+    import random
+    import benchmark
+
+    pages = [p for p in args.pages.split(",") if p] or list(PAGES)
+    counts = [int(n) for n in args.clients.split(",")]
+    workdir = tempfile.mkdtemp(prefix="dashboard-load-")
+    os.environ.setdefault("CREDENTIALS_MASTER_PASSWORD", "loadtest")
+    os.chdir(workdir)
+    os.makedirs("db", exist_ok=True)
+    print(f"Working directory: {workdir}")
+    sizes = {name: max(1, int(count * args.scale)) for name, count in benchmark.SIZES.items()}
+    benchmark.seed_all(sizes, random.Random(42))
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    server = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "--serve", "--port", str(args.port), "--pages", ",".join(pages)],
+        cwd=workdir,
+        env={**os.environ, "PYTHONPATH": ROOT},
+    )
+    steps = []
+    try:
+        loaded = asyncio.run(wait_for_server(base_url))
+        for page in pages:
+            if page not in loaded:
+                print(f"{page:10s} not loaded (import failed on the server)")
+                continue
+            for n in counts:
+                step = asyncio.run(run_step(base_url, page, n, args.duration))
+                steps.append(step)
+                print(
+                    f"{page:10s} N={n:<4d} connected {step['connected']:<4d} cpu {step['cpu_percent']:6.1f}%  "
+                    f"rss {step['rss_mb']:7.1f} MB  lag p95 {step['lag_ms']['p95']:7.2f} ms  "
+                    f"load median {step['page_load_ms']['median']} ms"
+                )
+                time.sleep(2)  # let disconnected clients be deleted before the next step
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+        os.chdir(ROOT)
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    output_dir = os.path.abspath(args.output)
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, f"loadtest_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "timestamp": datetime.now().isoformat(timespec="seconds"),
+                "scale": args.scale,
+                "duration": args.duration,
+                "cpu_count": os.cpu_count(),
+                "steps": steps,
+            },
+            f,
+            indent=2,
+        )
+    print(f"\nResults saved to {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", default="1,10,25,50", help="comma-separated client counts per page")
+    parser.add_argument("--pages", default="", help="comma-separated pages (default: all)")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds to hold each step")
+    parser.add_argument("--scale", type=float, default=0.05, help="dataset scale, see benchmark.py")
+    parser.add_argument("--port", type=int, default=8899)
+    parser.add_argument("--keep", action="store_true", help="keep the seeded working directory")
+    parser.add_argument("--output", default=RESULTS_DIR)
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve:
+        serve(args.port, [p for p in args.pages.split(",") if p])
+    else:
+        drive(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+import pytest
+
+from core import export
+
+COLUMNS = ["id", "task", "done"]
+
+
+@pytest.mark.parametrize("fmt", ["json", "jsonl", "csv", "columnar", "parquet"])
+@pytest.mark.parametrize("suffix", ["", ".gz"])
+def test_zero_row_export_writes_an_empty_file(tmp_path, fmt, suffix):
+    if fmt == "parquet":
+        if suffix:
+            pytest.skip("parquet compresses internally")
+        pytest.importorskip("pyarrow")
+    path = tmp_path / f"empty.{fmt}{suffix}"
+    assert export.export_rows(iter(()), COLUMNS, str(path)) == 0
+    assert path.exists()
+    assert not (tmp_path / f"empty.{fmt}{suffix}.tmp").exists()
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        table = pq.read_table(path)
+        assert table.num_rows == 0
+        assert table.column_names == COLUMNS
+    else:
+        assert list(export.iter_records(str(path))) == []
+
+
+@pytest.mark.parametrize("fmt", ["json", "jsonl", "csv", "columnar"])
+def test_rows_round_trip(tmp_path, fmt):
+    rows = [(1, "write tests", False), (2, "ship", True)]
+    path = tmp_path / f"todos.{fmt}"
+    assert export.export_rows(rows, COLUMNS, str(path)) == 2
+    records = list(export.iter_records(str(path)))
+    assert [record["task"] for record in records] == ["write tests", "ship"]
@@ -0,0 +1,47 @@
+from datetime import date
+
+import pytest
+
+from core import recurrence
+
+
+@pytest.mark.parametrize(
+    "rule",
+    [
+        "FREQ=DAILY;BYDAY=MO,TU,WE,TH,FR",
+        "FREQ=MONTHLY;BYDAY=MO,TU,WE,TH,FR;BYSETPOS=-1",
+        "FREQ=YEARLY;BYMONTH=3;BYDAY=2SU",
+        "FREQ=WEEKLY;INTERVAL=2;BYDAY=SU;WKST=SU",
+        "FREQ=WEEKLY;BYDAY=2TU",
+        "FREQ=YEARLY;BYMONTHDAY=1",
+        "FREQ=DAILY;BYHOUR=9",
+        "FREQ=HOURLY",
+    ],
+)
+def test_unsupported_rules_raise(rule):
+    with pytest.raises(ValueError):
+        recurrence.parse(rule)
+
+
+MONDAYS_IN_JANUARY = [date(2024, 1, 1), date(2024, 1, 8), date(2024, 1, 15), date(2024, 1, 22), date(2024, 1, 29)]
+
+
+@pytest.mark.parametrize(
+    "rule, end, expected",
+    [
+        ("weekly", date(2024, 2, 1), MONDAYS_IN_JANUARY),
+        ("FREQ=WEEKLY;BYDAY=MO;WKST=SU", date(2024, 2, 1), MONDAYS_IN_JANUARY),
+        ("FREQ=WEEKLY;INTERVAL=2;BYDAY=MO;WKST=MO", date(2024, 2, 1), MONDAYS_IN_JANUARY[::2]),
+        ("RRULE:FREQ=WEEKLY;BYDAY=MO,WE;COUNT=4", date(2025, 1, 1), [date(2024, 1, 1), date(2024, 1, 3), date(2024, 1, 8), date(2024, 1, 10)]),
+        ("FREQ=MONTHLY;BYDAY=-1FR;UNTIL=20240331", date(2025, 1, 1), [date(2024, 1, 26), date(2024, 2, 23), date(2024, 3, 29)]),
+        ("FREQ=MONTHLY;BYMONTHDAY=31;COUNT=3", date(2025, 1, 1), [date(2024, 1, 31), date(2024, 3, 31), date(2024, 5, 31)]),
+        ("FREQ=DAILY;INTERVAL=10;COUNT=3", date(2025, 1, 1), [date(2024, 1, 1), date(2024, 1, 11), date(2024, 1, 21)]),
+    ],
+)
+def test_supported_rules_expand(rule, end, expected):
+    assert list(recurrence.occurrences(date(2024, 1, 1), rule, date(2024, 1, 1), end)) == expected
+
+
+def test_format_round_trips():
+    rule = "FREQ=MONTHLY;INTERVAL=2;COUNT=5;BYDAY=2TU,-1FR"
+    assert recurrence.format_rule(recurrence.parse(rule)) == rule